@@ -6,6 +6,16 @@ app = FastAPI(title="Microservicio Biométrico")
 # Registrar routers
 app.include_router(biometric.router, prefix="/api", tags=["biometria"])
 
+
+@app.on_event("startup")
+async def startup():
+    await biometric.start_pipeline()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await biometric.stop_pipeline()
+
 @app.get("/")
 def root():
     return {"message": "Microservicio de biometría funcionando"}
@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from datetime import datetime
 from typing import Optional
 
 
@@ -16,6 +17,14 @@ class BiometricData(BaseModel):
     user_email: Optional[str] = None       # Optional, for other clients
     device_id: str
 
+    # Sample time as measured on the device: ISO-8601 or Unix epoch (s or ms).
+    # Server arrival time is used when omitted, so buffered uploads must set it.
+    timestamp: Optional[datetime] = None
+
+    # Optional per-device sequence number used as idempotency key: a retried
+    # reading with the same device_id + seq is dropped as a duplicate.
+    seq: Optional[int] = None
+
     # Optional context / location tags
     org_id: Optional[str] = None
     site: Optional[str] = None
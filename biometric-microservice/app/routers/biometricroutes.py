@@ -1,12 +1,60 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.requests import HTTPConnection
 from app.models.biometric import BiometricData
-from influxdb_client import InfluxDBClient, Point
+from app.services.batch_writer import BatchWriter, WriteQueueFull
+from app.services.cardinality import SeriesCardinality
+from app.services.dedup import ReplayWindow
+from app.services.health_probe import HealthProbe
+from app.services.jwt_cache import JWTVerificationCache
+from app.services.payload_codecs import (
+    FIELD_IDS,
+    MSGPACK_CONTENT_TYPES,
+    BodyDecoder,
+    CorruptPayload,
+    MsgpackRecordStream,
+    PayloadTooLarge,
+    UnsupportedEncoding,
+    available_encodings,
+)
+from app.services.payload_decoder import (
+    DivertedMeasurement,
+    FastPathUnsupported,
+    TagSetCache,
+    coerce_text_record,
+    datetime_to_ns,
+    decode_reading,
+    encode_model,
+    reading_timestamp_ns,
+)
+from app.services.preaggregation import EdgePreAggregator, parse_window_spec
+from app.services.rate_limiter import RateLimited, TokenBucketLimiter, redis_client_from_env
+from app.services.rollups import ROLLUP_METRICS, RollupAggregator
+from app.services.series_query import (
+    FIELD_KEYS,
+    HotWindowCache,
+    InvalidSeriesQuery,
+    SeriesWindow,
+    build_series_flux,
+    lttb,
+)
+from app.services.spill_log import SpillLog
+from app.services.tenancy import BucketRouter, TagPolicy, parse_assignments
+from influxdb_client import InfluxDBClient, WritePrecision
 from influxdb_client.client.write_api import SYNCHRONOUS
 from jose import jwt, JWTError
 import os
+import asyncio
+import json
 import logging
+import math
+import time
 import xml.etree.ElementTree as ET
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
 router = APIRouter()
 logger = logging.getLogger("biometric_jwt")
@@ -20,6 +68,135 @@ INFLUX_BUCKET = os.getenv("INFLUX_BUCKET", "biometria")
 if not INFLUX_TOKEN:
     raise RuntimeError("INFLUX_TOKEN no definido en el entorno")
 
+# Buckets propios por organización ("org-a=biometria_a,org-b=biometria_b");
+# el resto de organizaciones escribe en INFLUX_BUCKET
+try:
+    INFLUX_ORG_BUCKETS = parse_assignments(os.getenv("INFLUX_ORG_BUCKETS", ""))
+except ValueError as e:
+    raise RuntimeError(f"INFLUX_ORG_BUCKETS inválido: {e}")
+
+# Pipeline de escritura por lotes
+INFLUX_BATCH_SIZE = int(os.getenv("INFLUX_BATCH_SIZE", "500"))
+INFLUX_FLUSH_INTERVAL_MS = int(os.getenv("INFLUX_FLUSH_INTERVAL_MS", "1000"))
+INFLUX_QUEUE_MAX = int(os.getenv("INFLUX_QUEUE_MAX", "20000"))
+INFLUX_MAX_RETRIES = int(os.getenv("INFLUX_MAX_RETRIES", "5"))
+INFLUX_RETRY_BASE_MS = int(os.getenv("INFLUX_RETRY_BASE_MS", "200"))
+INFLUX_RETRY_MAX_MS = int(os.getenv("INFLUX_RETRY_MAX_MS", "10000"))
+INFLUX_TIMEOUT_MS = int(os.getenv("INFLUX_TIMEOUT_MS", "10000"))
+# Sonda periódica de salud de InfluxDB
+INFLUX_HEALTH_INTERVAL_S = float(os.getenv("INFLUX_HEALTH_INTERVAL_S", "15"))
+INFLUX_HEALTH_TIMEOUT_S = float(os.getenv("INFLUX_HEALTH_TIMEOUT_S", "5"))
+
+# Precisión de los timestamps escritos (s, ms, us, ns). Una precisión más
+# gruesa comprime mucho mejor las series en InfluxDB.
+_WRITE_PRECISIONS = {
+    "s": WritePrecision.S,
+    "ms": WritePrecision.MS,
+    "us": WritePrecision.US,
+    "ns": WritePrecision.NS,
+}
+INFLUX_WRITE_PRECISION_NAME = os.getenv("INFLUX_WRITE_PRECISION", "s").lower()
+if INFLUX_WRITE_PRECISION_NAME not in _WRITE_PRECISIONS:
+    raise RuntimeError(f"INFLUX_WRITE_PRECISION inválido: {INFLUX_WRITE_PRECISION_NAME} (use s, ms, us o ns)")
+INFLUX_WRITE_PRECISION = _WRITE_PRECISIONS[INFLUX_WRITE_PRECISION_NAME]
+
+# Tolerancia para relojes de dispositivos adelantados
+MAX_FUTURE_SKEW = timedelta(seconds=int(os.getenv("MAX_FUTURE_SKEW_S", "300")))
+# Antigüedad máxima de una muestra: por defecto la retención del bucket, ya
+# que InfluxDB no admite puntos anteriores a ella (rechazaría el lote entero)
+INFLUX_RETENTION_DAYS = int(os.getenv("INFLUX_RETENTION_DAYS", "30"))
+MAX_PAST_AGE = timedelta(seconds=int(os.getenv("MAX_PAST_AGE_S", str(INFLUX_RETENTION_DAYS * 86400))))
+
+# Spill log local para cuando InfluxDB no está disponible
+SPILL_ENABLED = os.getenv("SPILL_ENABLED", "true").lower() in ("1", "true", "yes")
+SPILL_DIR = os.getenv("SPILL_DIR", "spill")
+SPILL_SEGMENT_MAX_MB = int(os.getenv("SPILL_SEGMENT_MAX_MB", "16"))
+SPILL_MAX_TOTAL_MB = int(os.getenv("SPILL_MAX_TOTAL_MB", "512"))
+SPILL_REPLAY_BATCH = int(os.getenv("SPILL_REPLAY_BATCH", "5000"))
+SPILL_REPLAY_INTERVAL_S = float(os.getenv("SPILL_REPLAY_INTERVAL_S", "5"))
+SPILL_FSYNC = os.getenv("SPILL_FSYNC", "false").lower() in ("1", "true", "yes")
+
+# Ingesta masiva
+BULK_MAX_READINGS = int(os.getenv("BULK_MAX_READINGS", "5000"))
+
+# Elemento que delimita cada lectura en los documentos XML
+XML_RECORD_TAG = "BiometricData"
+
+# Canal WebSocket: confirmación por ventanas de lecturas
+WS_ACK_WINDOW = int(os.getenv("WS_ACK_WINDOW", "100"))
+WS_ACK_INTERVAL_MS = int(os.getenv("WS_ACK_INTERVAL_MS", "250"))
+
+# Límite del cuerpo ya descomprimido (protección frente a bombas de compresión)
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_MB", "64")) * 1024 * 1024
+
+JSON_CONTENT_TYPES = ("application/json", "text/json", "")
+XML_CONTENT_TYPES = ("application/xml", "text/xml", "application/xhtml+xml")
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# Consultas de series: presupuesto de puntos por campo y rango por defecto/máximo
+QUERY_DEFAULT_POINTS = int(os.getenv("QUERY_DEFAULT_POINTS", "1000"))
+QUERY_MAX_POINTS = int(os.getenv("QUERY_MAX_POINTS", "5000"))
+QUERY_DEFAULT_RANGE = timedelta(seconds=int(os.getenv("QUERY_DEFAULT_RANGE_S", "3600")))
+QUERY_MAX_RANGE = timedelta(days=int(os.getenv("QUERY_MAX_RANGE_DAYS", "90")))
+# Candidatos por punto final que InfluxDB preselecciona para LTTB
+QUERY_LTTB_OVERSAMPLE = int(os.getenv("QUERY_LTTB_OVERSAMPLE", "4"))
+# Roles del token que pueden consultar series de cualquier trabajador,
+# dispositivo o sede de su organización; el resto solo las suyas
+SERIES_READ_ROLES = frozenset(
+    role.strip().lower() for role in os.getenv("SERIES_READ_ROLES", "admin,manager").split(",") if role.strip()
+)
+
+# Caché de respuestas de series (ventanas recientes caducan antes)
+QUERY_CACHE_MAX = int(os.getenv("QUERY_CACHE_MAX", "512"))
+QUERY_CACHE_MAX_MB = int(os.getenv("QUERY_CACHE_MAX_MB", "64"))
+QUERY_CACHE_HOT_TTL_S = float(os.getenv("QUERY_CACHE_HOT_TTL_S", "15"))
+QUERY_CACHE_COLD_TTL_S = float(os.getenv("QUERY_CACHE_COLD_TTL_S", "600"))
+
+# Descarte de reenvíos: ventana y capacidad de claves de idempotencia recordadas
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+DEDUP_WINDOW_S = float(os.getenv("DEDUP_WINDOW_S", "900"))
+DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "200000"))
+
+# Límites de ingesta por token bucket (lecturas/s y ráfaga); 0 desactiva el ámbito
+RATE_LIMIT_DEVICE_PER_S = float(os.getenv("RATE_LIMIT_DEVICE_PER_S", "20"))
+RATE_LIMIT_DEVICE_BURST = float(os.getenv("RATE_LIMIT_DEVICE_BURST", "200"))
+RATE_LIMIT_ORG_PER_S = float(os.getenv("RATE_LIMIT_ORG_PER_S", "2000"))
+RATE_LIMIT_ORG_BURST = float(os.getenv("RATE_LIMIT_ORG_BURST", "20000"))
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+# Compartir los buckets entre réplicas a través de Redis (mismas variables que cms-backend)
+RATE_LIMIT_REDIS = os.getenv("RATE_LIMIT_REDIS", "false").lower() in ("1", "true", "yes")
+REDIS_HOST = os.getenv("REDIS_HOST")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
+
+# Rollups diarios a PostgreSQL (daily_employee_metrics); desactivados sin DSN
+ROLLUP_PG_DSN = os.getenv("ROLLUP_PG_DSN")
+ROLLUP_FLUSH_INTERVAL_S = float(os.getenv("ROLLUP_FLUSH_INTERVAL_S", "60"))
+ROLLUP_MAX_KEYS = int(os.getenv("ROLLUP_MAX_KEYS", "200000"))
+
+# Pre-agregación en el borde por medición ("env_air=60,env_ambient=60":
+# media/min/max/count por ventana de N segundos); sin valor todo va en crudo
+try:
+    PREAGG_WINDOWS = parse_window_spec(os.getenv("PREAGG_WINDOWS", ""))
+except ValueError as e:
+    raise RuntimeError(f"PREAGG_WINDOWS inválido: {e}")
+PREAGG_GRACE_S = float(os.getenv("PREAGG_GRACE_S", "10"))
+PREAGG_RETAIN_S = float(os.getenv("PREAGG_RETAIN_S", "600"))
+PREAGG_MAX_WINDOWS = int(os.getenv("PREAGG_MAX_WINDOWS", "200000"))
+
+# Máximo de tag sets pre-escapados en caché (uno por dispositivo/usuario)
+TAG_CACHE_MAX = int(os.getenv("TAG_CACHE_MAX", "10000"))
+
+# Política de tags de alta cardinalidad ("user_email=drop,worker_id=hash")
+try:
+    TAG_POLICY = TagPolicy(parse_assignments(os.getenv("TAG_POLICY", "")), salt=os.getenv("TAG_HASH_SALT", ""))
+except ValueError as e:
+    raise RuntimeError(f"TAG_POLICY inválido: {e}")
+
+# Cardinalidad estimada (HyperLogLog) de tag sets por organización
+CARDINALITY_MAX_ORGS = int(os.getenv("CARDINALITY_MAX_ORGS", "1000"))
+CARDINALITY_WARN_TAG_SETS = int(os.getenv("CARDINALITY_WARN_TAG_SETS", "100000"))
+
 # JWT config (must match cms-backend JWT_* config)
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_REFRESH_SECRET = os.getenv("JWT_REFRESH_SECRET") or JWT_SECRET
@@ -28,17 +205,232 @@ JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 if not JWT_SECRET:
     raise RuntimeError("JWT_SECRET no definido en el entorno para biometric-microservice")
 
-# Cliente InfluxDB
-client = InfluxDBClient(url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG)
-write_api = client.write_api(write_options=SYNCHRONOUS)
+# Caché de tokens ya verificados (ver JWTVerificationCache)
+JWT_CACHE_MAX = int(os.getenv("JWT_CACHE_MAX", "10000"))
+JWT_CACHE_MAX_TTL_S = float(os.getenv("JWT_CACHE_MAX_TTL_S", "300"))
+jwt_cache = JWTVerificationCache(max_entries=JWT_CACHE_MAX, max_ttl=JWT_CACHE_MAX_TTL_S)
 
-# Test de conexión al iniciar el router
-try:
+# Cliente InfluxDB: se crea en start_pipeline() y se cierra en stop_pipeline(),
+# nunca al importar el módulo
+client: Optional[InfluxDBClient] = None
+write_api = None
+query_api = None
+
+# Hilo dedicado a las escrituras del BatchWriter: una escritura lenta o en
+# reintento no ocupa el threadpool que usan las consultas y los handlers
+influx_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="influx-writer")
+
+
+bucket_router = BucketRouter(INFLUX_BUCKET, INFLUX_ORG_BUCKETS)
+
+
+def _write_batch(records: list) -> None:
+    """
+    Escritura bloqueante de un lote, una escritura por bucket de destino; la
+    ejecuta el BatchWriter en su hilo (y el replay del spill log).
+
+    Si falla un bucket después de escribir otros, el lote completo se
+    reintenta: reescribir los mismos puntos es idempotente.
+    """
+    if write_api is None:
+        raise RuntimeError("Cliente InfluxDB no iniciado")
+    for bucket, bucket_records in bucket_router.split(records).items():
+        write_api.write(
+            bucket=bucket,
+            org=INFLUX_ORG,
+            record=bucket_records,
+            write_precision=INFLUX_WRITE_PRECISION,
+        )
+        bucket_router.written(bucket, bucket_records)
+
+
+def _line_count(record: bytes) -> int:
+    """
+    Número de puntos de un bloque de line protocol (una línea por punto).
+    """
+    return record.count(b"\n") + 1
+
+
+series_cardinality = SeriesCardinality(max_orgs=CARDINALITY_MAX_ORGS, warn_threshold=CARDINALITY_WARN_TAG_SETS)
+
+# Tag sets pre-escapados por identidad de dispositivo
+tag_cache = TagSetCache(
+    max_entries=TAG_CACHE_MAX,
+    transform_tags=TAG_POLICY.apply if TAG_POLICY else None,
+    on_new_tag_set=series_cardinality.observe,
+)
+
+
+spill_log: Optional[SpillLog] = None
+if SPILL_ENABLED:
+    spill_log = SpillLog(
+        SPILL_DIR,
+        segment_max_bytes=SPILL_SEGMENT_MAX_MB * 1024 * 1024,
+        max_total_bytes=SPILL_MAX_TOTAL_MB * 1024 * 1024,
+        replay_batch_lines=SPILL_REPLAY_BATCH,
+        replay_interval=SPILL_REPLAY_INTERVAL_S,
+        fsync=SPILL_FSYNC,
+    )
+
+
+async def _spill_batch(records: list, exc: Optional[Exception]) -> None:
+    """
+    Desvía al spill log en disco un lote que InfluxDB no pudo aceptar.
+    """
+    await asyncio.to_thread(spill_log.append, records)
+
+
+writer = BatchWriter(
+    _write_batch,
+    max_queue=INFLUX_QUEUE_MAX,
+    batch_size=INFLUX_BATCH_SIZE,
+    flush_interval=INFLUX_FLUSH_INTERVAL_MS / 1000.0,
+    max_retries=INFLUX_MAX_RETRIES,
+    retry_base_delay=INFLUX_RETRY_BASE_MS / 1000.0,
+    retry_max_delay=INFLUX_RETRY_MAX_MS / 1000.0,
+    on_failure=_spill_batch if spill_log is not None else None,
+    record_size=_line_count,
+    executor=influx_executor,
+)
+
+replay_window: Optional[ReplayWindow] = None
+if DEDUP_ENABLED:
+    replay_window = ReplayWindow(window_s=DEDUP_WINDOW_S, max_entries=DEDUP_MAX_ENTRIES)
+
+limiter = TokenBucketLimiter(
+    device_rate=RATE_LIMIT_DEVICE_PER_S,
+    device_burst=RATE_LIMIT_DEVICE_BURST,
+    org_rate=RATE_LIMIT_ORG_PER_S,
+    org_burst=RATE_LIMIT_ORG_BURST,
+    max_buckets=RATE_LIMIT_MAX_BUCKETS,
+    redis_client=redis_client_from_env(REDIS_HOST, REDIS_PORT, REDIS_PASSWORD) if RATE_LIMIT_REDIS else None,
+)
+
+rollups: Optional[RollupAggregator] = None
+if ROLLUP_PG_DSN:
+    rollups = RollupAggregator(
+        ROLLUP_PG_DSN,
+        flush_interval=ROLLUP_FLUSH_INTERVAL_S,
+        max_keys=ROLLUP_MAX_KEYS,
+    )
+
+preaggregator: Optional[EdgePreAggregator] = None
+if PREAGG_WINDOWS:
+    preaggregator = EdgePreAggregator(
+        PREAGG_WINDOWS,
+        emit=lambda lines: writer.enqueue([lines]),
+        precision=INFLUX_WRITE_PRECISION_NAME,
+        grace=PREAGG_GRACE_S,
+        retain=PREAGG_RETAIN_S,
+        max_windows=PREAGG_MAX_WINDOWS,
+    )
+# Mediciones que no se escriben en crudo sino pre-agregadas
+PREAGG_DIVERT = preaggregator.measurement_indices if preaggregator is not None else frozenset()
+
+
+def _check_influx() -> Optional[str]:
     health = client.health()
     if health.status != "pass":
-        raise RuntimeError(f"InfluxDB no saludable: {health.message}")
-except Exception as e:
-    raise RuntimeError(f"No se pudo conectar a InfluxDB: {e}")
+        return health.message or str(health.status)
+    return None
+
+
+def _on_influx_healthy() -> None:
+    # Con backlog en disco la recuperación la marca el replay, para que los
+    # puntos nuevos no adelanten a los pendientes
+    if spill_log is None or not spill_log.backlog_bytes:
+        writer.recover()
+
+
+# Si InfluxDB no responde el servicio sigue en modo degradado (spill log) en
+# lugar de fallar, y sale de él cuando la sonda vuelve a verlo sano.
+influx_health = HealthProbe(
+    "InfluxDB",
+    _check_influx,
+    interval=INFLUX_HEALTH_INTERVAL_S,
+    timeout=INFLUX_HEALTH_TIMEOUT_S,
+    on_unhealthy=writer.mark_degraded,
+    on_healthy=_on_influx_healthy,
+)
+
+
+async def start_pipeline() -> None:
+    global client, write_api, query_api
+    client = InfluxDBClient(url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG, timeout=INFLUX_TIMEOUT_MS)
+    write_api = client.write_api(write_options=SYNCHRONOUS)
+    query_api = client.query_api()
+
+    await writer.start()
+    if spill_log is not None:
+        spill_log.start_replayer(_write_batch, on_recovered=writer.recover)
+    if rollups is not None:
+        await rollups.start()
+    if preaggregator is not None:
+        preaggregator.start()
+    influx_health.start()
+
+
+async def stop_pipeline() -> None:
+    global client, write_api, query_api
+    await influx_health.stop()
+    if preaggregator is not None:
+        # Las ventanas abiertas se emiten parciales antes de vaciar la cola
+        await preaggregator.stop()
+    # Volcar lo que quede en cola antes de cerrar
+    await writer.stop()
+    if spill_log is not None:
+        await spill_log.stop()
+    if rollups is not None:
+        await rollups.stop()
+
+    if client is not None:
+        client.close()
+    client = write_api = query_api = None
+
+
+@contextmanager
+def _payload_errors() -> Iterator[None]:
+    """
+    Traduce los errores de descompresión y decodificación binaria a HTTP.
+    """
+    try:
+        yield
+    except UnsupportedEncoding as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except CorruptPayload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _iter_body(request: Request) -> AsyncIterator[bytes]:
+    """
+    Recorre el cuerpo de la petición a medida que llega por la red,
+    descomprimido según su Content-Encoding (identity, gzip o zstd).
+    """
+    with _payload_errors():
+        decoder = BodyDecoder(request.headers.get("content-encoding"), MAX_BODY_BYTES)
+        async for chunk in request.stream():
+            for data in decoder.feed(chunk):
+                yield data
+        for data in decoder.finish():
+            yield data
+
+
+async def _read_body(request: Request) -> bytes:
+    return b"".join([chunk async for chunk in _iter_body(request)])
+
+
+async def _iter_msgpack_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """
+    Recorre las lecturas MessagePack (claves por nombre o por ID de campo).
+    """
+    with _payload_errors():
+        stream = MsgpackRecordStream(MAX_BODY_BYTES)
+        async for chunk in chunks:
+            for record in stream.feed(chunk):
+                yield record
+        stream.finish()
 
 
 def _parse_xml_body(raw: bytes) -> Dict[str, Any]:
@@ -64,7 +456,18 @@ def _parse_xml_body(raw: bytes) -> Dict[str, Any]:
     return data
 
 
-def _validate_jwt(request: Request) -> Dict[str, Any]:
+def _decode_access_token(token: str) -> Dict[str, Any]:
+    # cms-backend firma el token con sub=int; python-jose espera string por RFC.
+    # Desactivamos verify_sub para aceptar este payload.
+    return jwt.decode(
+        token,
+        JWT_SECRET,
+        algorithms=[JWT_ALGORITHM],
+        options={"verify_sub": False},
+    )
+
+
+def _validate_jwt(request: HTTPConnection) -> Dict[str, Any]:
     """
     Extrae y valida el JWT del header Authorization: Bearer <token>.
     Debe ser el mismo token emitido por cms-backend (mismo JWT_SECRET/algoritmo).
@@ -85,14 +488,9 @@ def _validate_jwt(request: Request) -> Dict[str, Any]:
         raise HTTPException(status_code=401, detail="X-Refresh-Token requerido")
 
     try:
-        # cms-backend firma el token con sub=int; python-jose espera string por RFC.
-        # Desactivamos verify_sub para aceptar este payload.
-        access_payload = jwt.decode(
-            access_token,
-            JWT_SECRET,
-            algorithms=[JWT_ALGORITHM],
-            options={"verify_sub": False},
-        )
+        # La firma se verifica una vez por token; las peticiones siguientes con
+        # el mismo token reutilizan el payload hasta su `exp`.
+        access_payload = jwt_cache.verify(access_token, _decode_access_token)
     except JWTError as e:
         logger.warning(f"JWT access token decode failed: {e}")
         raise HTTPException(status_code=401, detail=f"Token de acceso JWT inválido: {e}")
@@ -101,215 +499,854 @@ def _validate_jwt(request: Request) -> Dict[str, Any]:
     return access_payload
 
 
-def _build_common_tags(data: BiometricData) -> Dict[str, str]:
-    """
-    Construye el conjunto estándar de tags usados en todas las mediciones.
+def _sample_time(data: BiometricData) -> datetime:
     """
-    tags: Dict[str, str] = {}
-
-    if data.org_id:
-        tags["org_id"] = str(data.org_id)
-
-    # worker_id es el user_id de la plataforma
-    if data.user_id is not None:
-        tags["worker_id"] = str(data.user_id)
-    elif data.user_email:
-        tags["worker_id"] = data.user_email  # fallback legible
+    Devuelve el instante de la muestra en UTC.
+    Lanza HTTPException(400) si el dispositivo envía un instante futuro o
+    más antiguo que MAX_PAST_AGE.
+    """
+    now = datetime.now(timezone.utc)
+    if data.timestamp is None:
+        return now
 
-    tags["device_id"] = data.device_id
-
-    # Extra: mantener user_email separado si existe
-    if data.user_email:
-        tags["user_email"] = data.user_email
-
-    return tags
+    ts = data.timestamp
+    if ts.tzinfo is None:
+        # Sin zona horaria se interpreta como UTC
+        ts = ts.replace(tzinfo=timezone.utc)
+    if ts - now > MAX_FUTURE_SKEW:
+        raise HTTPException(status_code=400, detail=f"timestamp en el futuro: {ts.isoformat()}")
+    if now - ts > MAX_PAST_AGE:
+        raise HTTPException(status_code=400, detail=f"timestamp demasiado antiguo: {ts.isoformat()}")
+    return ts
 
 
-def _write_wearable_biometrics(data: BiometricData) -> Optional[Point]:
+def _validate_reading(body: Any) -> BiometricData:
     """
-    Crea un Point de InfluxDB para la medición wearable_biometrics.
-    Devuelve el Point o None si no hay datos biométricos continuos.
+    Valida una lectura cruda con el modelo Pydantic.
+    Lanza HTTPException(400) con el mismo mensaje que el endpoint individual.
     """
-    if (
-        data.heart_rate is None
-        and data.hrv is None
-        and data.hrv_sdnn_ms is None
-        and data.eda_microsiemens is None
-        and data.temperature is None
-        and data.resp_rate is None
-        and data.spo2_pct is None
-    ):
-        return None
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Payload inválido: se esperaba un objeto JSON")
 
-    tags = _build_common_tags(data)
-    p = Point("wearable_biometrics")
-    for k, v in tags.items():
-        p = p.tag(k, v)
+    try:
+        return BiometricData(**body)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Payload inválido: {e}")
 
-    # Mapear campos según el diseño
-    if data.heart_rate is not None:
-        p = p.field("hr_bpm", int(data.heart_rate))
-    if data.hrv is not None:
-        p = p.field("hrv_rmssd_ms", float(data.hrv))
-    if data.hrv_sdnn_ms is not None:
-        p = p.field("hrv_sdnn_ms", float(data.hrv_sdnn_ms))
-    if data.eda_microsiemens is not None:
-        p = p.field("eda_microsiemens", float(data.eda_microsiemens))
-    if data.temperature is not None:
-        p = p.field("skin_temp_c", float(data.temperature))
-    if data.resp_rate is not None:
-        p = p.field("resp_rate_bpm", float(data.resp_rate))
-    if data.spo2_pct is not None:
-        p = p.field("spo2_pct", float(data.spo2_pct))
 
-    return p
+def _encode_reading(
+    body: Any,
+    out: bytearray,
+    text_values: bool = False,
+    samples: Optional[List[Tuple[Optional[int], int, Dict[str, Any]]]] = None,
+    diverted: Optional[List[DivertedMeasurement]] = None,
+) -> int:
+    """
+    Añade a `out` las líneas de line protocol de una lectura cruda (una por
+    medición presente: wearable_biometrics, sleep_summary, env_air,
+    env_ambient) y devuelve cuántos puntos aceptó.
 
+    Las lecturas canónicas se decodifican directamente sin Pydantic; con
+    `text_values` (registros XML) los textos numéricos se convierten antes.
+    Cualquier otra (strings a convertir, valores inválidos) pasa por la
+    validación completa del payload original para conservar los mismos
+    errores. Si la lectura se rechaza, `out` queda intacto.
 
-def _write_sleep_summary(data: BiometricData) -> Optional[Point]:
+    Con rollups activos, cada lectura aceptada se añade a `samples` para
+    acumularla cuando se haya encolado (ver _observe_rollups). Con
+    `diverted`, las mediciones pre-agregadas se añaden ahí en lugar de a `out`.
     """
-    Crea un Point de InfluxDB para la medición sleep_summary.
-    Devuelve el Point o None si no hay datos de sueño.
+    track = rollups is not None and samples is not None
+    divert = PREAGG_DIVERT if diverted is not None else frozenset()
+    now_ns = time.time_ns()
+    try:
+        fast_body = coerce_text_record(body) if text_values and isinstance(body, dict) else body
+        count = decode_reading(
+            fast_body, out, tag_cache, INFLUX_WRITE_PRECISION_NAME, now_ns, MAX_FUTURE_SKEW, MAX_PAST_AGE,
+            divert, diverted,
+        )
+        if track:
+            samples.append((fast_body.get("user_id"), reading_timestamp_ns(fast_body, now_ns), fast_body))
+        return count
+    except FastPathUnsupported:
+        pass
+
+    data = _validate_reading(body)
+
+    # Marca de tiempo de la muestra: la del dispositivo si la envía o, si no,
+    # la de llegada. Se fija al encolar para que las lecturas que viajan en el
+    # mismo lote no colapsen en el mismo instante de escritura.
+    timestamp = _sample_time(data)
+    count = encode_model(
+        data, out, tag_cache, INFLUX_WRITE_PRECISION_NAME, datetime_to_ns(timestamp), divert, diverted
+    )
+    if not count:
+        # Nada que guardar: probablemente payload incompleto
+        raise HTTPException(status_code=400, detail="Payload sin datos biométricos ni de sueño reconocibles")
+    if track:
+        samples.append((data.user_id, datetime_to_ns(timestamp), data.model_dump(include=set(ROLLUP_METRICS))))
+    return count
+
+
+class _PendingLines:
+    """
+    Lecturas aceptadas de una petición (o ventana WebSocket) pendientes de
+    encolar: sus líneas en un único buffer, las mediciones a pre-agregar,
+    los tokens que consumen de cada límite, las muestras para los rollups y
+    sus claves de idempotencia.
+
+    `org_id` es la organización del token verificado: el límite por
+    organización se cobra a ella y no a la que declare cada lectura.
     """
-    if (
-        data.total_sleep_s is None
-        and data.sleep_efficiency_pct is None
-        and data.sleep_latency_s is None
-        and data.sleep_score is None
-        and data.awakening_count is None
-        and data.time_in_bed_s is None
-    ):
-        return None
 
-    tags = _build_common_tags(data)
-    p = Point("sleep_summary")
-    for k, v in tags.items():
-        p = p.tag(k, v)
+    def __init__(self, org_id: Any = None):
+        self.org_id = org_id
+        self.out = bytearray()
+        self.points = 0
+        self.duplicates = 0
+        self.costs: Dict[Tuple[str, str], int] = {}
+        self.samples: List[Tuple[Optional[int], int, Dict[str, Any]]] = []
+        self.diverted: List[DivertedMeasurement] = []
+        self.keys: List[bytes] = []
+
+    def add(self, body: Any, text_values: bool = False) -> int:
+        """
+        Codifica una lectura (ver _encode_reading) y devuelve sus puntos.
+
+        Un reenvío de una lectura ya encolada (o repetida en la misma
+        petición) se descarta sin error y devuelve 0; no consume límite ni
+        cuenta en los rollups.
+        """
+        start = len(self.out)
+        samples_start = len(self.samples)
+        diverted_start = len(self.diverted)
+        count = _encode_reading(body, self.out, text_values, self.samples, self.diverted)
+
+        if replay_window is not None:
+            lines = bytes(self.out[start:]).lstrip(b"\n")
+            for measurement_index, tag_set, timestamp_ns, fields in self.diverted[diverted_start:]:
+                lines += b"\n%d%s %s %d" % (measurement_index, tag_set, ",".join(fields).encode("utf-8"), timestamp_ns)
+            key = ReplayWindow.key(body.get("device_id"), body.get("seq"), body.get("timestamp"), lines)
+            if key is not None:
+                if key in self.keys or replay_window.seen(key):
+                    del self.out[start:]
+                    del self.samples[samples_start:]
+                    del self.diverted[diverted_start:]
+                    self.duplicates += 1
+                    return 0
+                self.keys.append(key)
+
+        self.points += count
+        limiter.charge(self.costs, body.get("device_id"), self.org_id)
+        return count
 
-    if data.sleep_score is not None:
-        p = p.field("sleep_score", float(data.sleep_score))
-    if data.total_sleep_s is not None:
-        p = p.field("total_sleep_s", int(data.total_sleep_s))
-    if data.sleep_efficiency_pct is not None:
-        p = p.field("sleep_efficiency_pct", float(data.sleep_efficiency_pct))
-    if data.sleep_latency_s is not None:
-        p = p.field("sleep_latency_s", int(data.sleep_latency_s))
-    if data.awakening_count is not None:
-        p = p.field("awakening_count", int(data.awakening_count))
-    if data.time_in_bed_s is not None:
-        # Campo adicional útil aunque no estaba en el diseño original
-        p = p.field("time_in_bed_s", int(data.time_in_bed_s))
 
-    return p
+def _queue_retry_after() -> int:
+    """
+    Segundos estimados hasta que el writer drene la cola actual.
+    """
+    flush_s = (writer.stats["last_flush_ms"] or 0) / 1000.0 or writer.flush_interval
+    return max(1, math.ceil(writer.queue_depth / max(1, writer.batch_size) * flush_s))
 
 
-def _write_env_air(data: BiometricData) -> Optional[Point]:
+async def _enqueue_pending(pending: _PendingLines) -> None:
+    """
+    Aplica los límites de ingesta y encola todas las líneas como un único
+    bloque. Lanza HTTPException(429) con Retry-After si un dispositivo u
+    organización supera su límite o si la cola de escritura está llena; en
+    ambos casos no se encola nada y el cliente debe reenviar la petición.
+
+    Los rollups y las claves de idempotencia se registran solo tras
+    encolar: una lectura rechazada que el cliente reenvía no debe contar ni
+    descartarse como duplicada. Por lo mismo, la capacidad de la cola se
+    comprueba antes de descontar límites y, si se llena mientras tanto, los
+    tokens se devuelven.
     """
-    Create an InfluxDB Point for environmental air quality (env_air).
-    Uses tags: org_id, site, zone, device_id (sensor_id), model (if provided).
-    Fields: co2_ppm, pm25_ugm3, temp_c
-    """
-    if data.co2_ppm is None and data.pm25_ugm3 is None and data.temp_c is None:
-        return None
-
-    tags = _build_common_tags(data)
-    p = Point("env_air")
-    for k, v in tags.items():
-        p = p.tag(k, v)
+    if not pending.points:
+        return
 
-    if data.co2_ppm is not None:
-        p = p.field("co2_ppm", float(data.co2_ppm))
-    if data.pm25_ugm3 is not None:
-        p = p.field("pm25_ugm3", float(data.pm25_ugm3))
-    if data.temp_c is not None:
-        p = p.field("temp_c", float(data.temp_c))
-
-    return p
-
-
-def _write_env_ambient(data: BiometricData) -> Optional[Point]:
-    """
-    Create an InfluxDB Point for ambient noise/light (env_ambient).
-    Uses tags: org_id, site, zone, device_id (sensor_id), model (if provided).
-    Fields: noise_db, light_lux
-    """
-    if data.noise_db is None and data.light_lux is None:
-        return None
-
-    tags = _build_common_tags(data)
-    p = Point("env_ambient")
-    for k, v in tags.items():
-        p = p.tag(k, v)
-
-    if data.noise_db is not None:
-        p = p.field("noise_db", float(data.noise_db))
-    if data.light_lux is not None:
-        p = p.field("light_lux", float(data.light_lux))
-
-    return p
+    def _queue_full(reason: Any) -> HTTPException:
+        return HTTPException(
+            status_code=429,
+            detail=f"Ingesta saturada, reintente más tarde: {reason}",
+            headers={"Retry-After": str(_queue_retry_after())},
+        )
+
+    lines = _line_count(pending.out) if pending.out else 0
+    if not writer.has_room(lines):
+        writer.stats["rejected"] += lines
+        raise _queue_full(f"Cola de escritura llena ({writer.queue_depth}/{writer.max_queue})")
+    try:
+        await limiter.acquire(pending.costs)
+    except RateLimited as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+    try:
+        if pending.out:
+            writer.enqueue([bytes(pending.out)])
+    except WriteQueueFull as e:
+        await limiter.refund(pending.costs)
+        raise _queue_full(e)
+    if replay_window is not None:
+        replay_window.remember(pending.keys)
+    if preaggregator is not None and pending.diverted:
+        preaggregator.add(pending.diverted)
+    if rollups is not None:
+        for user_id, timestamp_ns, values in pending.samples:
+            rollups.observe(user_id, timestamp_ns, values)
 
 
 @router.post("/biometric")
 async def send_biometric(request: Request):
     """
-    Endpoint bilingüe y securizado con JWT:
+    Endpoint multiformato y securizado con JWT:
     - JSON (application/json)
     - XML (application/xml)
+    - MessagePack (application/msgpack), con claves por nombre o por ID de campo
+
+    El cuerpo puede enviarse comprimido (Content-Encoding: gzip o zstd).
+
+    Las lecturas con `seq` o `timestamp` propio son idempotentes: un reenvío
+    tras un timeout responde status "duplicate" sin volver a escribirse.
 
     Requiere Authorization: Bearer <jwt> emitido por cms-backend.
-    Persiste los datos en InfluxDB usando las mediciones:
+    Encola los puntos en el pipeline de escritura por lotes hacia InfluxDB
+    usando las mediciones:
     - wearable_biometrics
     - sleep_summary
+    - env_air
+    - env_ambient
+
+    Las mediciones configuradas en PREAGG_WINDOWS no se escriben por
+    lectura sino como media/min/max/count de cada ventana.
     """
     # 1) Validar JWT entre app móvil y microservicio biométrico
-    _ = _validate_jwt(request)
+    claims = _validate_jwt(request)
 
-    # 2) Parsear cuerpo (JSON o XML)
+    # 2) Parsear cuerpo (JSON, XML o MessagePack; opcionalmente comprimido)
     content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
 
-    if content_type in ("application/json", "text/json", ""):
-        body = await request.json()
+    if content_type in JSON_CONTENT_TYPES:
+        body = json.loads(await _read_body(request))
         payload_format = "json"
-    elif content_type in ("application/xml", "text/xml", "application/xhtml+xml"):
-        raw = await request.body()
+    elif content_type in XML_CONTENT_TYPES:
+        raw = await _read_body(request)
         body = _parse_xml_body(raw)
         payload_format = "xml"
+    elif content_type in MSGPACK_CONTENT_TYPES:
+        records = [record async for record in _iter_msgpack_records(_iter_body(request))]
+        if len(records) != 1:
+            raise HTTPException(status_code=400, detail="Payload inválido: se esperaba una única lectura MessagePack")
+        body = records[0]
+        payload_format = "msgpack"
+    else:
+        raise HTTPException(status_code=415, detail=f"Tipo de contenido no soportado: {content_type}")
+
+    # 3) Validar y convertir a line protocol
+    pending = _PendingLines(claims.get("org_id"))
+    points_queued = pending.add(body, text_values=payload_format == "xml")
+
+    # 4) Aplicar límites y encolar en el pipeline de escritura
+    await _enqueue_pending(pending)
+
+    if pending.duplicates:
+        # Reenvío de una lectura ya encolada: éxito idempotente
+        return {"status": "duplicate", "format": payload_format, "points_queued": 0}
+    return {"status": "ok", "format": payload_format, "points_queued": points_queued}
+
+
+async def _iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Recorre un cuerpo NDJSON línea a línea a medida que llega por la red.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
+def _drain_xml_records(
+    parser: ET.XMLPullParser, open_elements: List[ET.Element]
+) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Extrae los registros <BiometricData> completos que el parser ya ha leído
+    y los libera del árbol en cuanto se convierten.
+    """
+    for event, elem in parser.read_events():
+        if event == "start":
+            open_elements.append(elem)
+            continue
+        open_elements.pop()
+        if elem.tag != XML_RECORD_TAG:
+            continue
+        record = {child.tag: child.text for child in elem}
+        if open_elements:
+            # El padre solo conserva el registro en curso: remove() es O(1)
+            open_elements[-1].remove(elem)
+        elem.clear()
+        yield record
+
+
+async def _iter_xml_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Optional[str]]]:
+    """
+    Recorre los registros <BiometricData> de un documento XML a medida que
+    llega por la red, sea un único registro o un documento con muchos:
+
+    <BiometricBatch>
+        <BiometricData>...</BiometricData>
+        <BiometricData>...</BiometricData>
+    </BiometricBatch>
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    open_elements: List[ET.Element] = []
+    try:
+        async for chunk in chunks:
+            parser.feed(chunk)
+            for record in _drain_xml_records(parser, open_elements):
+                yield record
+        parser.close()
+        for record in _drain_xml_records(parser, open_elements):
+            yield record
+    except ET.ParseError as e:
+        raise HTTPException(status_code=400, detail=f"XML malformado: {e}")
+
+
+@router.post("/biometric/bulk")
+async def send_biometric_bulk(request: Request):
+    """
+    Ingesta masiva de lecturas en una sola petición autenticada:
+    - JSON array (application/json)
+    - NDJSON en streaming (application/x-ndjson)
+    - XML en streaming con varios <BiometricData> (application/xml)
+    - MessagePack en streaming: secuencia o array de mapas (application/msgpack)
+
+    Todos los formatos admiten Content-Encoding gzip o zstd.
+
+    Cada lectura puede traer su propio `timestamp`. Las lecturas válidas se
+    escriben como un único lote; las inválidas se reportan en `errors` con su
+    índice sin hacer fallar el resto. Si el lote supera el límite de algún
+    dispositivo u organización, o la cola está llena, se responde 429 con
+    Retry-After y no se escribe ninguna.
+    """
+    claims = _validate_jwt(request)
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    # Todas las líneas de la petición se escriben en un único buffer
+    pending = _PendingLines(claims.get("org_id"))
+    errors: List[Dict[str, Any]] = []
+    received = 0
+
+    def _accept(index: int, item: Any, text_values: bool = False) -> None:
+        try:
+            pending.add(item, text_values)
+        except HTTPException as e:
+            errors.append({"index": index, "error": e.detail})
+
+    if content_type in JSON_CONTENT_TYPES:
+        raw = await _read_body(request)
+        try:
+            items = json.loads(raw)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"JSON malformado: {e}")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Se esperaba un array JSON de lecturas")
+        if len(items) > BULK_MAX_READINGS:
+            raise HTTPException(status_code=413, detail=f"Máximo {BULK_MAX_READINGS} lecturas por petición")
+        payload_format = "json"
+        for index, item in enumerate(items):
+            _accept(index, item)
+        received = len(items)
+    elif content_type in NDJSON_CONTENT_TYPES:
+        payload_format = "ndjson"
+        async for line in _iter_ndjson(_iter_body(request)):
+            if received >= BULK_MAX_READINGS:
+                raise HTTPException(status_code=413, detail=f"Máximo {BULK_MAX_READINGS} lecturas por petición")
+            index = received
+            received += 1
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                errors.append({"index": index, "error": f"JSON malformado: {e}"})
+                continue
+            _accept(index, item)
+    elif content_type in XML_CONTENT_TYPES:
+        payload_format = "xml"
+        async for record in _iter_xml_records(_iter_body(request)):
+            if received >= BULK_MAX_READINGS:
+                raise HTTPException(status_code=413, detail=f"Máximo {BULK_MAX_READINGS} lecturas por petición")
+            _accept(received, record, text_values=True)
+            received += 1
+    elif content_type in MSGPACK_CONTENT_TYPES:
+        payload_format = "msgpack"
+        async for record in _iter_msgpack_records(_iter_body(request)):
+            if received >= BULK_MAX_READINGS:
+                raise HTTPException(status_code=413, detail=f"Máximo {BULK_MAX_READINGS} lecturas por petición")
+            _accept(received, record)
+            received += 1
     else:
         raise HTTPException(status_code=415, detail=f"Tipo de contenido no soportado: {content_type}")
 
+    # Un lote que supera algún límite se rechaza entero (429) para que el
+    # cliente lo reenvíe tal cual tras Retry-After
+    await _enqueue_pending(pending)
+
+    accepted = received - len(errors)
+    return {
+        "status": "ok" if not errors else ("partial" if accepted else "rejected"),
+        "format": payload_format,
+        "received": received,
+        "accepted": accepted,
+        "rejected": len(errors),
+        "duplicates": pending.duplicates,
+        "points_queued": pending.points,
+        "errors": errors,
+    }
+
+
+ws_stats: Dict[str, int] = {
+    "connections": 0,
+    "active": 0,
+    "readings": 0,
+    "acks": 0,
+    "nacks": 0,
+}
+
+
+class _AckWindow:
+    """
+    Lecturas recibidas por un WebSocket desde el último ack.
+
+    Cada lectura recibe un número de secuencia consecutivo (desde 0) en el
+    orden de llegada; las lecturas válidas se acumulan en un _PendingLines
+    a cargo de la organización `org_id` del token.
+    """
+
+    def __init__(self, org_id: Any = None):
+        self.org_id = org_id
+        self.next_seq = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self.first_seq = self.next_seq
+        self.pending = _PendingLines(self.org_id)
+        self.errors: List[Dict[str, Any]] = []
+
+    @property
+    def size(self) -> int:
+        return self.next_seq - self.first_seq
+
+    def add(self, item: Any) -> None:
+        seq = self.next_seq
+        self.next_seq += 1
+        try:
+            self.pending.add(item)
+        except HTTPException as e:
+            self.errors.append({"seq": seq, "error": e.detail})
+
+    def reject(self, error: str) -> None:
+        self.errors.append({"seq": self.next_seq, "error": error})
+        self.next_seq += 1
+
+    async def flush(self) -> Optional[Dict[str, Any]]:
+        """
+        Encola las lecturas válidas de la ventana y devuelve el mensaje de
+        confirmación: `ack` si se encolaron o `nack` si se superó un límite o
+        la cola estaba llena (el dispositivo debe reenviar desde `first_seq`
+        tras `retry_after` segundos).
+        """
+        if not self.size:
+            return None
+        message: Dict[str, Any] = {"first_seq": self.first_seq, "last_seq": self.next_seq - 1}
+        try:
+            await _enqueue_pending(self.pending)
+        except HTTPException as e:
+            ws_stats["nacks"] += 1
+            message.update({
+                "type": "nack",
+                "error": e.detail,
+                "retry_after": int((e.headers or {}).get("Retry-After", 1)),
+            })
+        else:
+            ws_stats["acks"] += 1
+            ws_stats["readings"] += self.size
+            message.update({
+                "type": "ack",
+                "accepted": self.size - len(self.errors),
+                "duplicates": self.pending.duplicates,
+                "points_queued": self.pending.points,
+                "errors": self.errors,
+            })
+        self._reset()
+        return message
+
+
+def _ws_readings(message: Dict[str, Any]) -> List[Any]:
+    """
+    Lecturas de un mensaje WebSocket: texto JSON (objeto o array) o binario
+    MessagePack (mapa, secuencia o array de mapas, con IDs de campo).
+    Lanza ValueError si el mensaje no se puede decodificar.
+    """
+    if message.get("text") is not None:
+        try:
+            payload = json.loads(message["text"])
+        except ValueError as e:
+            raise ValueError(f"JSON malformado: {e}")
+        return payload if isinstance(payload, list) else [payload]
+
+    data = message.get("bytes") or b""
     try:
-        data = BiometricData(**body)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Payload inválido: {e}")
+        stream = MsgpackRecordStream(MAX_BODY_BYTES)
+        records = list(stream.feed(data))
+        stream.finish()
+    except (UnsupportedEncoding, CorruptPayload, PayloadTooLarge) as e:
+        raise ValueError(str(e))
+    return records
 
-    points: list[Point] = []
 
-    # 3) Medición wearable_biometrics (stream continuo)
-    biometrics_point = _write_wearable_biometrics(data)
-    if biometrics_point is not None:
-        points.append(biometrics_point)
+@router.websocket("/biometric/stream")
+async def stream_biometric(websocket: WebSocket):
+    """
+    Canal de ingesta continua para wearables.
 
-    # 4) Medición sleep_summary (resumen diario)
-    sleep_point = _write_sleep_summary(data)
-    if sleep_point is not None:
-        points.append(sleep_point)
+    El dispositivo se autentica una vez en el handshake con las mismas
+    cabeceras que los endpoints HTTP (Authorization: Bearer y
+    X-Refresh-Token) y después envía lecturas como mensajes de texto JSON o
+    binarios MessagePack, sueltas o en arrays.
 
-    # 5) Medición env_air (IoT air quality)
-    env_air_point = _write_env_air(data)
-    if env_air_point is not None:
-        points.append(env_air_point)
+    El servidor confirma por ventanas: cada WS_ACK_WINDOW lecturas o cada
+    WS_ACK_INTERVAL_MS responde con
+    {"type": "ack", "first_seq", "last_seq", "accepted", "points_queued", "errors"}
+    o, si la cola de escritura está llena, con
+    {"type": "nack", "first_seq", "last_seq", "error"} para que el
+    dispositivo reenvíe esa ventana. La conexión se cierra (1008) al caducar
+    el token.
+    """
+    try:
+        claims = _validate_jwt(websocket)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
 
-    # 6) Medición env_ambient (IoT ambient noise/light)
-    env_ambient_point = _write_env_ambient(data)
-    if env_ambient_point is not None:
-        points.append(env_ambient_point)
+    await websocket.accept()
+    ws_stats["connections"] += 1
+    ws_stats["active"] += 1
 
-    if not points:
-        # Nada que guardar: probablemente payload incompleto
-        raise HTTPException(status_code=400, detail="Payload sin datos biométricos ni de sueño reconocibles")
+    exp = claims.get("exp")
+    loop = asyncio.get_running_loop()
+    window = _AckWindow(claims.get("org_id"))
+    deadline: Optional[float] = None
+
+    async def _send_ack() -> None:
+        nonlocal deadline
+        deadline = None
+        message = await window.flush()
+        if message is not None:
+            await websocket.send_json(message)
 
     try:
-        write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=points)
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                message = await asyncio.wait_for(websocket.receive(), timeout)
+            except asyncio.TimeoutError:
+                await _send_ack()
+                continue
+
+            if message["type"] == "websocket.disconnect":
+                break
+
+            try:
+                readings = _ws_readings(message)
+            except ValueError as e:
+                window.reject(str(e))
+            else:
+                for item in readings:
+                    window.add(item)
+
+            if isinstance(exp, (int, float)) and time.time() > exp:
+                await _send_ack()
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Token de acceso JWT expirado")
+                break
+
+            if window.size >= WS_ACK_WINDOW:
+                await _send_ack()
+            elif deadline is None:
+                deadline = loop.time() + WS_ACK_INTERVAL_MS / 1000.0
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Lo ya validado se encola aunque el ack no llegue al dispositivo
+        await window.flush()
+        ws_stats["active"] -= 1
+
+
+# ---------------------------------------------------------------------------
+# Consultas de series con reducción en el servidor
+# ---------------------------------------------------------------------------
+
+series_cache = HotWindowCache(
+    max_entries=QUERY_CACHE_MAX,
+    max_bytes=QUERY_CACHE_MAX_MB * 1024 * 1024,
+    hot_ttl=QUERY_CACHE_HOT_TTL_S,
+    cold_ttl=QUERY_CACHE_COLD_TTL_S,
+)
+
+# Líneas NDJSON por trozo de respuesta
+_SERIES_CHUNK_LINES = 1000
+
+
+def _series_line(field: str, timestamp: datetime, value: Any) -> bytes:
+    return json.dumps({
+        "field": FIELD_KEYS.get(field, field),
+        "time": timestamp.astimezone(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "value": value,
+    }).encode("utf-8") + b"\n"
+
+
+def _series_records(flux: str, method: str, points: int) -> Iterator[Tuple[str, datetime, Any]]:
+    """
+    Ejecuta la consulta y devuelve (campo, instante, valor) a medida que
+    llegan las filas. Con LTTB se reúnen primero los candidatos de cada
+    campo (acotados por el paso fino) y se reducen a `points`.
+    """
+    if query_api is None:
+        raise RuntimeError("Cliente InfluxDB no iniciado")
+    records = query_api.query_stream(flux, org=INFLUX_ORG)
+    if method != "lttb":
+        for record in records:
+            yield record.get_field(), record.get_time(), record.get_value()
+        return
+
+    series: Dict[str, List[Tuple[float, Any]]] = {}
+    for record in records:
+        candidate = (record.get_time().timestamp(), record.get_value())
+        candidates = series.setdefault(record.get_field(), [])
+        # min() y max() de un paso con una sola muestra devuelven la misma fila
+        if not candidates or candidates[-1] != candidate:
+            candidates.append(candidate)
+    for field, candidates in series.items():
+        for ts, value in lttb(candidates, points):
+            yield field, datetime.fromtimestamp(ts, timezone.utc), value
+
+
+def _series_chunks(flux: str, method: str, points: int) -> Iterator[bytes]:
+    chunk = bytearray()
+    lines = 0
+    for field, timestamp, value in _series_records(flux, method, points):
+        chunk += _series_line(field, timestamp, value)
+        lines += 1
+        if lines == _SERIES_CHUNK_LINES:
+            yield bytes(chunk)
+            chunk.clear()
+            lines = 0
+    if chunk:
+        yield bytes(chunk)
+
+
+def _series_org(claims: Dict[str, Any], worker_id: Optional[str] = None) -> str:
+    """
+    Organización a la que se limita una consulta de series, tomada del claim
+    org_id del token. Los roles de SERIES_READ_ROLES consultan cualquier
+    serie de su organización; el resto solo las de su propio trabajador
+    (sub == worker_id). Lanza HTTPException(403) en otro caso.
+    """
+    org_id = claims.get("org_id")
+    if org_id is None or str(org_id) == "":
+        raise HTTPException(status_code=403, detail="El token no indica la organización")
+    role = str(claims.get("role") or "").strip().lower()
+    if role not in SERIES_READ_ROLES and (worker_id is None or str(claims.get("sub")) != worker_id):
+        raise HTTPException(status_code=403, detail="Sin permiso para consultar estas series")
+    return str(org_id)
+
+
+async def _series_response(
+    request: Request,
+    tags: Dict[str, str],
+    fields: str,
+    start: Optional[datetime],
+    stop: Optional[datetime],
+    points: Optional[int],
+    method: str,
+    worker_id: Optional[str] = None,
+) -> StreamingResponse:
+    """
+    Responde una consulta de series como NDJSON, una línea por punto:
+    {"field": "heart_rate", "time": "...Z", "value": 72.5}
+
+    La consulta se limita a la organización del token y exige permiso sobre
+    las series pedidas (ver _series_org); `worker_id` es el trabajador al
+    que pertenecen, si lo hay.
+
+    El paso de reducción se calcula para que cada campo devuelva como mucho
+    `points` puntos (el coste depende del ancho de la gráfica, no del número
+    de muestras). La respuesta se transmite según llega de InfluxDB y se
+    guarda en la caché de ventanas al terminar.
+    """
+    org_id = _series_org(_validate_jwt(request), worker_id)
+
+    if points is None:
+        points = QUERY_DEFAULT_POINTS
+    if not 1 <= points <= QUERY_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"points debe estar entre 1 y {QUERY_MAX_POINTS}")
+
+    stop = stop or datetime.now(timezone.utc)
+    start = start or stop - QUERY_DEFAULT_RANGE
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if stop.tzinfo is None:
+        stop = stop.replace(tzinfo=timezone.utc)
+    if stop - start > QUERY_MAX_RANGE:
+        raise HTTPException(status_code=400, detail=f"Rango máximo de consulta: {QUERY_MAX_RANGE.days} días")
+
+    try:
+        # Los filtros se comparan con los tags tal como se escribieron
+        tags = {tag: TAG_POLICY.query_value(tag, value) for tag, value in tags.items()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Filtro no disponible: {e}")
+    tags["org_id"] = org_id
+    field_keys = [f.strip() for f in fields.split(",") if f.strip()]
+    try:
+        window = SeriesWindow(start, stop, points, oversample=QUERY_LTTB_OVERSAMPLE)
+        flux = build_series_flux(bucket_router.bucket_for(org_id), tags, field_keys, window, method)
+    except InvalidSeriesQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"X-Series-Step": f"{window.every_s}s"}
+    key = (tuple(sorted(tags.items())), tuple(field_keys), window.start_s, window.stop_s, window.every_s, method)
+    cached = series_cache.get(key)
+    if cached is not None:
+        headers["X-Cache"] = "hit"
+        return StreamingResponse(iter(cached), media_type="application/x-ndjson", headers=headers)
+
+    # El primer trozo se obtiene antes de responder para devolver un 502
+    # limpio si InfluxDB falla, en lugar de cortar un 200 a medias
+    chunks = _series_chunks(flux, method, points)
+    try:
+        first = await run_in_threadpool(next, chunks, None)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error escribiendo en InfluxDB: {e}")
+        logger.error(f"Error consultando InfluxDB: {e}")
+        raise HTTPException(status_code=502, detail=f"Error consultando InfluxDB: {e}")
+
+    async def _stream() -> AsyncIterator[bytes]:
+        sent: List[bytes] = []
+        if first is not None:
+            sent.append(first)
+            yield first
+            async for chunk in iterate_in_threadpool(chunks):
+                sent.append(chunk)
+                yield chunk
+        series_cache.put(key, sent, window.stop)
+
+    headers["X-Cache"] = "miss"
+    return StreamingResponse(_stream(), media_type="application/x-ndjson", headers=headers)
+
+
+@router.get("/biometric/series/workers/{worker_id}")
+async def worker_series(
+    request: Request,
+    worker_id: str,
+    fields: str,
+    start: Optional[datetime] = None,
+    stop: Optional[datetime] = None,
+    points: Optional[int] = None,
+    method: str = "mean",
+):
+    """
+    Series de un trabajador (todas sus fuentes) entre `start` y `stop`.
+    `fields` es una lista separada por comas de claves de lectura
+    (heart_rate, hrv, co2_ppm, ...); `method` es mean, median, min, max, last
+    o lttb.
+
+    Un trabajador solo puede consultar sus propias series; los roles de
+    SERIES_READ_ROLES, las de cualquier trabajador de su organización.
+    """
+    return await _series_response(
+        request, {"worker_id": worker_id}, fields, start, stop, points, method, worker_id=worker_id
+    )
+
 
-    return {"status": "ok", "format": payload_format, "points_written": len(points)}
+@router.get("/biometric/series/devices/{device_id}")
+async def device_series(
+    request: Request,
+    device_id: str,
+    fields: str,
+    start: Optional[datetime] = None,
+    stop: Optional[datetime] = None,
+    points: Optional[int] = None,
+    method: str = "mean",
+):
+    """
+    Series de un dispositivo de la organización del token entre `start` y
+    `stop`. Solo para los roles de SERIES_READ_ROLES.
+    """
+    return await _series_response(request, {"device_id": device_id}, fields, start, stop, points, method)
+
+
+@router.get("/biometric/series/sites/{site}")
+async def site_series(
+    request: Request,
+    site: str,
+    fields: str,
+    zone: Optional[str] = None,
+    start: Optional[datetime] = None,
+    stop: Optional[datetime] = None,
+    points: Optional[int] = None,
+    method: str = "mean",
+):
+    """
+    Series agregadas de una sede (y opcionalmente una zona) entre `start` y
+    `stop`, combinando todos sus dispositivos. Solo para los roles de
+    SERIES_READ_ROLES y dentro de la organización del token.
+    """
+    tags = {"site": site}
+    if zone:
+        tags["zone"] = zone
+    return await _series_response(request, tags, fields, start, stop, points, method)
+
+
+@router.get("/biometric/formats")
+async def biometric_formats():
+    """
+    Formatos de ingesta aceptados y diccionario de IDs de campo para
+    MessagePack, para que los dispositivos puedan sincronizarlo.
+    """
+    content_types = list(JSON_CONTENT_TYPES[:2]) + list(NDJSON_CONTENT_TYPES) + list(XML_CONTENT_TYPES)
+    if MsgpackRecordStream.available():
+        content_types += list(MSGPACK_CONTENT_TYPES)
+    return {
+        "content_types": content_types,
+        "content_encodings": available_encodings(),
+        "field_ids": {str(field_id): name for field_id, name in FIELD_IDS.items()},
+    }
+
+
+@router.get("/biometric/stats")
+async def biometric_stats():
+    """
+    Métricas internas del pipeline de ingesta.
+    """
+    return {
+        "writer": writer.snapshot(),
+        "influx_health": influx_health.snapshot(),
+        "spill": spill_log.snapshot() if spill_log is not None else None,
+        "tag_cache": tag_cache.snapshot(),
+        "jwt_cache": jwt_cache.snapshot(),
+        "websocket": ws_stats,
+        "series_cache": series_cache.snapshot(),
+        "rollups": rollups.snapshot() if rollups is not None else None,
+        "preaggregation": preaggregator.snapshot() if preaggregator is not None else None,
+        "routing": bucket_router.snapshot(),
+        "tag_policy": TAG_POLICY.snapshot(),
+        "cardinality": series_cardinality.snapshot(),
+        "rate_limit": limiter.snapshot(),
+        "dedup": replay_window.snapshot() if replay_window is not None else None,
+    }
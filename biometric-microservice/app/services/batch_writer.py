@@ -0,0 +1,277 @@
+import asyncio
+import inspect
+import logging
+import random
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("biometric_writer")
+
+
+class WriteQueueFull(Exception):
+    """
+    La cola de escritura no tiene espacio para el lote recibido.
+    """
+
+
+def is_permanent_rejection(exc: BaseException) -> bool:
+    """
+    Si InfluxDB rechazó la escritura por el contenido del lote (4xx salvo 429,
+    p. ej. line protocol inválido o tipo de campo en conflicto).
+
+    Reintentar no cambia el resultado. Los 5xx, el 429 y los errores de
+    conexión no llevan `status` 4xx y se tratan como transitorios. Se mira
+    el atributo `status` (lo lleva `influxdb_client.rest.ApiException`) para
+    no depender aquí del cliente.
+    """
+    status = getattr(exc, "status", None)
+    return isinstance(status, int) and 400 <= status < 500 and status != 429
+
+
+class BatchWriter:
+    """
+    Pipeline de escritura por lotes hacia InfluxDB.
+
+    Los handlers encolan registros (Points o bloques de line protocol) en una
+    cola acotada en memoria y responden de inmediato. Una tarea de fondo
+    agrupa los registros y los vuelca cuando se alcanza `batch_size` o cuando
+    vence `flush_interval`, ejecutando la escritura bloqueante en un hilo para
+    no detener el event loop. Los fallos se reintentan con backoff
+    exponencial y jitter.
+
+    Si un lote agota los reintentos el writer pasa a modo degradado: mientras
+    dure, los lotes se entregan directamente a `on_failure` (p. ej. el spill
+    log en disco) sin esperar a InfluxDB, hasta que se llame a `recover()`.
+    Un rechazo permanente (ver `is_permanent_rejection`) descarta solo ese
+    lote, sin reintentos y sin degradar el writer.
+
+    `record_size` indica cuántos puntos contiene cada registro (p. ej. un
+    bloque con varias líneas); la capacidad de la cola, el tamaño de lote y
+    las estadísticas se expresan en puntos. Por defecto cada registro cuenta 1.
+
+    `executor` permite dedicar un hilo propio a las escrituras para que no
+    compitan con otras tareas bloqueantes; por defecto se usa el executor
+    por defecto del event loop.
+    """
+
+    def __init__(
+        self,
+        write_fn: Callable[[List[Any]], None],
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_retries: int = 5,
+        retry_base_delay: float = 0.2,
+        retry_max_delay: float = 10.0,
+        on_failure: Optional[Callable[[List[Any], Optional[Exception]], Any]] = None,
+        record_size: Optional[Callable[[Any], int]] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self._write_fn = write_fn
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._on_failure = on_failure
+        self._record_size = record_size or (lambda record: 1)
+        self._executor = executor
+
+        # La capacidad se controla en puntos en enqueue(), no en registros
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending = 0
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.degraded = False
+
+        self.stats: Dict[str, Any] = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "retries": 0,
+            "failed": 0,
+            "diverted": 0,
+            "rejected": 0,
+            "rejected_by_influx": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": None,
+            "last_error": None,
+        }
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def enqueue(self, records: Sequence[Any]) -> None:
+        """
+        Encola todos los registros o ninguno.
+
+        Lanza WriteQueueFull si el lote completo no cabe en la cola.
+        """
+        sizes = [self._record_size(record) for record in records]
+        total = sum(sizes)
+        if self._pending + total > self.max_queue:
+            self.stats["rejected"] += total
+            raise WriteQueueFull(
+                f"Cola de escritura llena ({self._pending}/{self.max_queue})"
+            )
+        for record, size in zip(records, sizes):
+            self._queue.put_nowait((record, size))
+        self._pending += total
+        self.stats["enqueued"] += total
+
+    def has_room(self, points: int) -> bool:
+        """
+        Si caben `points` puntos más en la cola en este momento.
+        """
+        return self._pending + points <= self.max_queue
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Estado actual del pipeline para exponer como métricas.
+        """
+        return {
+            **self.stats,
+            "queue_depth": self.queue_depth,
+            "queue_capacity": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval_s": self.flush_interval,
+            "running": self._task is not None and not self._task.done(),
+            "degraded": self.degraded,
+        }
+
+    def mark_degraded(self, reason: str) -> None:
+        if not self.degraded:
+            logger.error("Writer de InfluxDB en modo degradado: %s", reason)
+        self.degraded = True
+        self.stats["last_error"] = reason
+
+    def recover(self) -> None:
+        if self.degraded:
+            logger.info("InfluxDB disponible de nuevo; writer fuera de modo degradado")
+        self.degraded = False
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Drena la cola y detiene la tarea de fondo.
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Timeout drenando la cola de escritura; quedan %d puntos", self.queue_depth)
+            self._task.cancel()
+        self._task = None
+
+    # ------------------------------------------------------------------
+    # Bucle de volcado
+    # ------------------------------------------------------------------
+
+    async def _run(self) -> None:
+        while not (self._stopping and self._queue.empty()):
+            batch, size = await self._collect_batch()
+            if batch:
+                await self._write_with_retry(batch, size)
+
+    async def _collect_batch(self) -> Tuple[List[Any], int]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        batch: List[Any] = []
+        size = 0
+
+        while size < self.batch_size:
+            try:
+                record, record_size = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                if self._stopping:
+                    break
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    record, record_size = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(record)
+            size += record_size
+            self._pending -= record_size
+
+        return batch, size
+
+    def _retry_delay(self, attempt: int) -> float:
+        delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt))
+        # Jitter completo para que varias réplicas no reintenten a la vez
+        return random.uniform(0, delay)
+
+    async def _divert(self, batch: List[Any], exc: Optional[Exception]) -> None:
+        result = self._on_failure(batch, exc)
+        if inspect.isawaitable(result):
+            await result
+
+    async def _write_with_retry(self, batch: List[Any], size: int) -> None:
+        if self.degraded and self._on_failure is not None:
+            # InfluxDB caído: no bloquear la cola esperando reintentos
+            self.stats["diverted"] += size
+            try:
+                await self._divert(batch, None)
+            except Exception as e:
+                self.stats["failed"] += size
+                logger.error("No se pudo desviar un lote de %d puntos: %s", size, e)
+            return
+
+        last_exc: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                await asyncio.get_running_loop().run_in_executor(self._executor, self._write_fn, batch)
+            except Exception as e:
+                last_exc = e
+                self.stats["last_error"] = str(e)
+                if is_permanent_rejection(e):
+                    self.stats["rejected_by_influx"] += size
+                    logger.error("InfluxDB rechazó un lote de %d puntos; se descarta: %s", size, e)
+                    return
+                if attempt >= self.max_retries:
+                    break
+                self.stats["retries"] += 1
+                delay = self._retry_delay(attempt)
+                logger.warning(
+                    "Error escribiendo lote de %d puntos en InfluxDB (intento %d): %s; reintento en %.2fs",
+                    size, attempt + 1, e, delay,
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            if self.degraded:
+                self.recover()
+            self.stats["written"] += size
+            self.stats["batches"] += 1
+            self.stats["last_batch_size"] = size
+            self.stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            return
+
+        self.mark_degraded(str(last_exc))
+        if self._on_failure is None:
+            self.stats["failed"] += size
+            logger.error("Lote de %d puntos descartado tras %d reintentos", size, self.max_retries)
+            return
+
+        self.stats["diverted"] += size
+        try:
+            await self._divert(batch, last_exc)
+        except Exception as e:
+            self.stats["failed"] += size
+            logger.error("No se pudo desviar un lote de %d puntos: %s", size, e)
@@ -0,0 +1,101 @@
+import hashlib
+import logging
+import math
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("biometric_cardinality")
+
+# Organización a la que se suman las que exceden `max_orgs`
+OTHER_ORGS = "_otras"
+
+
+class HyperLogLog:
+    """
+    Estimador HyperLogLog de elementos distintos con 2**precision registros
+    de un byte (4 KiB con la precisión por defecto, error típico ~1,6%).
+
+    La suma de 2**-registro y los registros a cero se mantienen al insertar,
+    así que estimate() es O(1) y se puede consultar en cada inserción.
+    """
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision debe estar entre 4 y 16")
+        self.precision = precision
+        self._m = 1 << precision
+        self._registers = bytearray(self._m)
+        self._inverse_sum = float(self._m)
+        self._zeros = self._m
+        self._alpha = 0.7213 / (1 + 1.079 / self._m)
+        self._rest_bits = 64 - precision
+
+    def add(self, item: bytes) -> None:
+        h = int.from_bytes(hashlib.blake2b(item, digest_size=8).digest(), "big")
+        index = h >> self._rest_bits
+        rest = h & ((1 << self._rest_bits) - 1)
+        rank = self._rest_bits - rest.bit_length() + 1
+        current = self._registers[index]
+        if rank > current:
+            self._registers[index] = rank
+            self._inverse_sum += 2.0 ** -rank - 2.0 ** -current
+            if current == 0:
+                self._zeros -= 1
+
+    def estimate(self) -> int:
+        m = self._m
+        raw = self._alpha * m * m / self._inverse_sum
+        if raw <= 2.5 * m and self._zeros:
+            # Corrección de rango pequeño (linear counting)
+            return round(m * math.log(m / self._zeros))
+        return round(raw)
+
+
+class SeriesCardinality:
+    """
+    Cardinalidad estimada de series por organización desde el arranque.
+
+    Cuenta tag sets distintos: cada uno genera como mucho una serie por
+    medición, así que es lo que dispara la cardinalidad (un tag de alta
+    cardinalidad como user_email la multiplica). Se alimenta con los tag
+    sets nuevos de TagSetCache, no con cada lectura.
+
+    Se avisa una vez por organización al superar `warn_threshold`.
+    """
+
+    def __init__(self, precision: int = 12, max_orgs: int = 1000, warn_threshold: int = 100000):
+        self.precision = precision
+        self.max_orgs = max_orgs
+        self.warn_threshold = warn_threshold
+        self._orgs: Dict[str, HyperLogLog] = {}
+        self._total = HyperLogLog(precision)
+        self._warned: set = set()
+
+    def observe(self, org_id: Optional[str], tag_set: bytes) -> None:
+        org = str(org_id) if org_id else ""
+        hll = self._orgs.get(org)
+        if hll is None:
+            if len(self._orgs) >= self.max_orgs:
+                org = OTHER_ORGS
+                hll = self._orgs.get(org)
+            if hll is None:
+                hll = self._orgs[org] = HyperLogLog(self.precision)
+        hll.add(tag_set)
+        self._total.add(tag_set)
+
+        if self.warn_threshold and org not in self._warned:
+            estimate = hll.estimate()
+            if estimate >= self.warn_threshold:
+                self._warned.add(org)
+                logger.warning(
+                    "Cardinalidad alta en la organización %r: ~%d tag sets (umbral %d)",
+                    org, estimate, self.warn_threshold,
+                )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "total_tag_sets": self._total.estimate(),
+            "tag_sets_by_org": {org: hll.estimate() for org, hll in self._orgs.items()},
+            "over_threshold": sorted(self._warned),
+            "warn_threshold": self.warn_threshold,
+            "max_orgs": self.max_orgs,
+        }
@@ -0,0 +1,86 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+
+class ReplayWindow:
+    """
+    Conjunto acotado de claves de idempotencia vistas en los últimos
+    `window_s` segundos, para descartar reenvíos de lecturas ya encoladas.
+
+    La clave de una lectura es un digest de 8 bytes de:
+    - device_id + `seq` (+ `timestamp` si lo trae), si el dispositivo
+      numera sus lecturas: tras un reinicio que vuelve a empezar `seq`, las
+      lecturas nuevas llevan otro instante y no se confunden con reenvíos;
+    - device_id + sus líneas de line protocol, si trae `timestamp` propio
+      (un reenvío idéntico produce exactamente las mismas líneas).
+    Las lecturas sin ninguno de los dos no se pueden deduplicar.
+
+    Las claves se guardan en orden de inserción, así que las caducadas o las
+    que exceden `max_entries` se descartan siempre por el principio.
+    """
+
+    def __init__(self, window_s: float = 900.0, max_entries: int = 200000):
+        self.window_s = window_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()
+
+        self.stats: Dict[str, int] = {
+            "duplicates": 0,
+            "remembered": 0,
+            "evicted": 0,
+        }
+
+    @staticmethod
+    def key(device_id: Any, seq: Any, timestamp: Any, lines: bytes) -> Optional[bytes]:
+        """
+        Clave de idempotencia de una lectura ya validada, o None si no tiene.
+        """
+        if device_id is None:
+            return None
+        digest = hashlib.blake2b(str(device_id).encode("utf-8"), digest_size=8)
+        if seq is not None:
+            digest.update(b"\x00seq\x00%d" % int(seq))
+            if timestamp is not None:
+                digest.update(b"\x00ts\x00")
+                digest.update(str(timestamp).encode("utf-8"))
+        elif timestamp is not None:
+            digest.update(b"\x00lines\x00")
+            digest.update(lines)
+        else:
+            return None
+        return digest.digest()
+
+    def seen(self, key: bytes) -> bool:
+        expires_at = self._entries.get(key)
+        if expires_at is not None and expires_at > time.monotonic():
+            self.stats["duplicates"] += 1
+            return True
+        return False
+
+    def remember(self, keys: Iterable[bytes]) -> None:
+        """
+        Registra las claves de lecturas ya encoladas.
+        """
+        now = time.monotonic()
+        expires_at = now + self.window_s
+        for key in keys:
+            self._entries.pop(key, None)
+            self._entries[key] = expires_at
+            self.stats["remembered"] += 1
+        while self._entries:
+            oldest_key, oldest_expiry = next(iter(self._entries.items()))
+            if oldest_expiry > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[oldest_key]
+            if oldest_expiry > now:
+                self.stats["evicted"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "window_s": self.window_s,
+        }
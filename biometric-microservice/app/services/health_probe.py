@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("biometric_health")
+
+
+class HealthProbe:
+    """
+    Sonda periódica de salud de una dependencia externa (p. ej. InfluxDB).
+
+    `check` es bloqueante y se ejecuta en un hilo cada `interval` segundos,
+    empezando justo al arrancar, sin bloquear el arranque del servicio.
+    Devuelve None si la dependencia está sana o un mensaje con el motivo si
+    no lo está; una excepción o superar `timeout` cuentan como fallo.
+
+    Los callbacks se invocan en el event loop: `on_unhealthy(motivo)` en
+    cada comprobación fallida y `on_healthy()` en cada comprobación correcta.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        check: Callable[[], Optional[str]],
+        interval: float = 15.0,
+        timeout: float = 5.0,
+        on_unhealthy: Optional[Callable[[str], None]] = None,
+        on_healthy: Optional[Callable[[], None]] = None,
+    ):
+        self.name = name
+        self._check = check
+        self.interval = interval
+        self.timeout = timeout
+        self._on_unhealthy = on_unhealthy
+        self._on_healthy = on_healthy
+        self._task: Optional[asyncio.Task] = None
+
+        self.healthy: Optional[bool] = None
+        self.stats: Dict[str, Any] = {
+            "checks": 0,
+            "failures": 0,
+            "consecutive_failures": 0,
+            "last_check_at": None,
+            "last_ok_at": None,
+            "last_check_ms": None,
+            "last_error": None,
+        }
+
+    async def probe_once(self) -> bool:
+        start = time.perf_counter()
+        try:
+            reason = await asyncio.wait_for(asyncio.to_thread(self._check), self.timeout)
+        except asyncio.TimeoutError:
+            reason = f"sin respuesta en {self.timeout:.0f}s"
+        except Exception as e:
+            reason = str(e) or type(e).__name__
+
+        self.stats["checks"] += 1
+        self.stats["last_check_at"] = time.time()
+        self.stats["last_check_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+        if reason is None:
+            if self.healthy is False:
+                logger.info("%s disponible de nuevo", self.name)
+            self.healthy = True
+            self.stats["consecutive_failures"] = 0
+            self.stats["last_ok_at"] = self.stats["last_check_at"]
+            self.stats["last_error"] = None
+            if self._on_healthy is not None:
+                self._on_healthy()
+            return True
+
+        if self.healthy is not False:
+            logger.warning("%s no saludable: %s", self.name, reason)
+        self.healthy = False
+        self.stats["failures"] += 1
+        self.stats["consecutive_failures"] += 1
+        self.stats["last_error"] = reason
+        if self._on_unhealthy is not None:
+            self._on_unhealthy(reason)
+        return False
+
+    async def _run(self) -> None:
+        while True:
+            await self.probe_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "healthy": self.healthy,
+            "interval_s": self.interval,
+            "running": self._task is not None and not self._task.done(),
+        }
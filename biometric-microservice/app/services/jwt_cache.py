@@ -0,0 +1,81 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class JWTVerificationCache:
+    """
+    Caché LRU de tokens JWT ya verificados.
+
+    Un dispositivo envía con el mismo access token durante minutos, así que
+    la verificación HMAC se hace una vez por token y no una vez por lectura.
+    La clave es el SHA-256 del token (no se guarda el token en claro) y el
+    payload decodificado se conserva hasta su `exp`; los tokens sin `exp` se
+    conservan como mucho `max_ttl` segundos. Un token caducado o distinto
+    siempre se vuelve a verificar, y los tokens inválidos nunca se cachean.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+        }
+
+    def verify(self, token: str, decode: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Devuelve el payload del token, verificándolo con `decode` solo si no
+        está en caché o ha caducado. Las excepciones de `decode` se propagan.
+        """
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        now = time.time()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, payload = entry
+            if now <= expires_at:
+                self.stats["hits"] += 1
+                self._entries.move_to_end(key)
+                return payload
+            # Caducado: se descarta y se verifica de nuevo (fallará con el
+            # mismo error que sin caché)
+            del self._entries[key]
+            self.stats["expired"] += 1
+
+        self.stats["misses"] += 1
+        payload = decode(token)
+
+        expires_at = now + self.max_ttl
+        exp = self._exp(payload)
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        self._entries[key] = (expires_at, payload)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        return payload
+
+    @staticmethod
+    def _exp(payload: Dict[str, Any]) -> Optional[float]:
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)) and not isinstance(exp, bool):
+            return float(exp)
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Estado de la caché para exponer como métricas.
+        """
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,268 @@
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.models.biometric import BiometricData
+
+# Dependencias opcionales: sin ellas el servidor responde 415 a esos formatos
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class UnsupportedEncoding(Exception):
+    """
+    Content-Encoding o tipo de contenido que este servidor no puede decodificar.
+    """
+
+
+class CorruptPayload(Exception):
+    """
+    El cuerpo comprimido o binario no se puede decodificar.
+    """
+
+
+class PayloadTooLarge(Exception):
+    """
+    El cuerpo descomprimido supera el límite configurado.
+    """
+
+
+# ---------------------------------------------------------------------------
+# Content-Encoding
+# ---------------------------------------------------------------------------
+
+# Trozos de salida al descomprimir gzip y de entrada al descomprimir zstd:
+# acotan lo que puede crecer un único paso ante un cuerpo malicioso
+_GZIP_OUTPUT_CHUNK = 64 * 1024
+_ZSTD_INPUT_CHUNK = 256
+
+
+class BodyDecoder:
+    """
+    Descompresor incremental de cuerpos HTTP (identity, gzip, zstd) con un
+    límite de bytes descomprimidos para protegerse de bombas de compresión.
+    """
+
+    def __init__(self, encoding: Optional[str], max_bytes: int):
+        encoding = (encoding or "identity").strip().lower()
+        self.max_bytes = max_bytes
+        self.total = 0
+
+        if encoding in ("identity", ""):
+            self._gzip = self._zstd = None
+        elif encoding in ("gzip", "x-gzip"):
+            self._gzip = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            self._zstd = None
+        elif encoding == "zstd":
+            if zstandard is None:
+                raise UnsupportedEncoding("Content-Encoding zstd no disponible en este servidor")
+            self._gzip = None
+            self._zstd = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            raise UnsupportedEncoding(f"Content-Encoding no soportado: {encoding}")
+
+    def _count(self, data: bytes) -> bytes:
+        self.total += len(data)
+        if self.total > self.max_bytes:
+            raise PayloadTooLarge(f"Cuerpo descomprimido mayor de {self.max_bytes} bytes")
+        return data
+
+    def feed(self, chunk: bytes) -> Iterator[bytes]:
+        """
+        Devuelve los bytes descomprimidos disponibles tras recibir `chunk`.
+        """
+        try:
+            if self._gzip is not None:
+                data = chunk
+                while data:
+                    out = self._gzip.decompress(data, _GZIP_OUTPUT_CHUNK)
+                    if out:
+                        yield self._count(out)
+                    data = self._gzip.unconsumed_tail
+            elif self._zstd is not None:
+                for start in range(0, len(chunk), _ZSTD_INPUT_CHUNK):
+                    out = self._zstd.decompress(chunk[start:start + _ZSTD_INPUT_CHUNK])
+                    if out:
+                        yield self._count(out)
+            elif chunk:
+                yield self._count(chunk)
+        except zlib.error as e:
+            raise CorruptPayload(f"Cuerpo gzip inválido: {e}")
+        except Exception as e:
+            if zstandard is not None and isinstance(e, zstandard.ZstdError):
+                raise CorruptPayload(f"Cuerpo zstd inválido: {e}")
+            raise
+
+    def finish(self) -> Iterator[bytes]:
+        """
+        Comprueba que el flujo comprimido esté completo.
+        """
+        if self._gzip is not None:
+            out = self._gzip.flush()
+            if out:
+                yield self._count(out)
+            if not self._gzip.eof:
+                raise CorruptPayload("Cuerpo gzip truncado")
+        elif self._zstd is not None and not self._zstd.eof:
+            raise CorruptPayload("Cuerpo zstd truncado")
+
+
+def available_encodings() -> List[str]:
+    encodings = ["identity", "gzip"]
+    if zstandard is not None:
+        encodings.append("zstd")
+    return encodings
+
+
+# ---------------------------------------------------------------------------
+# MessagePack con diccionario de IDs de campo
+# ---------------------------------------------------------------------------
+
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+# IDs estables de los campos de BiometricData. Los dispositivos pueden usar
+# estos enteros como claves del mapa en lugar de los nombres; nunca se deben
+# reutilizar ni renumerar, solo añadir nuevos.
+FIELD_IDS: Dict[int, str] = {
+    # Identificación y contexto
+    1: "user_id",
+    2: "user_email",
+    3: "device_id",
+    4: "timestamp",
+    5: "org_id",
+    6: "site",
+    7: "zone",
+    8: "seq",
+    # wearable_biometrics
+    10: "heart_rate",
+    11: "hrv",
+    12: "hrv_sdnn_ms",
+    13: "temperature",
+    14: "resp_rate",
+    15: "spo2_pct",
+    16: "eda_microsiemens",
+    # env_air / env_ambient
+    20: "co2_ppm",
+    21: "pm25_ugm3",
+    22: "temp_c",
+    23: "noise_db",
+    24: "light_lux",
+    # Campos genéricos cognitivos/ambientales
+    30: "pasos",
+    31: "estres",
+    32: "atencion",
+    33: "carga_cognitiva",
+    34: "estado_emocional",
+    35: "ruido",
+    36: "iluminacion",
+    37: "co2",
+    38: "presencia",
+    # sleep_summary
+    40: "sleep_score",
+    41: "total_sleep_s",
+    42: "time_in_bed_s",
+    43: "sleep_efficiency_pct",
+    44: "sleep_latency_s",
+    45: "awakening_count",
+}
+
+_unknown_fields = set(FIELD_IDS.values()) - set(BiometricData.model_fields)
+if _unknown_fields:
+    raise RuntimeError(f"FIELD_IDS referencia campos inexistentes: {sorted(_unknown_fields)}")
+
+
+def expand_field_ids(record: Any) -> Any:
+    """
+    Sustituye las claves numéricas de un registro por los nombres de campo.
+    Los IDs desconocidos se ignoran, igual que las claves JSON desconocidas.
+    """
+    if not isinstance(record, dict):
+        return record
+    expanded: Dict[Any, Any] = {}
+    for key, value in record.items():
+        if type(key) is int:
+            name = FIELD_IDS.get(key)
+            if name is None:
+                continue
+            key = name
+        expanded[key] = value
+    return expanded
+
+
+class MsgpackRecordStream:
+    """
+    Decodificador incremental de lecturas MessagePack.
+
+    El cuerpo es una secuencia de mapas (uno por lectura) o un array de mapas.
+    En ambos casos cada lectura se entrega en cuanto está completa: de un
+    array se lee solo la cabecera y luego sus elementos uno a uno, así que el
+    buffer solo retiene la lectura en curso (acotada por `max_buffer_size`).
+    Las marcas de tiempo pueden enviarse como epoch o con la extensión
+    Timestamp de MessagePack.
+    """
+
+    @staticmethod
+    def available() -> bool:
+        return msgpack is not None
+
+    def __init__(self, max_buffer_size: int):
+        if msgpack is None:
+            raise UnsupportedEncoding("MessagePack no disponible en este servidor")
+        self._unpacker = msgpack.Unpacker(
+            raw=False,
+            strict_map_key=False,
+            timestamp=3,
+            max_buffer_size=max_buffer_size,
+        )
+        # Elementos que faltan por leer del array de nivel superior en curso
+        self._array_remaining = 0
+        # Bytes recibidos y bytes que forman objetos completos
+        self._fed = 0
+        self._complete = 0
+
+    def _next(self) -> Any:
+        """
+        Siguiente lectura completa; lanza msgpack.OutOfData si aún no ha
+        llegado entera.
+        """
+        unpacker = self._unpacker
+        while not self._array_remaining:
+            try:
+                self._array_remaining = unpacker.read_array_header()
+            except ValueError:
+                # No es un array: el siguiente objeto es una lectura suelta
+                obj = unpacker.unpack()
+                self._complete = unpacker.tell()
+                return obj
+            self._complete = unpacker.tell()
+        obj = unpacker.unpack()
+        self._array_remaining -= 1
+        self._complete = unpacker.tell()
+        return obj
+
+    def feed(self, chunk: bytes) -> Iterator[Any]:
+        try:
+            self._unpacker.feed(chunk)
+            self._fed += len(chunk)
+            while True:
+                try:
+                    obj = self._next()
+                except msgpack.OutOfData:
+                    return
+                yield expand_field_ids(obj)
+        except msgpack.BufferFull:
+            raise PayloadTooLarge("Lectura MessagePack demasiado grande")
+        except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError) as e:
+            raise CorruptPayload(f"MessagePack inválido: {e}")
+
+    def finish(self) -> None:
+        # Bytes pendientes sin formar un objeto completo o array sin todos
+        # sus elementos: cuerpo truncado
+        if self._array_remaining or self._complete != self._fed:
+            raise CorruptPayload("MessagePack truncado")
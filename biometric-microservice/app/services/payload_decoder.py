@@ -0,0 +1,535 @@
+import math
+import re
+import typing
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from app.models.biometric import BiometricData
+
+
+class FastPathUnsupported(Exception):
+    """
+    El payload no está en la forma canónica (coerción de strings, valores
+    inválidos, lecturas rechazables, ...). El llamador debe usar el camino
+    con Pydantic, que produce exactamente los mismos errores que antes.
+    """
+
+
+# ---------------------------------------------------------------------------
+# Esquema declarativo: clave de entrada -> (medición, campo en InfluxDB, tipo escrito)
+# Los tipos de entrada se toman de BiometricData para no duplicar validaciones.
+# ---------------------------------------------------------------------------
+
+FIELD_SCHEMA: Dict[str, Tuple[str, str, type]] = {
+    # wearable_biometrics
+    "heart_rate": ("wearable_biometrics", "hr_bpm", int),
+    "hrv": ("wearable_biometrics", "hrv_rmssd_ms", float),
+    "hrv_sdnn_ms": ("wearable_biometrics", "hrv_sdnn_ms", float),
+    "eda_microsiemens": ("wearable_biometrics", "eda_microsiemens", float),
+    "temperature": ("wearable_biometrics", "skin_temp_c", float),
+    "resp_rate": ("wearable_biometrics", "resp_rate_bpm", float),
+    "spo2_pct": ("wearable_biometrics", "spo2_pct", float),
+    # sleep_summary
+    "sleep_score": ("sleep_summary", "sleep_score", float),
+    "total_sleep_s": ("sleep_summary", "total_sleep_s", int),
+    "sleep_efficiency_pct": ("sleep_summary", "sleep_efficiency_pct", float),
+    "sleep_latency_s": ("sleep_summary", "sleep_latency_s", int),
+    "awakening_count": ("sleep_summary", "awakening_count", int),
+    "time_in_bed_s": ("sleep_summary", "time_in_bed_s", int),
+    # env_air
+    "co2_ppm": ("env_air", "co2_ppm", float),
+    "pm25_ugm3": ("env_air", "pm25_ugm3", float),
+    "temp_c": ("env_air", "temp_c", float),
+    # env_ambient
+    "noise_db": ("env_ambient", "noise_db", float),
+    "light_lux": ("env_ambient", "light_lux", float),
+}
+
+# Orden en que se emiten las mediciones (igual que el camino con Points)
+MEASUREMENTS = ("wearable_biometrics", "sleep_summary", "env_air", "env_ambient")
+
+# Divisores de nanosegundos por precisión de escritura. Se divide en coma
+# flotante y se trunca igual que influxdb_client para obtener el mismo entero.
+PRECISION_DIVISORS = {"s": 1e9, "ms": 1e6, "us": 1e3, "ns": None}
+
+# Mismo umbral que Pydantic para distinguir epoch en segundos o milisegundos
+_EPOCH_MS_WATERSHED = 2 * 10**10
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_ISO_DATETIME = re.compile(
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?(Z|[+-]\d{2}:\d{2})?"
+)
+
+
+def _base_type(annotation: Any) -> type:
+    """Optional[X] -> X"""
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    return args[0] if args else annotation
+
+
+# Tipo de entrada por clave, derivado del modelo Pydantic
+INPUT_TYPES: Dict[str, type] = {
+    name: _base_type(field.annotation) for name, field in BiometricData.model_fields.items()
+}
+REQUIRED_KEYS = frozenset(
+    name for name, field in BiometricData.model_fields.items() if field.is_required()
+)
+
+
+# ---------------------------------------------------------------------------
+# Line protocol
+# ---------------------------------------------------------------------------
+
+_ESCAPE_KEY = str.maketrans({
+    ",": r"\,",
+    "=": r"\=",
+    " ": r"\ ",
+    "\n": r"\n",
+    "\t": r"\t",
+    "\r": r"\r",
+})
+
+
+def escape_key(value: str) -> str:
+    return value.translate(_ESCAPE_KEY)
+
+
+def escape_tag_value(value: str) -> str:
+    escaped = value.translate(_ESCAPE_KEY)
+    if escaped.endswith("\\"):
+        escaped += " "
+    return escaped
+
+
+def format_float(value: float) -> str:
+    """
+    Igual que influxdb_client.Point: sin el ".0" final de los enteros.
+    """
+    text = repr(value)
+    return text[:-2] if text.endswith(".0") else text
+
+
+def build_tags(
+    org_id: Optional[str],
+    user_id: Optional[int],
+    user_email: Optional[str],
+    device_id: str,
+    site: Optional[str] = None,
+    zone: Optional[str] = None,
+) -> Dict[str, str]:
+    """
+    Conjunto estándar de tags usados en todas las mediciones.
+    """
+    tags: Dict[str, str] = {}
+
+    if org_id:
+        tags["org_id"] = str(org_id)
+
+    # worker_id es el user_id de la plataforma
+    if user_id is not None:
+        tags["worker_id"] = str(user_id)
+    elif user_email:
+        tags["worker_id"] = user_email  # fallback legible
+
+    tags["device_id"] = device_id
+
+    # Extra: mantener user_email separado si existe
+    if user_email:
+        tags["user_email"] = user_email
+
+    # Ubicación: permite consultar series por sede/zona
+    if site:
+        tags["site"] = site
+    if zone:
+        tags["zone"] = zone
+
+    return tags
+
+
+def encode_tag_set(tags: Dict[str, str]) -> str:
+    """
+    Serializa tags ordenados por clave (",k=v,...") omitiendo los vacíos.
+    """
+    parts = []
+    for key, value in sorted(tags.items()):
+        escaped = escape_tag_value(value)
+        if escaped:
+            parts.append(f"{escape_key(key)}={escaped}")
+    return "," + ",".join(parts) if parts else ""
+
+
+# ---------------------------------------------------------------------------
+# Tablas compiladas a partir del esquema
+# ---------------------------------------------------------------------------
+
+_KIND_FLOAT, _KIND_INT_FROM_FLOAT, _KIND_INT = 0, 1, 2
+
+
+def _compile_schema() -> Dict[str, Tuple[int, int, str, int]]:
+    """
+    clave -> (índice de medición, posición del campo, "campo=", conversión)
+
+    La posición sigue el orden alfabético de los campos dentro de cada
+    medición, que es el orden en que influxdb_client los serializa.
+    """
+    table = {}
+    for measurement_index, measurement in enumerate(MEASUREMENTS):
+        keys = sorted(
+            (k for k, spec in FIELD_SCHEMA.items() if spec[0] == measurement),
+            key=lambda k: FIELD_SCHEMA[k][1],
+        )
+        for slot, key in enumerate(keys):
+            _, field, written_type = FIELD_SCHEMA[key]
+            if written_type is float:
+                kind = _KIND_FLOAT
+            elif INPUT_TYPES[key] is float:
+                kind = _KIND_INT_FROM_FLOAT
+            else:
+                kind = _KIND_INT
+            table[key] = (measurement_index, slot, escape_key(field) + "=", kind)
+    return table
+
+
+_FIELD_TABLE = _compile_schema()
+_SLOTS_PER_MEASUREMENT = [
+    sum(1 for spec in FIELD_SCHEMA.values() if spec[0] == m) for m in MEASUREMENTS
+]
+_IDENTITY_KEYS = frozenset(INPUT_TYPES) - frozenset(FIELD_SCHEMA)
+_MEASUREMENT_NAMES = [escape_key(m).encode("utf-8") for m in MEASUREMENTS]
+
+# Enteros que se convierten a float sin perder precisión
+_MAX_SAFE_INT = 2**53
+
+
+class TagSetCache:
+    """
+    Caché LRU de conjuntos de tags ya ordenados y escapados.
+
+    La clave es la identidad cruda de la lectura (org_id, user_id, user_email,
+    device_id, site, zone), de la que se derivan los tags org_id, worker_id,
+    device_id, user_email, site y zone. Un dispositivo envía siempre la misma identidad, así que el
+    tag set se calcula una vez y se reutiliza en todas sus mediciones.
+
+    `transform_tags` (p. ej. una política de tags) se aplica a los tags
+    antes de serializarlos y `on_new_tag_set(org_id, tag_set)` se llama con
+    cada tag set calculado, es decir, solo en los fallos de caché.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        transform_tags: Optional[Callable[[Dict[str, str]], Dict[str, str]]] = None,
+        on_new_tag_set: Optional[Callable[[Optional[str], bytes], None]] = None,
+    ):
+        self.max_entries = max_entries
+        self._transform_tags = transform_tags
+        self._on_new_tag_set = on_new_tag_set
+        self._entries: "OrderedDict[Tuple[Any, ...], bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        org_id: Optional[str],
+        user_id: Optional[int],
+        user_email: Optional[str],
+        device_id: str,
+        site: Optional[str] = None,
+        zone: Optional[str] = None,
+    ) -> bytes:
+        key = (org_id, user_id, user_email, device_id, site, zone)
+        tag_set = self._entries.get(key)
+        if tag_set is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return tag_set
+
+        self.misses += 1
+        tags = build_tags(org_id, user_id, user_email, device_id, site, zone)
+        if self._transform_tags is not None:
+            tags = self._transform_tags(tags)
+        tag_set = encode_tag_set(tags).encode("utf-8")
+        self._entries[key] = tag_set
+        if self._on_new_tag_set is not None:
+            self._on_new_tag_set(org_id, tag_set)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return tag_set
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Codificación
+# ---------------------------------------------------------------------------
+
+def datetime_to_ns(value: datetime) -> int:
+    if value.tzinfo is None:
+        # Sin zona horaria se interpreta como UTC
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 10**9 + delta.microseconds * 1000
+
+
+def _to_precision(timestamp_ns: int, precision: str) -> int:
+    divisor = PRECISION_DIVISORS[precision]
+    return timestamp_ns if divisor is None else int(timestamp_ns / divisor)
+
+
+def _append_lines(
+    out: bytearray,
+    tag_set: bytes,
+    slots: List[Optional[List[Optional[str]]]],
+    timestamp: int,
+) -> int:
+    """
+    Añade a `out` una línea por medición con campos; devuelve cuántas.
+    Las líneas se separan con "\n" sin salto final, como espera write_api.
+    """
+    suffix = b" %d" % timestamp
+    count = 0
+    for name, fields in zip(_MEASUREMENT_NAMES, slots):
+        if fields is None:
+            continue
+        if out:
+            out += b"\n"
+        out += name
+        out += tag_set
+        out += b" "
+        out += ",".join([f for f in fields if f is not None]).encode("utf-8")
+        out += suffix
+        count += 1
+    return count
+
+
+# Medición desviada a pre-agregación: (índice de medición, tag set,
+# timestamp en ns, ["campo=valor", ...])
+DivertedMeasurement = Tuple[int, bytes, int, List[str]]
+
+
+def _divert_slots(
+    slots: List[Optional[List[Optional[str]]]],
+    divert: FrozenSet[int],
+    diverted: List[DivertedMeasurement],
+    tag_set: bytes,
+    timestamp_ns: int,
+) -> int:
+    """
+    Saca de `slots` las mediciones de `divert` y las añade a `diverted` en
+    lugar de escribirlas como líneas; devuelve cuántas desvió.
+    """
+    count = 0
+    for measurement_index in divert:
+        fields = slots[measurement_index]
+        if fields is None:
+            continue
+        diverted.append((measurement_index, tag_set, timestamp_ns, [f for f in fields if f is not None]))
+        slots[measurement_index] = None
+        count += 1
+    return count
+
+
+def encode_model(
+    data: BiometricData,
+    out: bytearray,
+    tag_cache: TagSetCache,
+    precision: str,
+    timestamp_ns: int,
+    divert: FrozenSet[int] = frozenset(),
+    diverted: Optional[List[DivertedMeasurement]] = None,
+) -> int:
+    """
+    Codifica una lectura ya validada por Pydantic en `out`.
+    Devuelve el número de puntos aceptados (0 si no hay campos persistibles).
+
+    Las mediciones de `divert` no se escriben: se añaden a `diverted` para
+    pre-agregarlas y cuentan como puntos aceptados.
+    """
+    slots: List[Optional[List[Optional[str]]]] = [None] * len(MEASUREMENTS)
+    for key, (measurement_index, slot, prefix, kind) in _FIELD_TABLE.items():
+        value = getattr(data, key)
+        if value is None:
+            continue
+        if not math.isfinite(value):
+            # influxdb_client omite NaN/inf; no se pueden escribir
+            continue
+        if kind == _KIND_FLOAT:
+            text = format_float(float(value))
+        else:
+            text = f"{int(value)}i"
+
+        fields = slots[measurement_index]
+        if fields is None:
+            fields = slots[measurement_index] = [None] * _SLOTS_PER_MEASUREMENT[measurement_index]
+        fields[slot] = prefix + text
+
+    if not any(slots):
+        return 0
+    tag_set = tag_cache.get(data.org_id, data.user_id, data.user_email, data.device_id, data.site, data.zone)
+    count = _divert_slots(slots, divert, diverted, tag_set, timestamp_ns) if divert else 0
+    return count + _append_lines(out, tag_set, slots, _to_precision(timestamp_ns, precision))
+
+
+# ---------------------------------------------------------------------------
+# Decodificación directa de JSON
+# ---------------------------------------------------------------------------
+
+_INT_TEXT = re.compile(r"-?\d+")
+_FLOAT_TEXT = re.compile(r"-?\d+(\.\d+)?([eE][+-]?\d+)?")
+_BOOL_TEXT = {"true": True, "false": False}
+
+
+def coerce_text_record(record: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """
+    Convierte los valores de texto de un registro (p. ej. XML) a los tipos
+    del modelo cuando el texto tiene una forma inequívoca ("72", "36.5",
+    "true", epoch en dígitos). El resto se deja como texto, de modo que
+    decode_reading lo rechace y decida Pydantic con sus mismos errores.
+    """
+    result: Dict[str, Any] = {}
+    for key, text in record.items():
+        expected = INPUT_TYPES.get(key)
+        value: Any = text
+        if text is not None and expected is not str:
+            if expected is float and _FLOAT_TEXT.fullmatch(text):
+                value = float(text)
+            elif expected in (int, datetime) and _INT_TEXT.fullmatch(text):
+                value = int(text)
+            elif expected is bool and text in _BOOL_TEXT:
+                value = _BOOL_TEXT[text]
+        result[key] = value
+    return result
+
+
+def _timestamp_ns(value: Any) -> int:
+    if type(value) is datetime:
+        return datetime_to_ns(value)
+    if type(value) is int and value >= 0:
+        if value > _EPOCH_MS_WATERSHED:
+            return value * 10**6
+        return value * 10**9
+    if type(value) is str and _ISO_DATETIME.fullmatch(value):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            # Forma ISO pero fecha u hora imposible (mes 13, 30 de febrero, ...)
+            raise FastPathUnsupported("timestamp")
+        return datetime_to_ns(parsed)
+    raise FastPathUnsupported("timestamp")
+
+
+def reading_timestamp_ns(body: Dict[str, Any], now_ns: int) -> int:
+    """
+    Instante de muestra (ns) de una lectura ya aceptada por decode_reading
+    con el mismo `now_ns`.
+    """
+    value = body.get("timestamp")
+    return now_ns if value is None else _timestamp_ns(value)
+
+
+def _check_identity(key: str, value: Any) -> Any:
+    """
+    Acepta solo los tipos JSON que Pydantic validaría sin coerción.
+    """
+    expected = INPUT_TYPES[key]
+    value_type = type(value)
+    if value_type is expected or expected is datetime:
+        if value_type is float and not math.isfinite(value):
+            raise FastPathUnsupported(key)
+        return value
+    if expected is float and value_type is int:
+        return value
+    raise FastPathUnsupported(key)
+
+
+def decode_reading(
+    body: Dict[str, Any],
+    out: bytearray,
+    tag_cache: TagSetCache,
+    precision: str,
+    now_ns: int,
+    max_future_skew: timedelta,
+    max_past_age: timedelta,
+    divert: FrozenSet[int] = frozenset(),
+    diverted: Optional[List[DivertedMeasurement]] = None,
+) -> int:
+    """
+    Decodifica un payload JSON ya parseado en una sola pasada sobre las claves
+    y añade sus líneas de line protocol a `out`. Devuelve cuántos puntos
+    aceptó; las mediciones de `divert` van a `diverted` (ver encode_model).
+
+    Lanza FastPathUnsupported, sin tocar `out`, si el payload requiere la
+    validación completa de Pydantic o si la lectura debe rechazarse (sin
+    datos, timestamp futuro o más antiguo que `max_past_age`).
+    """
+    if type(body) is not dict:
+        raise FastPathUnsupported("body")
+
+    slots: List[Optional[List[Optional[str]]]] = [None] * len(MEASUREMENTS)
+    identity: Dict[str, Any] = {}
+
+    for key, value in body.items():
+        if value is None:
+            continue
+        spec = _FIELD_TABLE.get(key)
+        if spec is None:
+            if key in _IDENTITY_KEYS:
+                # Identificación, contexto y campos aceptados pero no persistidos
+                identity[key] = _check_identity(key, value)
+            # Las claves desconocidas se ignoran, igual que en BiometricData
+            continue
+
+        measurement_index, slot, prefix, kind = spec
+        value_type = type(value)
+        if value_type is float:
+            if not math.isfinite(value):
+                raise FastPathUnsupported(key)
+        elif value_type is not int or not -_MAX_SAFE_INT <= value <= _MAX_SAFE_INT:
+            raise FastPathUnsupported(key)
+
+        if kind == _KIND_FLOAT:
+            text = format_float(float(value))
+        elif kind == _KIND_INT_FROM_FLOAT or value_type is int:
+            text = f"{int(value)}i"
+        else:
+            # Campo entero con valor float: Pydantic decide si es válido
+            raise FastPathUnsupported(key)
+
+        fields = slots[measurement_index]
+        if fields is None:
+            fields = slots[measurement_index] = [None] * _SLOTS_PER_MEASUREMENT[measurement_index]
+        fields[slot] = prefix + text
+
+    if not REQUIRED_KEYS.issubset(identity):
+        raise FastPathUnsupported("required")
+    if not any(slots):
+        raise FastPathUnsupported("sin datos")
+
+    timestamp_ns = now_ns
+    if "timestamp" in identity:
+        timestamp_ns = _timestamp_ns(identity["timestamp"])
+        if timestamp_ns - now_ns > max_future_skew // timedelta(microseconds=1) * 1000:
+            raise FastPathUnsupported("timestamp")
+        if now_ns - timestamp_ns > max_past_age // timedelta(microseconds=1) * 1000:
+            raise FastPathUnsupported("timestamp")
+
+    tag_set = tag_cache.get(
+        identity.get("org_id"),
+        identity.get("user_id"),
+        identity.get("user_email"),
+        identity["device_id"],
+        identity.get("site"),
+        identity.get("zone"),
+    )
+    count = _divert_slots(slots, divert, diverted, tag_set, timestamp_ns) if divert else 0
+    return count + _append_lines(out, tag_set, slots, _to_precision(timestamp_ns, precision))
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from app.services.payload_decoder import (
+    FIELD_SCHEMA,
+    MEASUREMENTS,
+    DivertedMeasurement,
+    escape_key,
+    format_float,
+)
+
+logger = logging.getLogger("biometric_preagg")
+
+_PRECISION_NS = {"s": 10**9, "ms": 10**6, "us": 10**3, "ns": 1}
+
+# Índices de cada ventana abierta o ya emitida
+_FIELDS, _LAST_ARRIVAL, _DIRTY, _EMITTED_AT = range(4)
+# Índices del acumulador de cada campo
+_COUNT, _SUM, _MIN, _MAX = range(4)
+
+
+def parse_window_spec(text: str) -> Dict[str, float]:
+    """
+    "env_air=60,env_ambient=300" -> {medición: segundos de ventana}.
+
+    Solo se admiten mediciones con todos sus campos float: la media de una
+    ventana se escribe en el mismo campo que la lectura cruda y un campo
+    entero cambiaría de tipo en InfluxDB.
+    """
+    windows: Dict[str, float] = {}
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        measurement, _, seconds = item.partition("=")
+        measurement = measurement.strip()
+        if measurement not in MEASUREMENTS:
+            raise ValueError(f"medición desconocida: {measurement}")
+        if any(spec[0] == measurement and spec[2] is not float for spec in FIELD_SCHEMA.values()):
+            raise ValueError(f"{measurement} tiene campos enteros y no se puede pre-agregar")
+        try:
+            window = float(seconds)
+        except ValueError:
+            raise ValueError(f"ventana inválida para {measurement}: {seconds!r}")
+        if window < 1:
+            raise ValueError(f"ventana inválida para {measurement}: {seconds!r}")
+        windows[measurement] = window
+    return windows
+
+
+class EdgePreAggregator:
+    """
+    Pre-agregación en el borde de mediciones de alta frecuencia (p. ej.
+    sensores ambientales): las muestras de cada serie (medición + tag set)
+    se colapsan en ventanas fijas alineadas a epoch y por cada ventana se
+    escribe un único punto, con timestamp al inicio de la ventana:
+
+        env_air,<tags> co2_ppm=<media>,co2_ppm_count=<n>i,co2_ppm_max=..,co2_ppm_min=..
+
+    La media ocupa el campo original, así que las consultas existentes
+    siguen funcionando. Las mediciones sin ventana configurada se escriben
+    en crudo como siempre.
+
+    Una ventana se emite cuando no recibe muestras desde hace `grace`
+    segundos y la serie ya ha pasado su final (por reloj de pared o por el
+    timestamp de sus muestras, lo que cubre también el backfill). Las
+    ventanas emitidas se conservan `retain` segundos: una muestra tardía se
+    fusiona y la ventana se reemite completa, sobrescribiendo el punto
+    anterior (misma serie y timestamp). Pasado ese plazo una muestra tardía
+    reabre la ventana vacía y su punto sustituye al anterior.
+
+    El estado es por proceso: con varias réplicas cada dispositivo debe
+    llegar siempre a la misma, o sus ventanas se sobrescribirán entre sí.
+
+    `emit(líneas)` recibe los puntos listos como un bloque de line protocol
+    y lanza una excepción si no los puede encolar; entonces las ventanas se
+    reintentan en el siguiente ciclo.
+    """
+
+    def __init__(
+        self,
+        windows: Dict[str, float],
+        emit: Callable[[bytes], None],
+        precision: str = "s",
+        grace: float = 10.0,
+        retain: float = 600.0,
+        max_windows: int = 200000,
+    ):
+        self.windows = windows
+        self._emit = emit
+        self._precision_ns = _PRECISION_NS[precision]
+        self.grace = grace
+        self.retain = retain
+        self.max_windows = max_windows
+
+        self._window_ns = {
+            index: int(windows[name] * 10**9) for index, name in enumerate(MEASUREMENTS) if name in windows
+        }
+        self.measurement_indices: FrozenSet[int] = frozenset(self._window_ns)
+        self._names = [escape_key(m).encode("utf-8") for m in MEASUREMENTS]
+        # (medición, tag set, inicio de ventana ns) -> [campos, llegada, pendiente, emitida]
+        self._entries: Dict[Tuple[int, bytes, int], List[Any]] = {}
+        # (medición, tag set) -> timestamp de muestra más reciente
+        self._watermarks: Dict[Tuple[int, bytes], int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats: Dict[str, Any] = {
+            "samples": 0,
+            "dropped": 0,
+            "late_merges": 0,
+            "emitted_windows": 0,
+            "emit_failures": 0,
+            "last_error": None,
+        }
+
+    def add(self, diverted: Iterable[DivertedMeasurement]) -> None:
+        """
+        Acumula mediciones desviadas de lecturas ya encoladas.
+        """
+        now = time.monotonic()
+        for measurement_index, tag_set, timestamp_ns, fields in diverted:
+            window_ns = self._window_ns[measurement_index]
+            key = (measurement_index, tag_set, timestamp_ns - timestamp_ns % window_ns)
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_windows:
+                    self.stats["dropped"] += 1
+                    continue
+                entry = self._entries[key] = [{}, now, True, None]
+            elif not entry[_DIRTY]:
+                self.stats["late_merges"] += 1
+            entry[_LAST_ARRIVAL] = now
+            entry[_DIRTY] = True
+
+            accumulators = entry[_FIELDS]
+            for field in fields:
+                name, _, text = field.partition("=")
+                value = float(text)
+                acc = accumulators.get(name)
+                if acc is None:
+                    accumulators[name] = [1, value, value, value]
+                    continue
+                acc[_COUNT] += 1
+                acc[_SUM] += value
+                if value < acc[_MIN]:
+                    acc[_MIN] = value
+                if value > acc[_MAX]:
+                    acc[_MAX] = value
+
+            series = (measurement_index, tag_set)
+            if timestamp_ns > self._watermarks.get(series, -1):
+                self._watermarks[series] = timestamp_ns
+            self.stats["samples"] += 1
+
+    def _line(self, key: Tuple[int, bytes, int], accumulators: Dict[str, List[float]]) -> bytes:
+        measurement_index, tag_set, window_start = key
+        fields = []
+        for name, acc in accumulators.items():
+            count = int(acc[_COUNT])
+            fields.append(f"{name}={format_float(acc[_SUM] / count)}")
+            fields.append(f"{name}_count={count}i")
+            fields.append(f"{name}_max={format_float(acc[_MAX])}")
+            fields.append(f"{name}_min={format_float(acc[_MIN])}")
+        fields.sort()
+        return b"%s%s %s %d" % (
+            self._names[measurement_index],
+            tag_set,
+            ",".join(fields).encode("utf-8"),
+            window_start // self._precision_ns,
+        )
+
+    def flush(self, force: bool = False) -> int:
+        """
+        Emite las ventanas cerradas (todas las pendientes con `force`) y
+        olvida las emitidas hace más de `retain`. Devuelve cuántas emitió.
+        """
+        now = time.monotonic()
+        wall_ns = time.time_ns()
+        grace_ns = int(self.grace * 10**9)
+        ready: List[Tuple[int, bytes, int]] = []
+        for key, entry in self._entries.items():
+            if not entry[_DIRTY]:
+                continue
+            if not force:
+                if now - entry[_LAST_ARRIVAL] < self.grace:
+                    continue
+                measurement_index, tag_set, window_start = key
+                window_end = window_start + self._window_ns[measurement_index]
+                if (self._watermarks[(measurement_index, tag_set)] < window_end
+                        and wall_ns < window_end + grace_ns):
+                    continue
+            ready.append(key)
+
+        if ready:
+            lines = b"\n".join(self._line(key, self._entries[key][_FIELDS]) for key in ready)
+            try:
+                self._emit(lines)
+            except Exception as e:
+                self.stats["emit_failures"] += 1
+                self.stats["last_error"] = str(e)
+                logger.warning("No se pudieron encolar %d ventanas pre-agregadas: %s", len(ready), e)
+                return 0
+            for key in ready:
+                entry = self._entries[key]
+                entry[_DIRTY] = False
+                entry[_EMITTED_AT] = now
+            self.stats["emitted_windows"] += len(ready)
+            self.stats["last_error"] = None
+
+        expired = [
+            key for key, entry in self._entries.items()
+            if not entry[_DIRTY] and now - entry[_EMITTED_AT] >= self.retain
+        ]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            live = {(m, tag_set) for m, tag_set, _ in self._entries}
+            self._watermarks = {s: ts for s, ts in self._watermarks.items() if s in live}
+        return len(ready)
+
+    async def _run(self) -> None:
+        interval = max(1.0, min(self.grace, 5.0))
+        while True:
+            await asyncio.sleep(interval)
+            self.flush()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Detiene la tarea de fondo y emite todas las ventanas pendientes.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush(force=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        open_windows = sum(1 for entry in self._entries.values() if entry[_DIRTY])
+        return {
+            **self.stats,
+            "windows_s": self.windows,
+            "open_windows": open_windows,
+            "retained_windows": len(self._entries) - open_windows,
+            "max_windows": self.max_windows,
+            "grace_s": self.grace,
+            "running": self._task is not None and not self._task.done(),
+        }
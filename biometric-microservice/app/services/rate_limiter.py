@@ -0,0 +1,258 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Dependencia opcional: sin Redis los límites se aplican por proceso
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger("biometric_rate_limit")
+
+
+class RateLimited(Exception):
+    """
+    La petición supera el límite de un dispositivo u organización.
+    """
+
+    def __init__(self, scope: str, key: str, retry_after: float):
+        super().__init__(f"Límite de ingesta superado para {scope} {key}")
+        self.scope = scope
+        self.key = key
+        self.retry_after = retry_after
+
+
+# Comprueba y descuenta varios buckets de forma atómica: si alguno no tiene
+# tokens no se descuenta ninguno y se devuelve la espera máxima.
+# KEYS: buckets; ARGV: por bucket (coste, tokens/s, ráfaga)
+_ACQUIRE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = {}
+local wait = 0
+local worst = 0
+for i, key in ipairs(KEYS) do
+  local cost = tonumber(ARGV[i * 3 - 2])
+  local rate = tonumber(ARGV[i * 3 - 1])
+  local burst = tonumber(ARGV[i * 3])
+  local b = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(b[1]) or burst
+  local ts = tonumber(b[2]) or now
+  tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+  local need = math.min(cost, burst)
+  if tokens < need and (need - tokens) / rate > wait then
+    wait = (need - tokens) / rate
+    worst = i
+  end
+  state[i] = tokens
+end
+if worst > 0 then
+  return {worst, tostring(wait)}
+end
+for i, key in ipairs(KEYS) do
+  local cost = tonumber(ARGV[i * 3 - 2])
+  local rate = tonumber(ARGV[i * 3 - 1])
+  local burst = tonumber(ARGV[i * 3])
+  redis.call('HSET', key, 'tokens', tostring(state[i] - cost), 'ts', tostring(now))
+  redis.call('PEXPIRE', key, math.ceil((burst + cost) / rate * 1000) + 1000)
+end
+return {0, '0'}
+"""
+
+
+# Devuelve tokens descontados por una petición que finalmente no se aceptó.
+# KEYS: buckets; ARGV: por bucket (coste, ráfaga)
+_REFUND_LUA = """
+for i, key in ipairs(KEYS) do
+  local tokens = tonumber(redis.call('HGET', key, 'tokens'))
+  if tokens then
+    local burst = tonumber(ARGV[i * 2])
+    redis.call('HSET', key, 'tokens', tostring(math.min(burst, tokens + tonumber(ARGV[i * 2 - 1]))))
+  end
+end
+return 0
+"""
+
+
+class TokenBucketLimiter:
+    """
+    Límites de ingesta con token bucket por dispositivo y por organización.
+
+    Cada lectura cuesta un token. Una petición se acepta si todos sus buckets
+    tienen al menos min(coste, ráfaga) tokens y entonces se descuenta el
+    coste completo, que puede dejar el bucket en negativo: un lote grande
+    pasa de una vez y el dispositivo espera después lo proporcional, en
+    lugar de no caber nunca. Si algún bucket no alcanza no se descuenta
+    ninguno.
+
+    Con `redis_client` los buckets se comparten entre réplicas (un único
+    script atómico por petición); si Redis falla se usan los buckets
+    locales para no bloquear la ingesta. Un ritmo de 0 desactiva ese ámbito.
+
+    Si la petición no llega a aceptarse tras descontar (p. ej. cola de
+    escritura llena), refund() devuelve los tokens para que el reintento
+    del cliente no se limite por una petición que no se escribió.
+    """
+
+    def __init__(
+        self,
+        device_rate: float,
+        device_burst: float,
+        org_rate: float,
+        org_burst: float,
+        max_buckets: int = 100000,
+        redis_client: Optional[Any] = None,
+        key_prefix: str = "biometric:rl:",
+    ):
+        self.limits: Dict[str, Tuple[float, float]] = {
+            "device": (device_rate, device_burst),
+            "org": (org_rate, org_burst),
+        }
+        self.max_buckets = max_buckets
+        self._redis = redis_client
+        self._script = redis_client.register_script(_ACQUIRE_LUA) if redis_client is not None else None
+        self._refund_script = redis_client.register_script(_REFUND_LUA) if redis_client is not None else None
+        self.key_prefix = key_prefix
+        self._buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+
+        self.stats: Dict[str, Any] = {
+            "allowed": 0,
+            "limited_device": 0,
+            "limited_org": 0,
+            "refunded": 0,
+            "redis_errors": 0,
+            "last_redis_error": None,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return any(rate > 0 for rate, _ in self.limits.values())
+
+    def charge(self, costs: Dict[Tuple[str, str], int], device_id: Any, org_id: Any) -> None:
+        """
+        Suma una lectura a los costes de su dispositivo y su organización.
+        """
+        if device_id is not None and self.limits["device"][0] > 0:
+            key = ("device", str(device_id))
+            costs[key] = costs.get(key, 0) + 1
+        if org_id and self.limits["org"][0] > 0:
+            key = ("org", str(org_id))
+            costs[key] = costs.get(key, 0) + 1
+
+    async def acquire(self, costs: Dict[Tuple[str, str], int]) -> None:
+        """
+        Descuenta los costes o lanza RateLimited con la espera necesaria.
+        """
+        if not costs:
+            return
+        items = list(costs.items())
+        if self._script is not None:
+            try:
+                worst, wait = await self._acquire_redis(items)
+            except Exception as e:
+                self.stats["redis_errors"] += 1
+                if self.stats["last_redis_error"] is None:
+                    logger.warning("Redis no disponible para límites de ingesta; usando buckets locales: %s", e)
+                self.stats["last_redis_error"] = str(e)
+                worst, wait = self._acquire_local(items)
+            else:
+                self.stats["last_redis_error"] = None
+        else:
+            worst, wait = self._acquire_local(items)
+
+        if worst is None:
+            self.stats["allowed"] += 1
+            return
+        scope, key = items[worst][0]
+        self.stats[f"limited_{scope}"] += 1
+        raise RateLimited(scope, key, wait)
+
+    async def refund(self, costs: Dict[Tuple[str, str], int]) -> None:
+        """
+        Devuelve los costes descontados por acquire(), sin superar la ráfaga.
+        """
+        if not costs:
+            return
+        items = list(costs.items())
+        self.stats["refunded"] += 1
+        if self._refund_script is not None:
+            try:
+                keys = [f"{self.key_prefix}{scope}:{key}" for (scope, key), _ in items]
+                args: List[Any] = []
+                for (scope, _), cost in items:
+                    args += [cost, self.limits[scope][1]]
+                await self._refund_script(keys=keys, args=args)
+                return
+            except Exception as e:
+                # acquire() pudo caer a los buckets locales por el mismo fallo
+                self.stats["redis_errors"] += 1
+                self.stats["last_redis_error"] = str(e)
+        for bucket_key, cost in items:
+            bucket = self._buckets.get(bucket_key)
+            if bucket is not None:
+                bucket[0] = min(self.limits[bucket_key[0]][1], bucket[0] + cost)
+
+    async def _acquire_redis(self, items: List[Tuple[Tuple[str, str], int]]) -> Tuple[Optional[int], float]:
+        keys = [f"{self.key_prefix}{scope}:{key}" for (scope, key), _ in items]
+        args: List[Any] = []
+        for (scope, _), cost in items:
+            rate, burst = self.limits[scope]
+            args += [cost, rate, burst]
+        worst, wait = await self._script(keys=keys, args=args)
+        worst = int(worst)
+        return (worst - 1 if worst else None), float(wait)
+
+    def _acquire_local(self, items: List[Tuple[Tuple[str, str], int]]) -> Tuple[Optional[int], float]:
+        now = time.monotonic()
+        refilled: List[Tuple[List[float], float]] = []
+        worst: Optional[int] = None
+        wait = 0.0
+        for index, (bucket_key, cost) in enumerate(items):
+            rate, burst = self.limits[bucket_key[0]]
+            bucket = self._buckets.get(bucket_key)
+            if bucket is None:
+                bucket = [burst, now]
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            need = min(cost, burst)
+            if tokens < need and (need - tokens) / rate > wait:
+                wait = (need - tokens) / rate
+                worst = index
+            refilled.append((bucket, tokens))
+        if worst is not None:
+            return worst, wait
+
+        for ((bucket_key, cost), (bucket, tokens)) in zip(items, refilled):
+            bucket[0] = tokens - cost
+            bucket[1] = now
+            self._buckets[bucket_key] = bucket
+            self._buckets.move_to_end(bucket_key)
+        while len(self._buckets) > self.max_buckets:
+            # El bucket menos usado vuelve a empezar lleno si reaparece
+            self._buckets.popitem(last=False)
+        return None, 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "backend": "redis" if self._script is not None else "memory",
+            "local_buckets": len(self._buckets),
+            "device_rate_per_s": self.limits["device"][0],
+            "device_burst": self.limits["device"][1],
+            "org_rate_per_s": self.limits["org"][0],
+            "org_burst": self.limits["org"][1],
+        }
+
+
+def redis_client_from_env(host: Optional[str], port: int, password: Optional[str]) -> Optional[Any]:
+    """
+    Cliente Redis asíncrono para compartir los límites entre réplicas, o
+    None si no hay host configurado o la librería no está instalada.
+    """
+    if not host:
+        return None
+    if aioredis is None:
+        logger.warning("REDIS_HOST definido pero la librería redis no está instalada; límites por proceso")
+        return None
+    return aioredis.Redis(host=host, port=port, password=password or None, socket_timeout=0.2)
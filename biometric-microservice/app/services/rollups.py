@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import asyncpg
+
+logger = logging.getLogger("biometric_rollups")
+
+
+# Clave de lectura -> metric_enum de daily_employee_metrics. Solo las
+# métricas con una fuente cruda directa; el resto las calculan otros jobs.
+ROLLUP_METRICS: Dict[str, str] = {
+    "heart_rate": "heart_rate",
+    "sleep_score": "sleep_quality",
+    "estres": "stress",
+    "pasos": "activity_level",
+}
+
+_NS_PER_DAY = 86400 * 10**9
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Índices del acumulador de cada clave
+_COUNT, _SUM, _SUMSQ, _MIN, _MAX = range(5)
+
+
+# Crea (si faltan) los snapshots diarios de los grupos de cada trabajador.
+# snapshot_at = inicio del día UTC, que es único por grupo.
+_ENSURE_SNAPSHOTS_SQL = """
+INSERT INTO group_snapshots (id_group, snapshot_at, window_start, window_end, job_version)
+SELECT DISTINCT ge.id_group, d.day, d.day, d.day + interval '1 day', $3
+FROM unnest($1::int[], $2::timestamptz[]) AS d(id_employee, day)
+JOIN groups_employees ge ON ge.id_employee = d.id_employee
+ON CONFLICT (id_group, snapshot_at) DO NOTHING
+"""
+
+# Suma los deltas a los acumuladores persistentes y reescribe en la misma
+# sentencia las filas avg/sum/min/max afectadas: nunca se relee la serie cruda
+# y varios procesos pueden volcar deltas del mismo día sin pisarse.
+_MERGE_SQL = """
+WITH deltas AS (
+    SELECT *
+    FROM unnest($1::int[], $2::timestamptz[], $3::text[], $4::bigint[],
+                $5::float8[], $6::float8[], $7::float8[], $8::float8[])
+         AS d(id_employee, day, metric_name, n, s, sq, lo, hi)
+),
+targets AS (
+    SELECT d.*, gs.id_snapshot
+    FROM deltas d
+    JOIN groups_employees ge ON ge.id_employee = d.id_employee
+    JOIN group_snapshots gs ON gs.id_group = ge.id_group AND gs.snapshot_at = d.day
+),
+members AS (
+    INSERT INTO group_snapshots_members (id_snapshot, id_employee)
+    SELECT DISTINCT id_snapshot, id_employee FROM targets
+    ON CONFLICT DO NOTHING
+),
+merged AS (
+    INSERT INTO employee_metric_rollups AS r
+        (id_employee, id_snapshot, metric_name, sample_count, value_sum, value_sumsq, value_min, value_max)
+    SELECT id_employee, id_snapshot, metric_name::metric_enum, n, s, sq, lo, hi FROM targets
+    ON CONFLICT (id_employee, id_snapshot, metric_name) DO UPDATE SET
+        sample_count = r.sample_count + EXCLUDED.sample_count,
+        value_sum    = r.value_sum + EXCLUDED.value_sum,
+        value_sumsq  = r.value_sumsq + EXCLUDED.value_sumsq,
+        value_min    = LEAST(r.value_min, EXCLUDED.value_min),
+        value_max    = GREATEST(r.value_max, EXCLUDED.value_max),
+        updated_at   = now()
+    RETURNING id_employee, id_snapshot, metric_name, sample_count, value_sum, value_min, value_max
+)
+INSERT INTO daily_employee_metrics (id_employee, id_snapshot, metric_name, agg_type, value)
+SELECT m.id_employee, m.id_snapshot, m.metric_name, a.agg_type, a.value
+FROM merged m
+CROSS JOIN LATERAL (VALUES
+    ('avg'::agg_enum, m.value_sum / m.sample_count),
+    ('sum'::agg_enum, m.value_sum),
+    ('min'::agg_enum, m.value_min),
+    ('max'::agg_enum, m.value_max)
+) AS a(agg_type, value)
+ON CONFLICT (id_employee, id_snapshot, metric_name, agg_type) DO UPDATE SET value = EXCLUDED.value
+"""
+
+
+class RollupAggregator:
+    """
+    Agregados diarios por trabajador y métrica, mantenidos en memoria a
+    medida que se ingieren lecturas.
+
+    Cada clave (trabajador, día UTC, métrica) acumula count, sum, sum of
+    squares, min y max. Una tarea de fondo vuelca cada `flush_interval` los
+    deltas acumulados a PostgreSQL en una única transacción con dos
+    sentencias por lotes: los acumuladores persistentes
+    (employee_metric_rollups) se incrementan y las filas avg/sum/min/max de
+    daily_employee_metrics del snapshot diario de cada grupo del trabajador
+    se recalculan a partir de ellos.
+
+    Si el volcado falla los deltas se conservan y se reintentan en el
+    siguiente ciclo; con más de `max_keys` claves pendientes las lecturas
+    de claves nuevas se descartan (y se cuentan) en lugar de crecer sin
+    límite.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        flush_interval: float = 60.0,
+        max_keys: int = 200000,
+        job_version: str = "biometric-rollup",
+    ):
+        self.dsn = dsn
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self.job_version = job_version
+        self._pending: Dict[Tuple[int, int, str], List[float]] = {}
+        self._pool: Optional[asyncpg.Pool] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats: Dict[str, Any] = {
+            "observed": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "flushed_keys": 0,
+            "failed_flushes": 0,
+            "last_flush_ms": None,
+            "last_error": None,
+        }
+
+    def observe(self, user_id: Optional[int], timestamp_ns: int, values: Mapping[str, Any]) -> None:
+        """
+        Acumula los valores de una lectura ya aceptada. Se ignoran las
+        lecturas sin trabajador y los valores no numéricos o no finitos.
+        """
+        if user_id is None:
+            return
+        day = timestamp_ns // _NS_PER_DAY
+        for key, metric in ROLLUP_METRICS.items():
+            value = values.get(key)
+            if value is None or type(value) is bool or not isinstance(value, (int, float)):
+                continue
+            value = float(value)
+            if not math.isfinite(value):
+                continue
+
+            acc = self._pending.get((user_id, day, metric))
+            if acc is None:
+                if len(self._pending) >= self.max_keys:
+                    self.stats["dropped"] += 1
+                    continue
+                self._pending[(user_id, day, metric)] = [1, value, value * value, value, value]
+            else:
+                acc[_COUNT] += 1
+                acc[_SUM] += value
+                acc[_SUMSQ] += value * value
+                if value < acc[_MIN]:
+                    acc[_MIN] = value
+                if value > acc[_MAX]:
+                    acc[_MAX] = value
+            self.stats["observed"] += 1
+
+    async def flush(self) -> int:
+        """
+        Vuelca los deltas pendientes; devuelve cuántas claves se escribieron.
+        """
+        if not self._pending or self._pool is None:
+            return 0
+
+        # Los deltas se separan antes de esperar a la BD: las lecturas que
+        # lleguen durante el volcado van al siguiente ciclo
+        pending, self._pending = self._pending, {}
+        columns: Tuple[List[Any], ...] = ([], [], [], [], [], [], [], [])
+        for (user_id, day, metric), acc in pending.items():
+            row = (user_id, _EPOCH + timedelta(days=day), metric, int(acc[_COUNT]),
+                   acc[_SUM], acc[_SUMSQ], acc[_MIN], acc[_MAX])
+            for column, value in zip(columns, row):
+                column.append(value)
+
+        start = time.perf_counter()
+        try:
+            async with self._pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(_ENSURE_SNAPSHOTS_SQL, columns[0], columns[1], self.job_version)
+                    await conn.execute(_MERGE_SQL, *columns)
+        except Exception as e:
+            self._restore(pending)
+            self.stats["failed_flushes"] += 1
+            self.stats["last_error"] = str(e)
+            logger.warning("No se pudieron volcar %d rollups a PostgreSQL: %s", len(pending), e)
+            return 0
+
+        self.stats["flushes"] += 1
+        self.stats["flushed_keys"] += len(pending)
+        self.stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        self.stats["last_error"] = None
+        return len(pending)
+
+    def _restore(self, pending: Dict[Tuple[int, int, str], List[float]]) -> None:
+        """
+        Devuelve a memoria unos deltas no volcados, fusionándolos con los
+        acumulados mientras tanto.
+        """
+        for key, acc in pending.items():
+            current = self._pending.get(key)
+            if current is None:
+                self._pending[key] = acc
+                continue
+            current[_COUNT] += acc[_COUNT]
+            current[_SUM] += acc[_SUM]
+            current[_SUMSQ] += acc[_SUMSQ]
+            current[_MIN] = min(current[_MIN], acc[_MIN])
+            current[_MAX] = max(current[_MAX], acc[_MAX])
+
+    async def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=2)
+        except Exception as e:
+            # Los agregados se siguen acumulando y se reintenta la conexión
+            self.stats["last_error"] = str(e)
+            logger.warning("PostgreSQL no disponible para rollups: %s", e)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Detiene la tarea de fondo y hace un último volcado.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pool is not None:
+            await self.flush()
+            await self._pool.close()
+            self._pool = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._pool is None:
+                try:
+                    self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=2)
+                except Exception as e:
+                    self.stats["last_error"] = str(e)
+                    continue
+            await self.flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "pending_keys": len(self._pending),
+            "max_keys": self.max_keys,
+            "flush_interval_s": self.flush_interval,
+            "connected": self._pool is not None,
+            "running": self._task is not None and not self._task.done(),
+        }
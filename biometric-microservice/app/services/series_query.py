@@ -0,0 +1,259 @@
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services.payload_decoder import FIELD_SCHEMA
+
+
+class InvalidSeriesQuery(Exception):
+    """
+    Parámetros de consulta que no se pueden traducir a Flux.
+    """
+
+
+# Campos consultables: mismas claves que acepta la ingesta
+QUERY_FIELDS: Dict[str, Tuple[str, str]] = {
+    key: (measurement, field) for key, (measurement, field, _) in FIELD_SCHEMA.items()
+}
+# Campo en InfluxDB -> clave pública (los nombres de campo son únicos entre mediciones)
+FIELD_KEYS: Dict[str, str] = {field: key for key, (_, field) in QUERY_FIELDS.items()}
+
+# Funciones de aggregateWindow permitidas, más LTTB (selección en el servidor)
+AGGREGATE_METHODS = ("mean", "median", "min", "max", "last")
+DOWNSAMPLE_METHODS = AGGREGATE_METHODS + ("lttb",)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def flux_string(value: str) -> str:
+    """
+    Literal de string Flux con las comillas, barras e interpolaciones escapadas.
+    """
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("${", "\\${")
+    return f'"{escaped}"'
+
+
+def flux_time(value: datetime) -> str:
+    """
+    Literal de tiempo RFC3339 en UTC.
+    """
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _epoch_seconds(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return math.floor((value - _EPOCH).total_seconds())
+
+
+class SeriesWindow:
+    """
+    Rango de una consulta ajustado al presupuesto de puntos.
+
+    El paso (`every`) es el menor número entero de segundos que deja como
+    mucho `points` ventanas en el rango, y el rango se alinea a ese paso:
+    así dos gráficas pedidas con segundos de diferencia comparten ventanas y
+    entrada en la caché.
+    """
+
+    def __init__(self, start: datetime, stop: datetime, points: int, oversample: int = 1):
+        start_s = _epoch_seconds(start)
+        stop_s = _epoch_seconds(stop)
+        if stop_s <= start_s:
+            raise InvalidSeriesQuery("stop debe ser posterior a start")
+        if points < 1:
+            raise InvalidSeriesQuery("points debe ser positivo")
+
+        self.points = points
+        self.every_s = max(1, math.ceil((stop_s - start_s) / points))
+        self.start_s = start_s - start_s % self.every_s
+        self.stop_s = stop_s + (-stop_s) % self.every_s
+        # Paso fino para preseleccionar candidatos de LTTB
+        self.candidate_every_s = max(1, self.every_s // max(1, oversample))
+
+    @property
+    def start(self) -> datetime:
+        return _EPOCH + timedelta(seconds=self.start_s)
+
+    @property
+    def stop(self) -> datetime:
+        return _EPOCH + timedelta(seconds=self.stop_s)
+
+
+def build_series_flux(
+    bucket: str,
+    tags: Dict[str, str],
+    fields: Sequence[str],
+    window: SeriesWindow,
+    method: str,
+) -> str:
+    """
+    Consulta Flux que devuelve una tabla por campo con columnas _time,
+    _field y _value, ya reducida en InfluxDB:
+
+    - agregados: aggregateWindow con el paso de la ventana (un punto por paso);
+    - lttb: el mínimo y el máximo reales de cada paso fino, como candidatos
+      para que LTTB conserve picos y valles.
+
+    Las series de varios dispositivos de un mismo filtro se fusionan por campo.
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise InvalidSeriesQuery(f"method no soportado: {method} (use {', '.join(DOWNSAMPLE_METHODS)})")
+    if not fields:
+        raise InvalidSeriesQuery("Debe indicar al menos un campo")
+
+    by_measurement: Dict[str, List[str]] = {}
+    for key in fields:
+        if key not in QUERY_FIELDS:
+            raise InvalidSeriesQuery(f"Campo desconocido: {key}")
+        measurement, field = QUERY_FIELDS[key]
+        by_measurement.setdefault(measurement, []).append(field)
+
+    field_filter = " or ".join(
+        f"(r._measurement == {flux_string(measurement)} and ("
+        + " or ".join(f"r._field == {flux_string(f)}" for f in names)
+        + "))"
+        for measurement, names in by_measurement.items()
+    )
+    tag_filter = " and ".join(f"r[{flux_string(k)}] == {flux_string(v)}" for k, v in sorted(tags.items()))
+
+    source = (
+        f"from(bucket: {flux_string(bucket)})\n"
+        f"  |> range(start: {flux_time(window.start)}, stop: {flux_time(window.stop)})\n"
+        f"  |> filter(fn: (r) => {field_filter})\n"
+    )
+    if tag_filter:
+        source += f"  |> filter(fn: (r) => {tag_filter})\n"
+    source += '  |> group(columns: ["_field"])\n'
+
+    if method == "lttb":
+        return (
+            f"data = {source}"
+            f"  |> window(every: {window.candidate_every_s}s, createEmpty: false)\n"
+            "union(tables: [data |> min(), data |> max()])\n"
+            '  |> group(columns: ["_field"])\n'
+            '  |> sort(columns: ["_time"])\n'
+            '  |> keep(columns: ["_time", "_field", "_value"])\n'
+        )
+    return (
+        source
+        + f"  |> aggregateWindow(every: {window.every_s}s, fn: {method}, createEmpty: false)\n"
+        + '  |> keep(columns: ["_time", "_field", "_value"])\n'
+    )
+
+
+def lttb(points: List[Tuple[float, float]], threshold: int) -> List[Tuple[float, float]]:
+    """
+    Largest-Triangle-Three-Buckets: reduce una serie ordenada por tiempo a
+    `threshold` puntos conservando su forma visual. Siempre conserva el
+    primer y el último punto.
+    """
+    n = len(points)
+    if threshold >= n:
+        return points
+    if threshold <= 2:
+        return [points[0], points[-1]][:max(threshold, 0)]
+
+    sampled = [points[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Media del siguiente bucket (el último punto para el último bucket)
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(p[0] for p in points[next_start:next_end]) / span
+        avg_y = sum(p[1] for p in points[next_start:next_end]) / span
+
+        # Punto del bucket actual que forma el triángulo de mayor área
+        ax, ay = points[a]
+        best_area = -1.0
+        best = a
+        for j in range(int(i * bucket_size) + 1, int((i + 1) * bucket_size) + 1):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+class HotWindowCache:
+    """
+    Caché LRU de respuestas ya serializadas de consultas de series.
+
+    Las ventanas que incluyen datos recientes siguen recibiendo lecturas, así
+    que caducan en `hot_ttl` segundos; las totalmente históricas duran
+    `cold_ttl`. El tamaño total se acota en bytes.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024,
+                 hot_ttl: float = 15.0, cold_ttl: float = 600.0, hot_span: float = 300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hot_ttl = hot_ttl
+        self.cold_ttl = cold_ttl
+        self.hot_span = hot_span
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[float, List[bytes], int]]" = OrderedDict()
+        self._bytes = 0
+
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "uncacheable": 0,
+        }
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[List[bytes]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, chunks, size = entry
+            if time.time() <= expires_at:
+                self.stats["hits"] += 1
+                self._entries.move_to_end(key)
+                return chunks
+            self._drop(key)
+            self.stats["expired"] += 1
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: Tuple[Any, ...], chunks: List[bytes], stop: datetime) -> None:
+        """
+        Guarda la respuesta de una ventana que termina en `stop`.
+        """
+        size = sum(len(c) for c in chunks)
+        if size > self.max_bytes // 4:
+            # Una sola respuesta no puede desplazar casi toda la caché
+            self.stats["uncacheable"] += 1
+            return
+
+        now = time.time()
+        hot = _epoch_seconds(stop) >= now - self.hot_span
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (now + (self.hot_ttl if hot else self.cold_ttl), chunks, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.stats["evictions"] += 1
+
+    def _drop(self, key: Tuple[Any, ...]) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else None,
+        }
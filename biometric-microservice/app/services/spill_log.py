@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.batch_writer import is_permanent_rejection
+
+logger = logging.getLogger("biometric_spill")
+
+_SEGMENT_PREFIX = "segment-"
+_SEGMENT_SUFFIX = ".lp"
+_QUARANTINE_DIR = "quarantine"
+
+
+class SpillLog:
+    """
+    Log local append-only (write-ahead) para cuando InfluxDB no está disponible.
+
+    Las líneas de line protocol se añaden a segmentos en disco. Un replayer de
+    fondo drena los segmentos cerrados por lotes cuando InfluxDB vuelve a
+    aceptar escrituras y los borra al terminar. Como todos los puntos llevan
+    timestamp, reenviar un segmento parcialmente replicado es idempotente.
+
+    El uso de disco está acotado por `max_total_bytes`: al superarlo se
+    descartan los segmentos más antiguos.
+
+    Los lotes que InfluxDB rechaza de forma permanente se apartan a
+    `<directory>/quarantine/` para revisarlos a mano, y el replay continúa
+    con el resto del segmento.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = 16 * 1024 * 1024,
+        max_total_bytes: int = 512 * 1024 * 1024,
+        replay_batch_lines: int = 5000,
+        replay_interval: float = 5.0,
+        fsync: bool = False,
+    ):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_total_bytes = max_total_bytes
+        self.replay_batch_lines = replay_batch_lines
+        self.replay_interval = replay_interval
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._active_file = None
+        self._active_seq = 0
+        self._active_bytes = 0
+        self._segment_sizes: Dict[int, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats: Dict[str, Any] = {
+            "spilled_lines": 0,
+            "replayed_lines": 0,
+            "dropped_segments": 0,
+            "dropped_bytes": 0,
+            "quarantined_lines": 0,
+            "replay_rate_lps": None,
+            "last_replay_at": None,
+            "last_replay_error": None,
+        }
+
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            seq = self._parse_seq(name)
+            if seq is not None:
+                self._segment_sizes[seq] = os.path.getsize(self._segment_path(seq))
+        self._active_seq = max(self._segment_sizes, default=0) + 1
+        if self._segment_sizes:
+            logger.warning(
+                "Spill log con %d segmentos pendientes (%d bytes) al iniciar",
+                len(self._segment_sizes), sum(self._segment_sizes.values()),
+            )
+
+    # ------------------------------------------------------------------
+    # Segmentos
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _parse_seq(name: str) -> Optional[int]:
+        if not (name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX)):
+            return None
+        try:
+            return int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+        except ValueError:
+            return None
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{_SEGMENT_PREFIX}{seq:012d}{_SEGMENT_SUFFIX}")
+
+    def _quarantine(self, seq: int, batch: List[bytes], exc: Exception) -> None:
+        """Aparta un lote rechazado de forma permanente por InfluxDB."""
+        directory = os.path.join(self.directory, _QUARANTINE_DIR)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{_SEGMENT_PREFIX}{seq:012d}{_SEGMENT_SUFFIX}")
+        with open(path, "ab") as f:
+            f.write(b"".join(line + b"\n" for line in batch))
+        self.stats["quarantined_lines"] += len(batch)
+        logger.error(
+            "InfluxDB rechazó %d líneas del segmento %d; apartadas en %s: %s",
+            len(batch), seq, path, exc,
+        )
+
+    def _seal_active(self) -> None:
+        """Cierra el segmento activo para que el replayer pueda consumirlo."""
+        if self._active_file is None:
+            return
+        self._active_file.close()
+        self._active_file = None
+        self._segment_sizes[self._active_seq] = self._active_bytes
+        self._active_seq += 1
+        self._active_bytes = 0
+
+    def _enforce_disk_budget(self) -> None:
+        while self._segment_sizes and self.backlog_bytes > self.max_total_bytes:
+            oldest = min(self._segment_sizes)
+            size = self._segment_sizes.pop(oldest)
+            try:
+                os.remove(self._segment_path(oldest))
+            except FileNotFoundError:
+                pass
+            self.stats["dropped_segments"] += 1
+            self.stats["dropped_bytes"] += size
+            logger.error("Spill log lleno: descartado el segmento %d (%d bytes)", oldest, size)
+
+    @property
+    def backlog_bytes(self) -> int:
+        return sum(self._segment_sizes.values()) + self._active_bytes
+
+    @property
+    def backlog_segments(self) -> int:
+        return len(self._segment_sizes) + (1 if self._active_bytes else 0)
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def append(self, lines: List[bytes]) -> None:
+        """
+        Añade líneas (o bloques de varias líneas) de line protocol al
+        segmento activo (bloqueante).
+        """
+        if not lines:
+            return
+        data = b"".join(line.rstrip(b"\n") + b"\n" for line in lines)
+        line_count = data.count(b"\n")
+
+        with self._lock:
+            if self._active_file is None:
+                self._active_file = open(self._segment_path(self._active_seq), "ab")
+            self._active_file.write(data)
+            self._active_file.flush()
+            if self.fsync:
+                os.fsync(self._active_file.fileno())
+            self._active_bytes += len(data)
+            self.stats["spilled_lines"] += line_count
+
+            if self._active_bytes >= self.segment_max_bytes:
+                self._seal_active()
+            self._enforce_disk_budget()
+
+    # ------------------------------------------------------------------
+    # Replay
+    # ------------------------------------------------------------------
+
+    def replay_once(self, write_fn: Callable[[List[bytes]], None]) -> int:
+        """
+        Reenvía todos los segmentos pendientes en lotes (bloqueante).
+
+        Un lote rechazado de forma permanente va a cuarentena y el replay
+        sigue. Ante cualquier otro error deja de procesar y propaga la
+        excepción; el segmento en curso se reintentará completo más tarde.
+        """
+        with self._lock:
+            if self._active_bytes:
+                self._seal_active()
+            pending = sorted(self._segment_sizes)
+
+        replayed = 0
+        start = time.perf_counter()
+
+        def send(seq: int, batch: List[bytes]) -> int:
+            try:
+                write_fn(batch)
+            except Exception as e:
+                if not is_permanent_rejection(e):
+                    raise
+                self._quarantine(seq, batch, e)
+                return 0
+            return len(batch)
+
+        for seq in pending:
+            path = self._segment_path(seq)
+            try:
+                with open(path, "rb") as f:
+                    batch: List[bytes] = []
+                    for line in f:
+                        line = line.rstrip(b"\n")
+                        if not line:
+                            continue
+                        batch.append(line)
+                        if len(batch) >= self.replay_batch_lines:
+                            replayed += send(seq, batch)
+                            batch = []
+                    if batch:
+                        replayed += send(seq, batch)
+            except FileNotFoundError:
+                # Descartado por el presupuesto de disco mientras se leía
+                continue
+
+            with self._lock:
+                self._segment_sizes.pop(seq, None)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+        if replayed:
+            elapsed = max(time.perf_counter() - start, 1e-6)
+            self.stats["replayed_lines"] += replayed
+            self.stats["replay_rate_lps"] = round(replayed / elapsed, 1)
+            self.stats["last_replay_at"] = time.time()
+            logger.info("Spill log: %d líneas reenviadas a InfluxDB (%.0f líneas/s)", replayed, replayed / elapsed)
+        return replayed
+
+    async def _replay_loop(
+        self,
+        write_fn: Callable[[List[bytes]], None],
+        on_recovered: Optional[Callable[[], None]],
+    ) -> None:
+        while True:
+            await asyncio.sleep(self.replay_interval)
+            if not self.backlog_bytes:
+                continue
+            try:
+                await asyncio.to_thread(self.replay_once, write_fn)
+            except Exception as e:
+                self.stats["last_replay_error"] = str(e)
+                logger.warning("InfluxDB sigue sin aceptar el replay del spill log: %s", e)
+                continue
+            self.stats["last_replay_error"] = None
+            if on_recovered is not None:
+                on_recovered()
+
+    def start_replayer(
+        self,
+        write_fn: Callable[[List[bytes]], None],
+        on_recovered: Optional[Callable[[], None]] = None,
+    ) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._replay_loop(write_fn, on_recovered))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        with self._lock:
+            if self._active_file is not None:
+                self._seal_active()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Estado del spill log para exponer como métricas.
+        """
+        return {
+            **self.stats,
+            "backlog_bytes": self.backlog_bytes,
+            "backlog_segments": self.backlog_segments,
+            "max_total_bytes": self.max_total_bytes,
+            "replayer_running": self._task is not None and not self._task.done(),
+        }
@@ -0,0 +1,141 @@
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.services.payload_decoder import escape_tag_value
+
+# Tags a los que se puede aplicar política. org_id enruta las escrituras y
+# device_id identifica la serie: quitarlos mezclaría puntos de varios
+# dispositivos en la misma serie y timestamp.
+POLICY_TAGS = ("worker_id", "user_email", "site", "zone")
+POLICY_ACTIONS = ("keep", "drop", "hash")
+
+# Valor (escapado) del tag org_id dentro de una línea de line protocol. Los
+# campos son numéricos, así que la primera coincidencia está en el tag set.
+_ORG_TAG = re.compile(rb",org_id=((?:\\.|[^,\\ ])*)")
+
+
+def parse_assignments(text: str) -> Dict[str, str]:
+    """
+    "a=x,b=y" -> {"a": "x", "b": "y"}; lanza ValueError si algún elemento
+    no tiene la forma clave=valor.
+    """
+    result: Dict[str, str] = {}
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, sep, value = item.partition("=")
+        key, value = key.strip(), value.strip()
+        if not sep or not key or not value:
+            raise ValueError(f"se esperaba clave=valor: {item!r}")
+        result[key] = value
+    return result
+
+
+class TagPolicy:
+    """
+    Política por tag para contener la cardinalidad de series en InfluxDB:
+    - drop: el tag no se escribe (p. ej. user_email, que repite worker_id);
+    - hash: se escribe un digest de 16 caracteres hex con `salt` como clave,
+      estable entre réplicas. Seudonimiza y acorta el índice, pero no
+      reduce el número de series.
+
+    Se aplica al construir cada tag set, así que todas las mediciones, los
+    puntos pre-agregados y las claves de idempotencia ven los mismos tags.
+    """
+
+    def __init__(self, actions: Dict[str, str], salt: str = ""):
+        for tag, action in actions.items():
+            if tag not in POLICY_TAGS:
+                raise ValueError(f"tag sin política configurable: {tag} (use {', '.join(POLICY_TAGS)})")
+            if action not in POLICY_ACTIONS:
+                raise ValueError(f"acción inválida para {tag}: {action} (use {', '.join(POLICY_ACTIONS)})")
+        self.actions = {tag: action for tag, action in actions.items() if action != "keep"}
+        self._key = salt.encode("utf-8")
+
+    def __bool__(self) -> bool:
+        return bool(self.actions)
+
+    def hash_value(self, value: str) -> str:
+        return hashlib.blake2b(value.encode("utf-8"), digest_size=8, key=self._key).hexdigest()
+
+    def apply(self, tags: Dict[str, str]) -> Dict[str, str]:
+        for tag, action in self.actions.items():
+            value = tags.get(tag)
+            if value is None:
+                continue
+            if action == "drop":
+                del tags[tag]
+            else:
+                tags[tag] = self.hash_value(value)
+        return tags
+
+    def query_value(self, tag: str, value: str) -> str:
+        """
+        Valor con el que filtrar un tag en una consulta. Lanza ValueError si
+        el tag no se escribe.
+        """
+        action = self.actions.get(tag)
+        if action == "drop":
+            raise ValueError(f"el tag {tag} no se almacena (política drop)")
+        return self.hash_value(value) if action == "hash" else value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self.actions)
+
+
+class BucketRouter:
+    """
+    Reparte las escrituras entre buckets según la organización.
+
+    La organización se lee del tag org_id de cada línea, de modo que el
+    mismo reparto sirve para los lotes del writer y para el replay del
+    spill log (que solo guarda líneas). Las organizaciones sin bucket propio
+    y las lecturas sin org_id van a `default_bucket`.
+    """
+
+    def __init__(self, default_bucket: str, org_buckets: Dict[str, str]):
+        self.default_bucket = default_bucket
+        self.org_buckets = org_buckets
+        self._by_tag_value = {
+            escape_tag_value(org).encode("utf-8"): bucket for org, bucket in org_buckets.items()
+        }
+        self.lines_by_bucket: Dict[str, int] = {}
+
+    def bucket_for(self, org_id: Optional[str]) -> str:
+        return self.org_buckets.get(org_id, self.default_bucket) if org_id else self.default_bucket
+
+    def split(self, records: Sequence[bytes]) -> Dict[str, List[bytes]]:
+        """
+        Agrupa los registros (bloques de líneas) por bucket de destino.
+        """
+        groups: Dict[str, List[bytes]] = {}
+        if not self._by_tag_value:
+            groups[self.default_bucket] = list(records)
+            records = ()
+        for record in records:
+            if b",org_id=" not in record:
+                groups.setdefault(self.default_bucket, []).append(record)
+                continue
+            for line in record.split(b"\n"):
+                match = _ORG_TAG.search(line)
+                bucket = self.default_bucket
+                if match is not None:
+                    bucket = self._by_tag_value.get(match.group(1), self.default_bucket)
+                groups.setdefault(bucket, []).append(line)
+        return groups
+
+    def written(self, bucket: str, records: Sequence[bytes]) -> None:
+        """
+        Cuenta las líneas ya escritas en un bucket.
+        """
+        lines = sum(record.count(b"\n") + 1 for record in records)
+        self.lines_by_bucket[bucket] = self.lines_by_bucket.get(bucket, 0) + lines
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "default_bucket": self.default_bucket,
+            "org_buckets": dict(self.org_buckets),
+            "lines_by_bucket": dict(self.lines_by_bucket),
+        }
@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+# Configuración mínima para importar el servicio sin InfluxDB ni PostgreSQL
+os.environ.setdefault("INFLUX_TOKEN", "test-token")
+os.environ.setdefault("INFLUX_URL", "http://127.0.0.1:9")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("SPILL_DIR", tempfile.mkdtemp(prefix="biometric-spill-"))
+os.environ.setdefault("INFLUX_FLUSH_INTERVAL_MS", "20")
+# Los tests usan instantes fijos de 2024: sin límite práctico de antigüedad
+os.environ.setdefault("MAX_PAST_AGE_S", str(3650 * 86400))
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+JWT_SECRET = os.environ["JWT_SECRET"]
+
+
+class FakeWriteApi:
+    """
+    Sustituye al write_api de InfluxDB y guarda las líneas escritas.
+    """
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, bucket, org, record, write_precision):
+        for block in record:
+            self.lines.extend((bucket, line) for line in block.decode("utf-8").split("\n"))
+
+
+def make_token(claims=None, ttl=600):
+    from jose import jwt
+
+    payload = {"sub": 1, "role": "employee", "exp": int(time.time()) + ttl}
+    payload.update(claims or {})
+    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+
+
+def auth_headers(claims=None):
+    return {"Authorization": f"Bearer {make_token(claims)}", "X-Refresh-Token": "refresh"}
+
+
+@pytest.fixture
+def headers():
+    return auth_headers()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    TestClient de la app con InfluxDB simulado: la sonda de salud siempre
+    pasa y las escrituras quedan en `client.influx.lines`.
+
+    Es uno por sesión: las colas del pipeline son globales del módulo y
+    quedan ligadas al event loop del primer arranque. Cada test usa sus
+    propios device_id para no chocar con el descarte de reenvíos.
+    """
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.routers import biometricroutes
+
+    biometricroutes.influx_health._check = lambda: None
+    with TestClient(app) as test_client:
+        test_client.influx = biometricroutes.write_api = FakeWriteApi()
+        yield test_client
+
+
+def written_lines(client, device_id, count, timeout=2.0):
+    """
+    Espera a que el writer vuelque al menos `count` líneas del dispositivo
+    y las devuelve.
+    """
+    tags = (f",device_id={device_id},", f",device_id={device_id} ")
+    deadline = time.monotonic() + timeout
+    while True:
+        lines = [line for _, line in client.influx.lines if any(tag in line for tag in tags)]
+        if len(lines) >= count or time.monotonic() >= deadline:
+            return lines
+        time.sleep(0.01)
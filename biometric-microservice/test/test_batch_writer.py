@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from app.services.batch_writer import BatchWriter, WriteQueueFull, is_permanent_rejection
+
+
+class FakeApiError(Exception):
+    """
+    Como influxdb_client.rest.ApiException: el código HTTP va en `status`.
+    """
+
+    def __init__(self, status):
+        super().__init__(f"({status})")
+        self.status = status
+
+
+def _writer(batches, fail=0, **kwargs):
+    """
+    Writer que guarda cada lote escrito; las `fail` primeras escrituras fallan.
+    """
+    attempts = []
+
+    def write(batch):
+        attempts.append(list(batch))
+        if len(attempts) <= fail:
+            raise ConnectionError("influx caído")
+        batches.append(list(batch))
+
+    kwargs.setdefault("flush_interval", 0.01)
+    kwargs.setdefault("retry_base_delay", 0)
+    return BatchWriter(write, **kwargs), attempts
+
+
+async def _drain(writer, *groups):
+    await writer.start()
+    for records in groups:
+        writer.enqueue(records)
+    await writer.stop(timeout=2)
+
+
+def test_enqueue_is_all_or_nothing_in_points():
+    writer = BatchWriter(lambda batch: None, max_queue=5, record_size=len)
+    writer.enqueue(["ab", "cd"])
+    assert writer.queue_depth == 4
+    assert writer.has_room(1) and not writer.has_room(2)
+
+    with pytest.raises(WriteQueueFull):
+        writer.enqueue(["x", "yy"])
+    assert writer.queue_depth == 4
+    assert writer.stats["rejected"] == 3
+
+
+def test_batches_are_cut_at_batch_size():
+    batches = []
+    writer, _ = _writer(batches, batch_size=3)
+
+    asyncio.run(_drain(writer, list(range(7))))
+
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert sum(batches, []) == list(range(7))
+    assert writer.stats["written"] == 7
+    assert writer.queue_depth == 0
+
+
+def test_flush_interval_writes_partial_batch():
+    batches = []
+    writer, _ = _writer(batches, batch_size=100, flush_interval=0.02)
+
+    async def scenario():
+        await writer.start()
+        writer.enqueue(["a", "b"])
+        await asyncio.sleep(0.1)
+        written = list(batches)
+        await writer.stop()
+        return written
+
+    assert asyncio.run(scenario()) == [["a", "b"]]
+
+
+def test_failed_write_is_retried():
+    batches = []
+    writer, attempts = _writer(batches, fail=2, max_retries=3)
+
+    asyncio.run(_drain(writer, ["a"]))
+
+    assert len(attempts) == 3
+    assert batches == [["a"]]
+    assert writer.stats["retries"] == 2
+    assert not writer.degraded
+
+
+def test_exhausted_retries_divert_and_degrade():
+    diverted = []
+
+    async def on_failure(batch, exc):
+        diverted.append((list(batch), exc))
+
+    batches = []
+    writer, attempts = _writer(batches, fail=10, max_retries=1, batch_size=2, on_failure=on_failure)
+
+    async def scenario():
+        await writer.start()
+        writer.enqueue(["a", "b"])
+        await asyncio.sleep(0.1)
+        # Ya degradado: el siguiente lote se desvía sin intentar escribir
+        writer.enqueue(["c"])
+        await writer.stop(timeout=2)
+
+    asyncio.run(scenario())
+
+    assert len(attempts) == 2
+    assert [batch for batch, _ in diverted] == [["a", "b"], ["c"]]
+    assert isinstance(diverted[0][1], ConnectionError)
+    assert diverted[1][1] is None
+    assert writer.degraded
+    assert writer.stats["diverted"] == 3
+
+
+def test_exhausted_retries_without_fallback_count_failed():
+    writer, _ = _writer([], fail=10, max_retries=0)
+
+    asyncio.run(_drain(writer, ["a", "b"]))
+
+    assert writer.stats["failed"] == 2
+    assert writer.degraded
+
+
+@pytest.mark.parametrize("status, permanent", [(400, True), (422, True), (429, False), (503, False)])
+def test_permanent_rejection_is_4xx_except_429(status, permanent):
+    assert is_permanent_rejection(FakeApiError(status)) is permanent
+    assert not is_permanent_rejection(ConnectionError("influx caído"))
+
+
+@pytest.mark.parametrize("status", [400, 422])
+def test_rejected_batch_is_dropped_without_retry_or_degrade(status):
+    diverted = []
+    batches = []
+    attempts = []
+
+    def write(batch):
+        attempts.append(list(batch))
+        if "malo" in batch:
+            raise FakeApiError(status)
+        batches.append(list(batch))
+
+    writer = BatchWriter(
+        write, batch_size=2, flush_interval=0.01, retry_base_delay=0,
+        on_failure=lambda batch, exc: diverted.append(batch),
+    )
+
+    async def scenario():
+        await writer.start()
+        writer.enqueue(["malo", "b"])
+        await asyncio.sleep(0.05)
+        writer.enqueue(["c"])
+        await writer.stop(timeout=2)
+
+    asyncio.run(scenario())
+
+    assert attempts[0] == ["malo", "b"] and len(attempts) == 2
+    assert batches == [["c"]]
+    assert diverted == []
+    assert not writer.degraded
+    assert writer.stats["rejected_by_influx"] == 2
+    assert writer.stats["retries"] == 0
@@ -0,0 +1,59 @@
+from conftest import written_lines
+
+
+def test_bulk_json_reports_invalid_items_and_accepts_the_rest(client, headers):
+    items = [
+        {"device_id": "bulk-json-1", "heart_rate": 70, "timestamp": "2024-02-29T10:00:00Z"},
+        {"device_id": "bulk-json-2", "heart_rate": 71, "timestamp": "2024-02-30T00:00:00"},
+        {"device_id": "bulk-json-3", "co2_ppm": 500},
+        {"device_id": "bulk-json-4"},
+    ]
+    r = client.post("/api/biometric/bulk", json=items, headers=headers)
+
+    assert r.status_code == 200
+    body = r.json()
+    assert body["status"] == "partial"
+    assert (body["received"], body["accepted"], body["rejected"]) == (4, 2, 2)
+    assert [error["index"] for error in body["errors"]] == [1, 3]
+    assert written_lines(client, "bulk-json-1", 1)
+    assert written_lines(client, "bulk-json-3", 1)
+    assert not written_lines(client, "bulk-json-2", 1, timeout=0.1)
+
+
+def test_bulk_xml_reports_invalid_items_and_accepts_the_rest(client, headers):
+    document = (
+        b"<BiometricBatch>"
+        b"<BiometricData><device_id>bulk-xml-1</device_id><heart_rate>70</heart_rate></BiometricData>"
+        b"<BiometricData><device_id>bulk-xml-2</device_id><heart_rate>71</heart_rate>"
+        b"<timestamp>2024-02-30T00:00:00</timestamp></BiometricData>"
+        b"<BiometricData><device_id>bulk-xml-3</device_id><noise_db>40.5</noise_db></BiometricData>"
+        b"</BiometricBatch>"
+    )
+    r = client.post(
+        "/api/biometric/bulk", content=document, headers={**headers, "Content-Type": "application/xml"}
+    )
+
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["received"], body["accepted"], body["rejected"]) == (3, 2, 1)
+    assert body["errors"][0]["index"] == 1
+    assert " hr_bpm=70i " in written_lines(client, "bulk-xml-1", 1)[0]
+    assert written_lines(client, "bulk-xml-3", 1)
+
+
+def test_bulk_ndjson_reports_malformed_lines(client, headers):
+    body = b'{"device_id": "bulk-nd-1", "temp_c": 21.5}\n{no es json\n{"device_id": "bulk-nd-2", "temp_c": 22}\n'
+    r = client.post(
+        "/api/biometric/bulk", content=body, headers={**headers, "Content-Type": "application/x-ndjson"}
+    )
+
+    assert r.status_code == 200
+    result = r.json()
+    assert (result["accepted"], result["rejected"]) == (2, 1)
+    assert result["errors"][0]["index"] == 1
+    assert result["errors"][0]["error"].startswith("JSON malformado")
+
+
+def test_bulk_rejects_non_array_json(client, headers):
+    r = client.post("/api/biometric/bulk", json={"device_id": "bulk-obj"}, headers=headers)
+    assert r.status_code == 400
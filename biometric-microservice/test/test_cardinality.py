@@ -0,0 +1,42 @@
+import pytest
+
+from app.services.cardinality import OTHER_ORGS, HyperLogLog, SeriesCardinality
+
+
+@pytest.mark.parametrize("n", [0, 10, 1000, 50000])
+def test_hll_estimate_within_error(n):
+    hll = HyperLogLog()
+    for i in range(n):
+        hll.add(b"tags-%d" % i)
+    # Error típico ~1,6% con precision 12; margen de 5 sigmas
+    assert abs(hll.estimate() - n) <= max(1, 0.08 * n)
+
+
+def test_hll_ignores_repeats():
+    hll = HyperLogLog()
+    for _ in range(3):
+        for i in range(500):
+            hll.add(b"tags-%d" % i)
+    assert abs(hll.estimate() - 500) <= 10
+
+
+@pytest.mark.parametrize("precision", [3, 17])
+def test_hll_rejects_invalid_precision(precision):
+    with pytest.raises(ValueError):
+        HyperLogLog(precision)
+
+
+def test_series_cardinality_by_org_and_overflow(caplog):
+    cardinality = SeriesCardinality(max_orgs=2, warn_threshold=50)
+    for i in range(100):
+        cardinality.observe("acme", b",device_id=d%d" % i)
+    cardinality.observe("beta", b",device_id=x")
+    cardinality.observe("gamma", b",device_id=y")
+    cardinality.observe("delta", b",device_id=z")
+
+    snapshot = cardinality.snapshot()
+    assert set(snapshot["tag_sets_by_org"]) == {"acme", "beta", OTHER_ORGS}
+    assert snapshot["tag_sets_by_org"][OTHER_ORGS] == 2
+    assert abs(snapshot["total_tag_sets"] - 103) <= 3
+    assert snapshot["over_threshold"] == ["acme"]
+    assert sum("Cardinalidad alta" in r.message for r in caplog.records) == 1
@@ -0,0 +1,164 @@
+"""
+El decodificador directo (decode_reading) duplica la validación de
+BiometricData para evitar Pydantic. Estos tests comprueban sobre un corpus
+de lecturas válidas e inválidas que nunca se aparta de Pydantic: si acepta
+una lectura produce exactamente las mismas líneas, y toda lectura que
+Pydantic rechaza la deriva al camino con Pydantic (FastPathUnsupported).
+"""
+
+import math
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.biometric import BiometricData
+from app.routers import biometricroutes
+from app.services.payload_decoder import (
+    FastPathUnsupported,
+    TagSetCache,
+    coerce_text_record,
+    datetime_to_ns,
+    decode_reading,
+    encode_model,
+)
+from scripts.bench_decoder import make_readings
+
+NOW_NS = time.time_ns()
+SKEW = timedelta(seconds=300)
+MAX_AGE = timedelta(days=3650)
+FUTURE_S = NOW_NS // 10**9 + 3600
+PAST_S = NOW_NS // 10**9 - 3651 * 86400
+
+BASE = {"user_id": 5, "device_id": "eq-1", "org_id": "acme"}
+
+EDGE_CASES = [
+    # Válidas en forma canónica
+    {**BASE, "heart_rate": 72},
+    {**BASE, "heart_rate": 72.5, "total_sleep_s": 28000},
+    {**BASE, "co2_ppm": 0, "light_lux": -1.5e3},
+    {**BASE, "hrv": 1e-7, "temp_c": 2**53},
+    {"device_id": "eq-2", "user_email": "ana@empresa.com", "sleep_score": 80},
+    {**BASE, "site": "", "zone": "z1", "noise_db": 40},
+    {**BASE, "heart_rate": 72, "timestamp": 1714557600},
+    {**BASE, "heart_rate": 72, "timestamp": 1714557600123},
+    {**BASE, "heart_rate": 72, "timestamp": "2024-05-01T10:00:00Z"},
+    {**BASE, "heart_rate": 72, "timestamp": "2024-05-01T10:00:00.250+02:00"},
+    {**BASE, "heart_rate": 72, "timestamp": "2024-05-01 10:00"},
+    {**BASE, "heart_rate": 72, "unknown": [1, 2], "presencia": True, "pasos": 10},
+    {**BASE, "heart_rate": 72, "hrv": None},
+    # Coerciones que decide Pydantic
+    {**BASE, "heart_rate": "72"},
+    {**BASE, "user_id": "5", "heart_rate": 72},
+    {**BASE, "total_sleep_s": 28000.0},
+    {**BASE, "total_sleep_s": 28000.5},
+    {**BASE, "heart_rate": True},
+    {**BASE, "org_id": 7, "heart_rate": 72},
+    {**BASE, "heart_rate": 72, "timestamp": 1714557600.5},
+    {**BASE, "heart_rate": 72, "timestamp": "1714557600"},
+    # Inválidas
+    {**BASE, "heart_rate": "alto"},
+    {**BASE, "heart_rate": math.nan},
+    {**BASE, "heart_rate": math.inf},
+    {**BASE, "heart_rate": 2**60},
+    {**BASE, "heart_rate": {"v": 72}},
+    {**BASE, "device_id": 12, "heart_rate": 72},
+    {"user_id": 5, "heart_rate": 72},
+    {**BASE},
+    {**BASE, "pasos": 10},
+    {},
+    {**BASE, "heart_rate": 72, "timestamp": FUTURE_S},
+    {**BASE, "heart_rate": 72, "timestamp": PAST_S},
+    {**BASE, "heart_rate": 72, "timestamp": -5},
+    {**BASE, "heart_rate": 72, "timestamp": "2024-13-01T00:00:00"},
+    {**BASE, "heart_rate": 72, "timestamp": "2024-02-30T00:00:00"},
+    {**BASE, "heart_rate": 72, "timestamp": "2024-01-01T25:00"},
+    {**BASE, "heart_rate": 72, "timestamp": "ayer"},
+]
+
+XML_RECORDS = [
+    {"user_id": "5", "device_id": "eq-x", "heart_rate": "72", "hrv": "41.5"},
+    {"user_id": "5", "device_id": "eq-x", "presencia": "true", "noise_db": "40"},
+    {"user_id": "5", "device_id": "eq-x", "heart_rate": "72", "timestamp": "1714557600"},
+    {"user_id": "5", "device_id": "eq-x", "heart_rate": "setenta"},
+    {"user_id": "cinco", "device_id": "eq-x", "heart_rate": "72"},
+    {"user_id": "5", "device_id": "eq-x", "heart_rate": None},
+    {"user_id": "5", "device_id": "eq-x", "total_sleep_s": "1.5"},
+]
+
+CORPUS = make_readings(500) + EDGE_CASES
+
+
+def _pydantic_lines(body):
+    """
+    Camino de referencia: validación con Pydantic y codificación del modelo.
+    Devuelve None si la lectura se rechaza.
+    """
+    try:
+        data = BiometricData(**body)
+    except Exception:
+        return None
+    timestamp_ns = datetime_to_ns(data.timestamp) if data.timestamp else NOW_NS
+    if timestamp_ns - NOW_NS > SKEW // timedelta(microseconds=1) * 1000:
+        return None
+    if NOW_NS - timestamp_ns > MAX_AGE // timedelta(microseconds=1) * 1000:
+        return None
+    out = bytearray()
+    if not encode_model(data, out, TagSetCache(), "s", timestamp_ns):
+        return None
+    return bytes(out)
+
+
+def _fast_lines(body):
+    """
+    Decodificador directo; None si deriva la lectura al camino con Pydantic.
+    """
+    out = bytearray()
+    try:
+        decode_reading(body, out, TagSetCache(), "s", NOW_NS, SKEW, MAX_AGE)
+    except FastPathUnsupported:
+        assert not out
+        return None
+    return bytes(out)
+
+
+def _case_id(body):
+    return ",".join(f"{k}={body[k]!r}"[:30] for k in body if k not in BASE) or "base"
+
+
+@pytest.mark.parametrize("body", CORPUS, ids=[_case_id(b) for b in CORPUS])
+def test_fast_path_matches_pydantic(body):
+    fast = _fast_lines(body)
+    reference = _pydantic_lines(body)
+    if fast is not None:
+        assert fast == reference
+    if reference is None:
+        assert fast is None
+
+
+@pytest.mark.parametrize("record", XML_RECORDS, ids=[_case_id(r) for r in XML_RECORDS])
+def test_fast_path_matches_pydantic_for_text_records(record):
+    fast = _fast_lines(coerce_text_record(record))
+    reference = _pydantic_lines(record)
+    if fast is not None:
+        assert fast == reference
+    if reference is None:
+        assert fast is None
+
+
+def test_fast_path_takes_all_canonical_readings():
+    # El corpus sintético es JSON canónico: ninguna lectura debe caer a Pydantic
+    readings = make_readings(500)
+    assert all(_fast_lines(body) is not None for body in readings)
+
+
+@pytest.mark.parametrize("body", EDGE_CASES, ids=[_case_id(b) for b in EDGE_CASES])
+def test_ingest_accepts_and_rejects_like_pydantic(body):
+    out = bytearray()
+    try:
+        accepted = biometricroutes._encode_reading(body, out) > 0
+    except HTTPException as e:
+        assert e.status_code == 400
+        accepted = False
+    assert accepted == (_pydantic_lines(body) is not None)
@@ -0,0 +1,84 @@
+import time
+
+from app.services.dedup import ReplayWindow
+from conftest import written_lines
+
+
+def test_key_uses_seq_then_lines():
+    by_seq = ReplayWindow.key("d1", 5, None, b"m v=1i 1")
+    assert by_seq == ReplayWindow.key("d1", "5", None, b"otra")
+    assert by_seq != ReplayWindow.key("d2", 5, None, b"")
+
+    # Con timestamp, el mismo seq tras un reinicio del dispositivo es otra lectura
+    with_ts = ReplayWindow.key("d1", 5, 1714557600, b"m v=1i 1")
+    assert with_ts == ReplayWindow.key("d1", 5, 1714557600, b"otra")
+    assert with_ts not in (by_seq, ReplayWindow.key("d1", 5, 1714557700, b"m v=1i 1"))
+
+    by_lines = ReplayWindow.key("d1", None, 1714557600, b"m v=1i 1")
+    assert by_lines == ReplayWindow.key("d1", None, "2024-05-01T10:00:00Z", b"m v=1i 1")
+    assert by_lines != ReplayWindow.key("d1", None, 1714557600, b"m v=2i 1")
+
+    assert ReplayWindow.key("d1", None, None, b"m v=1i 1") is None
+    assert ReplayWindow.key(None, 5, None, b"") is None
+
+
+def test_seen_only_within_window():
+    window = ReplayWindow(window_s=0.05)
+    key = ReplayWindow.key("d1", 1, None, b"")
+
+    assert not window.seen(key)
+    window.remember([key])
+    assert window.seen(key)
+    time.sleep(0.06)
+    assert not window.seen(key)
+    window.remember([])
+    assert window.snapshot()["entries"] == 0
+
+
+def test_oldest_keys_are_evicted_beyond_max_entries():
+    window = ReplayWindow(max_entries=2)
+    keys = [ReplayWindow.key("d1", seq, None, b"") for seq in range(3)]
+    window.remember(keys)
+
+    assert not window.seen(keys[0])
+    assert window.seen(keys[1]) and window.seen(keys[2])
+    assert window.stats["evicted"] == 1
+
+
+def test_resent_reading_is_acknowledged_but_not_written(client, headers):
+    reading = {"device_id": "dedup-1", "seq": 1, "heart_rate": 70}
+
+    first = client.post("/api/biometric", json=reading, headers=headers)
+    second = client.post("/api/biometric", json=reading, headers=headers)
+
+    assert first.json()["status"] == "ok"
+    assert second.status_code == 200
+    assert second.json() == {"status": "duplicate", "format": "json", "points_queued": 0}
+    written_lines(client, "dedup-1", 1)
+    assert len(written_lines(client, "dedup-1", 2, timeout=0.2)) == 1
+
+
+def test_reset_seq_with_new_timestamp_is_written(client, headers):
+    before = {"device_id": "dedup-3", "seq": 1, "heart_rate": 70, "timestamp": 1714557600}
+    after_reboot = {**before, "timestamp": 1714557900}
+
+    client.post("/api/biometric", json=before, headers=headers)
+    resent = client.post("/api/biometric", json=before, headers=headers).json()
+    rebooted = client.post("/api/biometric", json=after_reboot, headers=headers).json()
+
+    assert resent["status"] == "duplicate"
+    assert rebooted["status"] == "ok"
+    assert len(written_lines(client, "dedup-3", 2)) == 2
+
+
+def test_bulk_counts_repeats_within_and_across_requests(client, headers):
+    items = [
+        {"device_id": "dedup-2", "heart_rate": 70, "timestamp": 1714557600},
+        {"device_id": "dedup-2", "heart_rate": 70, "timestamp": 1714557600},
+        {"device_id": "dedup-2", "heart_rate": 71, "timestamp": 1714557601},
+    ]
+    first = client.post("/api/biometric/bulk", json=items, headers=headers).json()
+    again = client.post("/api/biometric/bulk", json=items[2:], headers=headers).json()
+
+    assert (first["accepted"], first["duplicates"], first["points_queued"]) == (3, 1, 2)
+    assert (again["duplicates"], again["points_queued"]) == (1, 0)
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from app.services.health_probe import HealthProbe
+
+
+def test_probe_reports_failures_and_recovery():
+    results = iter(["sin conexión", None])
+    events = []
+    probe = HealthProbe(
+        "influx",
+        lambda: next(results),
+        on_unhealthy=lambda reason: events.append(reason),
+        on_healthy=lambda: events.append("ok"),
+    )
+
+    assert asyncio.run(probe.probe_once()) is False
+    assert probe.healthy is False
+    assert probe.stats["consecutive_failures"] == 1
+    assert asyncio.run(probe.probe_once()) is True
+
+    assert events == ["sin conexión", "ok"]
+    snapshot = probe.snapshot()
+    assert (snapshot["healthy"], snapshot["checks"], snapshot["failures"]) == (True, 2, 1)
+    assert snapshot["consecutive_failures"] == 0 and snapshot["last_error"] is None
+
+
+def test_exception_and_timeout_count_as_failures():
+    def broken():
+        raise ConnectionRefusedError()
+
+    probe = HealthProbe("influx", broken)
+    assert asyncio.run(probe.probe_once()) is False
+    assert probe.stats["last_error"] == "ConnectionRefusedError"
+
+    probe = HealthProbe("influx", lambda: time.sleep(0.2), timeout=0.05)
+    assert asyncio.run(probe.probe_once()) is False
+    assert probe.stats["last_error"].startswith("sin respuesta")
+
+
+def test_start_probes_immediately_without_blocking():
+    checks = []
+    probe = HealthProbe("influx", lambda: checks.append(1), interval=60)
+
+    async def scenario():
+        probe.start()
+        assert checks == []
+        await asyncio.sleep(0.05)
+        await probe.stop()
+
+    asyncio.run(scenario())
+
+    assert checks == [1]
+    assert probe.healthy is True
+    assert not probe.snapshot()["running"]
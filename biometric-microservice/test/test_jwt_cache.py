@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from app.services.jwt_cache import JWTVerificationCache
+
+
+class CountingDecoder:
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = 0
+
+    def __call__(self, token):
+        self.calls += 1
+        if token == "invalido":
+            raise ValueError("firma inválida")
+        return dict(self.payload)
+
+
+def test_token_is_verified_once_until_exp():
+    decode = CountingDecoder({"sub": 1, "exp": time.time() + 60})
+    cache = JWTVerificationCache()
+
+    assert cache.verify("t1", decode) == cache.verify("t1", decode)
+    assert decode.calls == 1
+    cache.verify("t2", decode)
+    assert decode.calls == 2
+    assert cache.snapshot()["hit_rate"] == pytest.approx(1 / 3, abs=1e-3)
+
+
+def test_expired_entry_is_verified_again():
+    decode = CountingDecoder({"sub": 1, "exp": time.time() - 1})
+    cache = JWTVerificationCache()
+
+    cache.verify("t1", decode)
+    cache.verify("t1", decode)
+
+    assert decode.calls == 2
+    assert cache.stats["expired"] == 1
+
+
+def test_token_without_exp_is_kept_at_most_max_ttl():
+    decode = CountingDecoder({"sub": 1})
+    cache = JWTVerificationCache(max_ttl=0.05)
+
+    cache.verify("t1", decode)
+    cache.verify("t1", decode)
+    time.sleep(0.06)
+    cache.verify("t1", decode)
+
+    assert decode.calls == 2
+
+
+def test_invalid_tokens_are_not_cached():
+    decode = CountingDecoder({"sub": 1})
+    cache = JWTVerificationCache()
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cache.verify("invalido", decode)
+
+    assert decode.calls == 2
+    assert cache.snapshot()["entries"] == 0
+
+
+def test_least_recently_used_token_is_evicted():
+    decode = CountingDecoder({"sub": 1})
+    cache = JWTVerificationCache(max_entries=2)
+
+    cache.verify("t1", decode)
+    cache.verify("t2", decode)
+    cache.verify("t1", decode)
+    cache.verify("t3", decode)
+    cache.verify("t1", decode)
+    cache.verify("t2", decode)
+
+    assert decode.calls == 4
+    assert cache.stats["evictions"] == 2
@@ -0,0 +1,35 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from app.services.payload_decoder import TagSetCache, decode_reading, escape_tag_value, format_float
+from scripts.bench_decoder import reference_lines
+
+NOW_NS = time.time_ns()
+
+TAG_VALUES = ["dev 1", "a,b=c", "fin\\", "ñandú-é", "tab\tx", "=igual", "x" * 200]
+
+
+@pytest.mark.parametrize("value", TAG_VALUES)
+@pytest.mark.parametrize("precision", ["s", "ms", "us", "ns"])
+def test_direct_lines_match_influxdb_point(value, precision):
+    reading = {
+        "user_id": 3, "device_id": value, "org_id": value, "site": value,
+        "heart_rate": 72, "hrv": 41.25, "noise_db": 40.0, "timestamp": "2024-05-01T10:00:00.123456Z",
+    }
+    out = bytearray()
+    decode_reading(reading, out, TagSetCache(), precision, NOW_NS, timedelta(seconds=300), timedelta(days=3650))
+
+    assert bytes(out).split(b"\n") == reference_lines(reading, precision, NOW_NS)
+
+
+def test_trailing_backslash_does_not_escape_the_separator():
+    assert escape_tag_value("fin\\") == "fin\\ "
+    assert escape_tag_value("a b,c=d") == "a\\ b\\,c\\=d"
+
+
+@pytest.mark.parametrize("value, text", [(72.0, "72"), (41.25, "41.25"), (1e-7, "1e-07"), (-0.5, "-0.5")])
+def test_format_float_like_point(value, text):
+    assert format_float(value) == text
+
@@ -0,0 +1,114 @@
+import gzip
+
+import msgpack
+import pytest
+
+from app.services.payload_codecs import (
+    BodyDecoder,
+    CorruptPayload,
+    MsgpackRecordStream,
+    PayloadTooLarge,
+    UnsupportedEncoding,
+    expand_field_ids,
+)
+from conftest import written_lines
+
+READINGS = [{3: f"mp-{i}", 10: 60 + i % 40, 4: 1714557600 + i} for i in range(200)]
+
+
+def _stream(body, step, max_buffer_size=1 << 20):
+    stream = MsgpackRecordStream(max_buffer_size)
+    records = []
+    for start in range(0, len(body), step):
+        records += list(stream.feed(body[start:start + step]))
+    stream.finish()
+    return records
+
+
+def test_expand_field_ids_maps_ids_and_drops_unknown():
+    assert expand_field_ids({3: "d1", 10: 72, 999: "x", "site": "s1"}) == {
+        "device_id": "d1", "heart_rate": 72, "site": "s1",
+    }
+    assert expand_field_ids([1, 2]) == [1, 2]
+
+
+@pytest.mark.parametrize("step", [1, 7, 4096])
+def test_array_and_sequence_give_the_same_records(step):
+    as_array = _stream(msgpack.packb(READINGS), step)
+    as_sequence = _stream(b"".join(msgpack.packb(r) for r in READINGS), step)
+
+    assert as_array == as_sequence
+    assert len(as_array) == 200
+    assert as_array[5] == {"device_id": "mp-5", "heart_rate": 65, "timestamp": 1714557605}
+
+
+def test_array_items_are_yielded_before_the_array_ends():
+    body = msgpack.packb(READINGS)
+    stream = MsgpackRecordStream(1 << 20)
+
+    first = list(stream.feed(body[:len(body) // 2]))
+
+    assert 0 < len(first) < len(READINGS)
+    assert first[0]["device_id"] == "mp-0"
+
+
+def test_array_larger_than_buffer_streams_item_by_item():
+    # El buffer solo retiene la lectura en curso, no el array completo
+    body = msgpack.packb(READINGS)
+    assert len(body) > 200
+    assert len(_stream(body, 50, max_buffer_size=200)) == len(READINGS)
+
+
+def test_record_larger_than_buffer_is_too_large():
+    with pytest.raises(PayloadTooLarge):
+        _stream(msgpack.packb({3: "x" * 500}), 1000, max_buffer_size=200)
+
+
+@pytest.mark.parametrize("body", [
+    msgpack.packb(READINGS)[:-3],
+    msgpack.packb(READINGS[:3])[:1],
+    msgpack.packb(READINGS[:3])[:-len(msgpack.packb(READINGS[2]))],
+])
+def test_truncated_body_is_corrupt(body):
+    with pytest.raises(CorruptPayload):
+        _stream(body, 64)
+
+
+def test_invalid_byte_is_corrupt():
+    with pytest.raises(CorruptPayload):
+        _stream(b"\xc1", 1)
+
+
+def test_body_decoder_gzip_roundtrip_and_cap():
+    raw = msgpack.packb(READINGS)
+    compressed = gzip.compress(raw)
+
+    decoder = BodyDecoder("gzip", max_bytes=len(raw))
+    out = b"".join(decoder.feed(compressed[:10])) + b"".join(decoder.feed(compressed[10:]))
+    assert out + b"".join(decoder.finish()) == raw
+
+    decoder = BodyDecoder("gzip", max_bytes=len(raw) - 1)
+    with pytest.raises(PayloadTooLarge):
+        list(decoder.feed(compressed))
+
+    decoder = BodyDecoder("gzip", max_bytes=len(raw))
+    list(decoder.feed(compressed[:-8]))
+    with pytest.raises(CorruptPayload):
+        list(decoder.finish())
+
+
+def test_body_decoder_rejects_unknown_encoding():
+    with pytest.raises(UnsupportedEncoding):
+        BodyDecoder("br", max_bytes=100)
+
+
+def test_bulk_msgpack_array_with_field_ids(client, headers):
+    body = msgpack.packb([{3: "mp-bulk-1", 10: 70}, {3: "mp-bulk-2"}, {3: "mp-bulk-3", 23: 41.5}])
+    r = client.post(
+        "/api/biometric/bulk", content=body, headers={**headers, "Content-Type": "application/msgpack"}
+    )
+
+    assert r.status_code == 200
+    assert (r.json()["accepted"], r.json()["rejected"]) == (2, 1)
+    assert " hr_bpm=70i " in written_lines(client, "mp-bulk-1", 1)[0]
+    assert written_lines(client, "mp-bulk-3", 1)
@@ -0,0 +1,62 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from app.services.payload_decoder import FastPathUnsupported, TagSetCache, decode_reading
+
+NOW_NS = time.time_ns()
+SKEW = timedelta(seconds=300)
+MAX_AGE = timedelta(days=3650)
+
+
+def _decode(body):
+    out = bytearray()
+    count = decode_reading(body, out, TagSetCache(), "s", NOW_NS, SKEW, MAX_AGE)
+    return count, bytes(out)
+
+
+def test_decode_reading_canonical_json():
+    count, out = _decode({
+        "user_id": 7, "device_id": "w1", "org_id": "acme",
+        "heart_rate": 72, "hrv": 41.5, "co2_ppm": 600,
+        "timestamp": "2024-05-01T10:00:00Z",
+    })
+    assert count == 2
+    assert out == (
+        b"wearable_biometrics,device_id=w1,org_id=acme,worker_id=7 hr_bpm=72i,hrv_rmssd_ms=41.5 1714557600\n"
+        b"env_air,device_id=w1,org_id=acme,worker_id=7 co2_ppm=600 1714557600"
+    )
+
+
+@pytest.mark.parametrize("timestamp", [
+    "2024-13-01T00:00:00",
+    "2024-01-01T25:00",
+    "2024-02-30T00:00:00",
+    "2024-01-01T10:61:00Z",
+])
+def test_impossible_iso_timestamp_falls_back_to_pydantic(timestamp):
+    # Antes fromisoformat lanzaba ValueError y la petición acababa en 500
+    with pytest.raises(FastPathUnsupported):
+        _decode({"device_id": "w1", "heart_rate": 72, "timestamp": timestamp})
+
+
+@pytest.mark.parametrize("timestamp", ["2024-13-01T00:00:00", "2024-02-30T00:00:00"])
+def test_impossible_iso_timestamp_is_a_validation_error(client, headers, timestamp):
+    r = client.post(
+        "/api/biometric",
+        json={"device_id": "ts-invalido", "heart_rate": 72, "timestamp": timestamp},
+        headers=headers,
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"].startswith("Payload inválido")
+
+
+def test_tag_set_cache_reuses_encoded_tags():
+    cache = TagSetCache(max_entries=1)
+    first = cache.get("acme", 7, None, "w1")
+    assert first == b",device_id=w1,org_id=acme,worker_id=7"
+    assert cache.get("acme", 7, None, "w1") is first
+    cache.get("acme", 8, None, "w2")
+    assert cache.snapshot()["entries"] == 1
+    assert (cache.hits, cache.misses) == (1, 2)
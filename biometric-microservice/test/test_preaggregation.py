@@ -0,0 +1,89 @@
+import pytest
+
+from app.services.preaggregation import EdgePreAggregator, parse_window_spec
+
+ENV_AIR = 2
+TAGS = b",device_id=pa-1"
+T0_NS = 1714557600 * 10**9
+
+
+def _sample(offset_s, co2):
+    return (ENV_AIR, TAGS, T0_NS + offset_s * 10**9, [f"co2_ppm={co2}"])
+
+
+def _aggregator(emitted, **kwargs):
+    kwargs.setdefault("grace", 0)
+    return EdgePreAggregator({"env_air": 60}, emitted.append, **kwargs)
+
+
+def test_parse_window_spec():
+    assert parse_window_spec(" env_air=60, env_ambient=300 ,") == {"env_air": 60.0, "env_ambient": 300.0}
+
+
+@pytest.mark.parametrize("spec", ["nope=60", "wearable_biometrics=60", "env_air=x", "env_air=0.5"])
+def test_parse_window_spec_rejects_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_window_spec(spec)
+
+
+def test_closed_window_emits_one_point_with_mean_min_max_count(monkeypatch):
+    # Reloj de pared dentro de la ventana: solo la marca de agua puede cerrarla
+    monkeypatch.setattr("app.services.preaggregation.time.time_ns", lambda: T0_NS + 30 * 10**9)
+    emitted = []
+    aggregator = _aggregator(emitted)
+    aggregator.add([_sample(0, 400), _sample(30, 600), _sample(59, 500)])
+
+    # La ventana sigue abierta hasta que llega una muestra posterior a su final
+    assert aggregator.flush() == 0
+    aggregator.add([_sample(61, 700)])
+    assert aggregator.flush() == 1
+
+    assert emitted == [
+        b"env_air,device_id=pa-1 co2_ppm=500,co2_ppm_count=3i,co2_ppm_max=600,co2_ppm_min=400 1714557600"
+    ]
+
+
+def test_late_sample_reemits_the_whole_window():
+    emitted = []
+    aggregator = _aggregator(emitted)
+    aggregator.add([_sample(0, 400), _sample(61, 700)])
+    aggregator.flush()
+
+    aggregator.add([_sample(10, 600)])
+    aggregator.flush()
+
+    assert emitted[-1].startswith(b"env_air,device_id=pa-1 co2_ppm=500,co2_ppm_count=2i")
+    assert aggregator.stats["late_merges"] == 1
+
+
+def test_failed_emit_keeps_windows_for_next_flush():
+    def failing(lines):
+        raise RuntimeError("cola llena")
+
+    aggregator = EdgePreAggregator({"env_air": 60}, failing, grace=0)
+    aggregator.add([_sample(0, 400), _sample(61, 700)])
+
+    assert aggregator.flush() == 0
+    assert aggregator.stats["emit_failures"] == 1
+    assert aggregator.snapshot()["open_windows"] == 2
+
+    emitted = []
+    aggregator._emit = emitted.append
+    assert aggregator.flush(force=True) == 2
+
+
+def test_windows_beyond_limit_are_dropped():
+    emitted = []
+    aggregator = _aggregator(emitted, max_windows=1)
+    aggregator.add([_sample(0, 400), _sample(61, 700)])
+
+    assert aggregator.stats["dropped"] == 1
+
+
+def test_precision_scales_window_timestamp():
+    emitted = []
+    aggregator = _aggregator(emitted, precision="ms")
+    aggregator.add([_sample(5, 400)])
+    aggregator.flush(force=True)
+
+    assert emitted[0].endswith(b" 1714557600000")
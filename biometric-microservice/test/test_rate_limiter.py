@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+import pytest
+
+from app.routers import biometricroutes
+from app.services.batch_writer import WriteQueueFull
+from app.services.rate_limiter import RateLimited, TokenBucketLimiter
+from conftest import auth_headers
+
+
+def _costs(limiter, *readings):
+    costs = {}
+    for device_id, org_id in readings:
+        limiter.charge(costs, device_id, org_id)
+    return costs
+
+
+def test_burst_then_limited_with_retry_after():
+    limiter = TokenBucketLimiter(device_rate=10, device_burst=5, org_rate=0, org_burst=0)
+    costs = _costs(limiter, *[("d1", "acme")] * 5)
+    assert costs == {("device", "d1"): 5}  # org desactivado con ritmo 0
+
+    asyncio.run(limiter.acquire(costs))
+    with pytest.raises(RateLimited) as excinfo:
+        asyncio.run(limiter.acquire(_costs(limiter, ("d1", "acme"))))
+    assert excinfo.value.scope == "device"
+    assert 0 < excinfo.value.retry_after <= 0.1 + 1e-6
+    assert limiter.stats["limited_device"] == 1
+
+
+def test_large_batch_passes_once_and_leaves_debt():
+    limiter = TokenBucketLimiter(device_rate=10, device_burst=5, org_rate=0, org_burst=0)
+    asyncio.run(limiter.acquire({("device", "d1"): 50}))
+    with pytest.raises(RateLimited) as excinfo:
+        asyncio.run(limiter.acquire({("device", "d1"): 1}))
+    # 45 tokens de deuda más el que se pide, a 10/s
+    assert excinfo.value.retry_after == pytest.approx(4.6, abs=0.05)
+
+
+def test_limited_request_charges_no_bucket():
+    limiter = TokenBucketLimiter(device_rate=10, device_burst=5, org_rate=100, org_burst=3)
+    asyncio.run(limiter.acquire({("device", "d1"): 1, ("org", "acme"): 3}))
+    with pytest.raises(RateLimited) as excinfo:
+        asyncio.run(limiter.acquire({("device", "d1"): 1, ("org", "acme"): 1}))
+    assert excinfo.value.scope == "org"
+    assert limiter._buckets[("device", "d1")][0] == pytest.approx(4, abs=0.01)
+
+
+def test_refund_restores_tokens_up_to_burst():
+    limiter = TokenBucketLimiter(device_rate=1, device_burst=5, org_rate=0, org_burst=0)
+    asyncio.run(limiter.acquire({("device", "d1"): 5}))
+    asyncio.run(limiter.refund({("device", "d1"): 5}))
+    assert limiter._buckets[("device", "d1")][0] == pytest.approx(5, abs=0.01)
+    asyncio.run(limiter.refund({("device", "d1"): 5}))
+    assert limiter._buckets[("device", "d1")][0] <= 5
+    assert limiter.stats["refunded"] == 2
+
+
+def test_full_queue_does_not_spend_tokens(client, headers, monkeypatch):
+    monkeypatch.setattr(biometricroutes.writer, "max_queue", 0)
+    r = client.post("/api/biometric", json={"device_id": "rl-full-1", "heart_rate": 70}, headers=headers)
+
+    assert r.status_code == 429
+    assert "Retry-After" in r.headers
+    assert ("device", "rl-full-1") not in biometricroutes.limiter._buckets
+
+
+def test_queue_filled_after_acquire_refunds_tokens(client, headers, monkeypatch):
+    def _full(records):
+        raise WriteQueueFull("Cola de escritura llena")
+
+    monkeypatch.setattr(biometricroutes.writer, "enqueue", _full)
+    r = client.post("/api/biometric", json={"device_id": "rl-full-2", "heart_rate": 70}, headers=headers)
+
+    assert r.status_code == 429
+    tokens = biometricroutes.limiter._buckets[("device", "rl-full-2")][0]
+    assert tokens == pytest.approx(biometricroutes.RATE_LIMIT_DEVICE_BURST)
+
+
+def test_org_quota_follows_the_token_not_the_body(client, monkeypatch):
+    limiter = TokenBucketLimiter(device_rate=100, device_burst=100, org_rate=0.001, org_burst=2)
+    monkeypatch.setattr(biometricroutes, "limiter", limiter)
+    headers = auth_headers({"org_id": "rl-org-token"})
+
+    statuses = [
+        client.post("/api/biometric", json={"device_id": "rl-org-1", "org_id": org_id, "heart_rate": 70},
+                    headers=headers).status_code
+        for org_id in ("otra-1", "otra-2", "otra-3")
+    ]
+
+    assert statuses == [200, 200, 429]
+    assert set(limiter._buckets) == {("device", "rl-org-1"), ("org", "rl-org-token")}
+
+
+def test_bulk_and_websocket_charge_the_token_org(client, monkeypatch):
+    limiter = TokenBucketLimiter(device_rate=100, device_burst=100, org_rate=0.001, org_burst=100)
+    monkeypatch.setattr(biometricroutes, "limiter", limiter)
+    headers = auth_headers({"org_id": "rl-org-bulk"})
+
+    client.post("/api/biometric/bulk", json=[{"device_id": "rl-org-2", "org_id": "otra", "heart_rate": 70}],
+                headers=headers)
+    with client.websocket_connect("/api/biometric/stream", headers=headers) as ws:
+        ws.send_text(json.dumps({"device_id": "rl-org-3", "org_id": "otra", "heart_rate": 70}))
+        assert ws.receive_json()["type"] == "ack"
+
+    assert limiter._buckets[("org", "rl-org-bulk")][0] == pytest.approx(98, abs=0.01)
+    assert ("org", "otra") not in limiter._buckets
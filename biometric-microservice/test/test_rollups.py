@@ -0,0 +1,118 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services.rollups import RollupAggregator
+
+DAY1_NS = 1714557600 * 10**9
+DAY2_NS = DAY1_NS + 86400 * 10**9
+
+
+class FakeConnection:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.executed = []
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def execute(self, sql, *args):
+        if self.fail:
+            raise ConnectionError("postgres caído")
+        self.executed.append((sql, args))
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+def _aggregator(conn, **kwargs):
+    aggregator = RollupAggregator("postgresql://unused", **kwargs)
+    aggregator._pool = FakePool(conn)
+    return aggregator
+
+
+def _merge_rows(conn):
+    # Segunda sentencia: columnas de deltas, traspuestas a filas
+    _, columns = conn.executed[-1]
+    return sorted(zip(*columns))
+
+
+def test_observe_accumulates_per_worker_day_and_metric():
+    aggregator = _aggregator(FakeConnection())
+    aggregator.observe(7, DAY1_NS, {"heart_rate": 60, "pasos": 100})
+    aggregator.observe(7, DAY1_NS + 3600 * 10**9, {"heart_rate": 80})
+    aggregator.observe(7, DAY2_NS, {"heart_rate": 70})
+    aggregator.observe(None, DAY1_NS, {"heart_rate": 90})
+    aggregator.observe(7, DAY1_NS, {"heart_rate": float("nan"), "estres": True, "sleep_score": "80"})
+
+    day1 = DAY1_NS // (86400 * 10**9)
+    assert aggregator._pending[(7, day1, "heart_rate")] == [2, 140.0, 10000.0, 60.0, 80.0]
+    assert aggregator._pending[(7, day1, "activity_level")] == [1, 100.0, 10000.0, 100.0, 100.0]
+    assert len(aggregator._pending) == 3
+    assert aggregator.stats["observed"] == 4
+
+
+def test_flush_sends_one_batched_merge_in_a_transaction():
+    conn = FakeConnection()
+    aggregator = _aggregator(conn, job_version="test")
+    aggregator.observe(7, DAY1_NS, {"heart_rate": 60, "sleep_score": 80})
+    aggregator.observe(8, DAY2_NS, {"heart_rate": 70})
+
+    assert asyncio.run(aggregator.flush()) == 3
+
+    assert len(conn.executed) == 2
+    ensure_sql, ensure_args = conn.executed[0]
+    assert "INSERT INTO group_snapshots" in ensure_sql
+    assert ensure_args[0] == [7, 7, 8] and ensure_args[2] == "test"
+    day1 = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    day2 = datetime(2024, 5, 2, tzinfo=timezone.utc)
+    assert _merge_rows(conn) == [
+        (7, day1, "heart_rate", 1, 60.0, 3600.0, 60.0, 60.0),
+        (7, day1, "sleep_quality", 1, 80.0, 6400.0, 80.0, 80.0),
+        (8, day2, "heart_rate", 1, 70.0, 4900.0, 70.0, 70.0),
+    ]
+    assert aggregator._pending == {}
+    assert aggregator.stats["flushed_keys"] == 3
+
+
+def test_failed_flush_restores_and_merges_deltas():
+    conn = FakeConnection(fail=True)
+    aggregator = _aggregator(conn)
+    aggregator.observe(7, DAY1_NS, {"heart_rate": 60})
+
+    assert asyncio.run(aggregator.flush()) == 0
+    assert aggregator.stats["failed_flushes"] == 1
+
+    aggregator.observe(7, DAY1_NS, {"heart_rate": 90})
+    conn.fail = False
+    asyncio.run(aggregator.flush())
+    assert [row[3:] for row in _merge_rows(conn)] == [(2, 150.0, 11700.0, 60.0, 90.0)]
+
+
+def test_new_keys_beyond_limit_are_dropped():
+    aggregator = _aggregator(FakeConnection(), max_keys=1)
+    aggregator.observe(7, DAY1_NS, {"heart_rate": 60})
+    aggregator.observe(8, DAY1_NS, {"heart_rate": 60})
+    aggregator.observe(7, DAY1_NS, {"heart_rate": 70})
+
+    assert len(aggregator._pending) == 1
+    assert aggregator.stats["dropped"] == 1
+
+
+@pytest.mark.parametrize("pool", [None, "empty"])
+def test_flush_without_pool_or_deltas_does_nothing(pool):
+    aggregator = RollupAggregator("postgresql://unused")
+    if pool:
+        aggregator._pool = FakePool(FakeConnection())
+    else:
+        aggregator.observe(7, DAY1_NS, {"heart_rate": 60})
+    assert asyncio.run(aggregator.flush()) == 0
@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.routers import biometricroutes
+from conftest import auth_headers
+
+
+class FakeRecord:
+    def __init__(self, field, value):
+        self._field, self._value = field, value
+
+    def get_field(self):
+        return self._field
+
+    def get_time(self):
+        return datetime(2024, 5, 1, 10, 0, tzinfo=timezone.utc)
+
+    def get_value(self):
+        return self._value
+
+
+class FakeQueryApi:
+    def __init__(self):
+        self.queries = []
+
+    def query_stream(self, flux, org):
+        self.queries.append(flux)
+        return iter([FakeRecord("hr_bpm", 72)])
+
+
+@pytest.fixture
+def query_api(monkeypatch):
+    fake = FakeQueryApi()
+    monkeypatch.setattr(biometricroutes, "query_api", fake)
+    return fake
+
+
+def _get(client, path, claims):
+    return client.get(path, params={"fields": "heart_rate"}, headers=auth_headers(claims))
+
+
+def test_worker_reads_own_series_within_token_org(client, query_api):
+    r = _get(client, "/api/biometric/series/workers/41", {"sub": 41, "role": "Employee", "org_id": 3})
+
+    assert r.status_code == 200
+    assert r.text.splitlines()[0].startswith('{"field": "heart_rate"')
+    assert 'r["org_id"] == "3"' in query_api.queries[0]
+    assert 'r["worker_id"] == "41"' in query_api.queries[0]
+
+
+def test_worker_cannot_read_other_worker_series(client, query_api):
+    r = _get(client, "/api/biometric/series/workers/42", {"sub": 41, "role": "Employee", "org_id": 3})
+    assert r.status_code == 403
+    assert not query_api.queries
+
+
+@pytest.mark.parametrize("path", ["/api/biometric/series/devices/d1", "/api/biometric/series/sites/madrid"])
+def test_device_and_site_series_require_read_role(client, query_api, path):
+    assert _get(client, path, {"sub": 41, "role": "Employee", "org_id": 3}).status_code == 403
+    assert _get(client, path, {"sub": 41, "role": "Manager", "org_id": 3}).status_code == 200
+
+
+def test_org_comes_from_token_not_query_string(client, query_api):
+    r = client.get(
+        "/api/biometric/series/workers/43",
+        params={"fields": "heart_rate", "org_id": "99"},
+        headers=auth_headers({"sub": 7, "role": "Admin", "org_id": 3}),
+    )
+    assert r.status_code == 200
+    assert 'r["org_id"] == "3"' in query_api.queries[0]
+    assert '"99"' not in query_api.queries[0]
+
+
+def test_token_without_org_is_forbidden(client, query_api):
+    r = _get(client, "/api/biometric/series/workers/41", {"sub": 41, "role": "Admin"})
+    assert r.status_code == 403
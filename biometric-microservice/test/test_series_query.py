@@ -0,0 +1,96 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.series_query import (
+    HotWindowCache,
+    InvalidSeriesQuery,
+    SeriesWindow,
+    build_series_flux,
+    lttb,
+)
+
+T0 = datetime(2024, 5, 1, 10, 0, 7, tzinfo=timezone.utc)
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    points = [(float(i), math.sin(i / 10)) for i in range(1000)]
+    points[500] = (500.0, 50.0)
+
+    sampled = lttb(points, 50)
+
+    assert len(sampled) == 50
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert (500.0, 50.0) in sampled
+    assert [x for x, _ in sampled] == sorted(x for x, _ in sampled)
+
+
+def test_lttb_small_thresholds():
+    points = [(float(i), float(i)) for i in range(10)]
+    assert lttb(points, 20) == points
+    assert lttb(points, 2) == [points[0], points[-1]]
+    assert lttb(points, 0) == []
+
+
+def test_window_step_fits_budget_and_is_aligned():
+    window = SeriesWindow(T0, T0 + timedelta(hours=1), points=100)
+
+    assert window.every_s == 36
+    assert window.start_s % 36 == 0 and window.stop_s % 36 == 0
+    assert window.start <= T0 and window.stop >= T0 + timedelta(hours=1)
+    # Dos peticiones con segundos de diferencia comparten ventana
+    shifted = SeriesWindow(T0 + timedelta(seconds=2), T0 + timedelta(hours=1, seconds=2), points=100)
+    assert (shifted.start_s, shifted.stop_s) == (window.start_s, window.stop_s)
+
+
+@pytest.mark.parametrize("start, stop, points", [(T0, T0, 10), (T0, T0 + timedelta(hours=1), 0)])
+def test_window_rejects_invalid_ranges(start, stop, points):
+    with pytest.raises(InvalidSeriesQuery):
+        SeriesWindow(start, stop, points)
+
+
+def test_flux_filters_by_measurement_field_and_escaped_tags():
+    window = SeriesWindow(T0, T0 + timedelta(hours=1), points=100)
+    flux = build_series_flux("bio", {"org_id": 'a"${x}', "worker_id": "7"}, ["heart_rate", "co2_ppm"], window, "mean")
+
+    assert 'r._measurement == "wearable_biometrics" and (r._field == "hr_bpm")' in flux
+    assert 'r._measurement == "env_air" and (r._field == "co2_ppm")' in flux
+    assert 'r["org_id"] == "a\\"\\${x}"' in flux
+    assert "aggregateWindow(every: 36s, fn: mean" in flux
+
+
+def test_flux_lttb_selects_min_and_max_candidates():
+    window = SeriesWindow(T0, T0 + timedelta(hours=1), points=100, oversample=4)
+    flux = build_series_flux("bio", {}, ["heart_rate"], window, "lttb")
+
+    assert "window(every: 9s" in flux
+    assert "union(tables: [data |> min(), data |> max()])" in flux
+
+
+@pytest.mark.parametrize("fields, method", [(["heart_rate"], "sum"), (["nope"], "mean"), ([], "mean")])
+def test_flux_rejects_unknown_fields_and_methods(fields, method):
+    window = SeriesWindow(T0, T0 + timedelta(hours=1), points=10)
+    with pytest.raises(InvalidSeriesQuery):
+        build_series_flux("bio", {}, fields, window, method)
+
+
+def test_cache_expires_hot_windows_and_evicts_by_size(monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr("app.services.series_query.time.time", lambda: clock[0])
+    cache = HotWindowCache(max_entries=2, max_bytes=400, hot_ttl=10, cold_ttl=600)
+    recent = datetime.fromtimestamp(clock[0], timezone.utc)
+    old = recent - timedelta(days=1)
+
+    cache.put(("hot",), [b"x" * 10], recent)
+    cache.put(("cold",), [b"y" * 10], old)
+    clock[0] += 60
+    assert cache.get(("hot",)) is None
+    assert cache.get(("cold",)) == [b"y" * 10]
+
+    cache.put(("big",), [b"z" * 200], old)
+    assert cache.stats["uncacheable"] == 1
+    cache.put(("a",), [b"a"], old)
+    cache.put(("b",), [b"b"], old)
+    assert cache.get(("cold",)) is None
+    assert cache.stats["evictions"] == 1
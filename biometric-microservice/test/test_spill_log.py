@@ -0,0 +1,123 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services.spill_log import SpillLog
+
+
+def _lines(prefix, n):
+    return [f"m,device_id={prefix}-{i} v={i}i 1714557600".encode() for i in range(n)]
+
+
+def test_replay_sends_all_lines_in_batches_and_removes_segments(tmp_path):
+    spill = SpillLog(str(tmp_path), segment_max_bytes=200, replay_batch_lines=3)
+    spill.append(_lines("a", 5))
+    spill.append([b"m,device_id=b v=1i 1\nm,device_id=b v=2i 2\n"])
+    batches = []
+
+    replayed = spill.replay_once(lambda batch: batches.append(list(batch)))
+
+    assert replayed == 7
+    assert all(len(batch) <= 3 for batch in batches)
+    assert sum(batches, []) == _lines("a", 5) + [b"m,device_id=b v=1i 1", b"m,device_id=b v=2i 2"]
+    assert spill.backlog_bytes == 0
+    assert os.listdir(tmp_path) == []
+    assert spill.stats["replayed_lines"] == 7
+
+
+def test_failed_replay_keeps_segment_for_next_attempt(tmp_path):
+    spill = SpillLog(str(tmp_path), replay_batch_lines=2)
+    spill.append(_lines("a", 4))
+
+    def failing(batch):
+        raise ConnectionError("influx caído")
+
+    with pytest.raises(ConnectionError):
+        spill.replay_once(failing)
+    assert spill.backlog_segments == 1
+
+    # El segmento se reenvía completo: las líneas repetidas son idempotentes
+    batches = []
+    assert spill.replay_once(batches.append) == 4
+    assert spill.backlog_bytes == 0
+
+
+def test_pending_segments_survive_restart(tmp_path):
+    spill = SpillLog(str(tmp_path))
+    spill.append(_lines("a", 3))
+    spill._seal_active()
+
+    reopened = SpillLog(str(tmp_path))
+    reopened.append(_lines("b", 1))
+    batches = []
+
+    assert reopened.replay_once(batches.append) == 4
+    assert batches[0] == _lines("a", 3)
+    assert batches[1] == _lines("b", 1)
+
+
+def test_disk_budget_drops_oldest_segments(tmp_path):
+    line_bytes = len(_lines("a", 1)[0]) + 1
+    spill = SpillLog(str(tmp_path), segment_max_bytes=line_bytes, max_total_bytes=2 * line_bytes)
+    for prefix in ("a", "b", "c"):
+        spill.append(_lines(prefix, 1))
+
+    batches = []
+    spill.replay_once(batches.append)
+
+    assert spill.stats["dropped_segments"] == 1
+    assert sum(batches, []) == _lines("b", 1) + _lines("c", 1)
+
+
+class FakeApiError(Exception):
+    def __init__(self, status):
+        super().__init__(f"({status})")
+        self.status = status
+
+
+def test_rejected_batch_is_quarantined_and_replay_recovers(tmp_path):
+    spill = SpillLog(str(tmp_path), replay_batch_lines=2, replay_interval=0.01)
+    spill.append(_lines("a", 5))
+    batches = []
+    recovered = []
+
+    def write(batch):
+        if batch[0] == _lines("a", 1)[0]:
+            raise FakeApiError(400)
+        batches.append(list(batch))
+
+    async def scenario():
+        spill.start_replayer(write, lambda: recovered.append(True))
+        for _ in range(100):
+            if recovered:
+                break
+            await asyncio.sleep(0.01)
+        await spill.stop()
+
+    asyncio.run(scenario())
+
+    assert recovered
+    assert sum(batches, []) == _lines("a", 5)[2:]
+    assert spill.backlog_bytes == 0
+    assert spill.stats["quarantined_lines"] == 2
+    assert spill.stats["replayed_lines"] == 3
+    quarantined = os.listdir(tmp_path / "quarantine")
+    assert len(quarantined) == 1
+    assert (tmp_path / "quarantine" / quarantined[0]).read_bytes().splitlines() == _lines("a", 2)
+
+    # La cuarentena no se toma por un segmento pendiente al reiniciar
+    assert SpillLog(str(tmp_path)).backlog_segments == 0
+
+
+def test_transient_error_still_stops_replay(tmp_path):
+    spill = SpillLog(str(tmp_path), replay_batch_lines=2)
+    spill.append(_lines("a", 4))
+
+    def failing(batch):
+        raise FakeApiError(503)
+
+    with pytest.raises(FakeApiError):
+        spill.replay_once(failing)
+    assert spill.backlog_segments == 1
+    assert spill.stats["quarantined_lines"] == 0
@@ -0,0 +1,56 @@
+import pytest
+
+from app.services.tenancy import BucketRouter, TagPolicy, parse_assignments
+
+
+def test_parse_assignments():
+    assert parse_assignments(" acme=bio_acme, beta = bio_beta ,") == {"acme": "bio_acme", "beta": "bio_beta"}
+    with pytest.raises(ValueError):
+        parse_assignments("acme")
+
+
+def test_tag_policy_drops_and_hashes():
+    policy = TagPolicy({"user_email": "drop", "worker_id": "hash", "site": "keep"}, salt="s")
+    tags = policy.apply({"device_id": "d1", "worker_id": "7", "user_email": "a@b.c", "site": "s1"})
+
+    assert tags == {"device_id": "d1", "worker_id": policy.hash_value("7"), "site": "s1"}
+    assert len(tags["worker_id"]) == 16
+    assert policy.hash_value("7") != TagPolicy({"worker_id": "hash"}, salt="otra").hash_value("7")
+    assert policy.query_value("worker_id", "7") == tags["worker_id"]
+    assert policy.query_value("site", "s1") == "s1"
+    with pytest.raises(ValueError):
+        policy.query_value("user_email", "a@b.c")
+    assert not TagPolicy({"site": "keep"})
+
+
+@pytest.mark.parametrize("actions", [{"org_id": "drop"}, {"site": "encrypt"}])
+def test_tag_policy_rejects_protected_tags_and_unknown_actions(actions):
+    with pytest.raises(ValueError):
+        TagPolicy(actions)
+
+
+def test_bucket_router_splits_lines_by_org_tag():
+    router = BucketRouter("bio", {"acme": "bio_acme", "a b": "bio_ab"})
+    records = [
+        b"m,device_id=d1,org_id=acme v=1 1\nm,device_id=d2,org_id=beta v=1 1",
+        b"m,device_id=d3,org_id=a\\ b v=1 1",
+        b"m,device_id=d4 v=1 1",
+    ]
+
+    groups = router.split(records)
+
+    assert groups == {
+        "bio_acme": [b"m,device_id=d1,org_id=acme v=1 1"],
+        "bio": [b"m,device_id=d2,org_id=beta v=1 1", b"m,device_id=d4 v=1 1"],
+        "bio_ab": [b"m,device_id=d3,org_id=a\\ b v=1 1"],
+    }
+    assert router.bucket_for("acme") == "bio_acme"
+    assert router.bucket_for(None) == "bio"
+
+    router.written("bio", groups["bio"])
+    assert router.snapshot()["lines_by_bucket"] == {"bio": 2}
+
+
+def test_bucket_router_without_org_buckets_keeps_records_whole():
+    records = [b"m,org_id=acme v=1 1\nm,org_id=beta v=1 1"]
+    assert BucketRouter("bio", {}).split(records) == {"bio": records}
@@ -0,0 +1,75 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from app.routers import biometricroutes
+from conftest import written_lines
+
+
+def _timestamp_of(line):
+    return int(line.rsplit(" ", 1)[1])
+
+
+@pytest.mark.parametrize("device_id, timestamp", [
+    ("ts-epoch-s", 1714557600),
+    ("ts-epoch-ms", 1714557600123),
+    ("ts-iso-z", "2024-05-01T10:00:00Z"),
+    ("ts-iso-offset", "2024-05-01T12:00:00+02:00"),
+    ("ts-iso-naive", "2024-05-01T10:00:00"),
+])
+def test_client_timestamp_is_written_in_utc_seconds(client, headers, device_id, timestamp):
+    r = client.post("/api/biometric", json={"device_id": device_id, "heart_rate": 70, "timestamp": timestamp},
+                    headers=headers)
+
+    assert r.status_code == 200
+    assert _timestamp_of(written_lines(client, device_id, 1)[0]) == 1714557600
+
+
+def test_missing_timestamp_uses_arrival_time(client, headers):
+    before = int(time.time())
+    client.post("/api/biometric", json={"device_id": "ts-none", "heart_rate": 70}, headers=headers)
+
+    assert before <= _timestamp_of(written_lines(client, "ts-none", 1)[0]) <= int(time.time())
+
+
+def test_future_timestamp_beyond_skew_is_rejected(client, headers):
+    future = int(time.time()) + 3600
+    r = client.post("/api/biometric", json={"device_id": "ts-future", "heart_rate": 70, "timestamp": future},
+                    headers=headers)
+
+    assert r.status_code == 400
+    assert "futuro" in r.json()["detail"]
+
+
+@pytest.mark.parametrize("timestamp", [1714557600, "2024-05-01T10:00:00Z"])
+def test_timestamp_older_than_max_past_age_is_rejected(client, headers, monkeypatch, timestamp):
+    monkeypatch.setattr(biometricroutes, "MAX_PAST_AGE", timedelta(days=30))
+    r = client.post("/api/biometric", json={"device_id": "ts-old", "heart_rate": 70, "timestamp": timestamp},
+                    headers=headers)
+
+    assert r.status_code == 400
+    assert "antiguo" in r.json()["detail"]
+
+
+def test_bulk_reports_too_old_readings_per_item(client, headers, monkeypatch):
+    monkeypatch.setattr(biometricroutes, "MAX_PAST_AGE", timedelta(days=30))
+    recent = int(time.time()) - 86400
+    items = [
+        {"device_id": "ts-old-bulk", "heart_rate": 70, "timestamp": recent},
+        {"device_id": "ts-old-bulk", "heart_rate": 71, "timestamp": 1714557600},
+    ]
+    body = client.post("/api/biometric/bulk", json=items, headers=headers).json()
+
+    assert (body["accepted"], body["rejected"]) == (1, 1)
+    assert body["errors"][0]["index"] == 1
+    assert "antiguo" in body["errors"][0]["error"]
+    assert _timestamp_of(written_lines(client, "ts-old-bulk", 1)[0]) == recent
+
+
+def test_readings_of_one_bulk_keep_their_own_timestamps(client, headers):
+    items = [{"device_id": "ts-bulk", "heart_rate": 70 + i, "timestamp": 1714557600 + i} for i in range(3)]
+    client.post("/api/biometric/bulk", json=items, headers=headers)
+
+    lines = written_lines(client, "ts-bulk", 3)
+    assert sorted(_timestamp_of(line) for line in lines) == [1714557600, 1714557601, 1714557602]
@@ -0,0 +1,55 @@
+import json
+
+import msgpack
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.routers import biometricroutes
+from conftest import auth_headers, written_lines
+
+
+def test_stream_acks_window_with_per_reading_errors(client, headers):
+    with client.websocket_connect("/api/biometric/stream", headers=headers) as ws:
+        ws.send_text(json.dumps([
+            {"device_id": "ws-1", "heart_rate": 70},
+            {"device_id": "ws-1", "heart_rate": "alto"},
+        ]))
+        ws.send_text("{no es json")
+        ws.send_bytes(msgpack.packb({3: "ws-2", 10: 71}))
+        ack = ws.receive_json()
+
+    assert ack["type"] == "ack"
+    assert (ack["first_seq"], ack["last_seq"], ack["accepted"]) == (0, 3, 2)
+    assert [error["seq"] for error in ack["errors"]] == [1, 2]
+    assert written_lines(client, "ws-1", 1)
+    assert written_lines(client, "ws-2", 1)
+
+
+def test_stream_acks_when_window_is_full(client, headers, monkeypatch):
+    monkeypatch.setattr(biometricroutes, "WS_ACK_WINDOW", 2)
+    with client.websocket_connect("/api/biometric/stream", headers=headers) as ws:
+        ws.send_text(json.dumps([{"device_id": "ws-3", "co2_ppm": 500 + i} for i in range(2)]))
+        first = ws.receive_json()
+        ws.send_text(json.dumps({"device_id": "ws-3", "co2_ppm": 600}))
+        second = ws.receive_json()
+
+    assert (first["first_seq"], first["last_seq"]) == (0, 1)
+    assert (second["first_seq"], second["last_seq"]) == (2, 2)
+
+
+def test_stream_nacks_when_queue_is_full(client, headers, monkeypatch):
+    monkeypatch.setattr(biometricroutes.writer, "max_queue", 0)
+    with client.websocket_connect("/api/biometric/stream", headers=headers) as ws:
+        ws.send_text(json.dumps({"device_id": "ws-4", "heart_rate": 70}))
+        nack = ws.receive_json()
+
+    assert nack["type"] == "nack"
+    assert nack["first_seq"] == 0 and nack["retry_after"] >= 1
+
+
+def test_stream_rejects_invalid_token(client):
+    headers = {**auth_headers(), "Authorization": "Bearer no-es-un-jwt"}
+    with pytest.raises(WebSocketDisconnect) as excinfo:
+        with client.websocket_connect("/api/biometric/stream", headers=headers) as ws:
+            ws.receive_json()
+    assert excinfo.value.code == 1008
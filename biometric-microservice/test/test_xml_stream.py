@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers import biometricroutes
+
+DOCUMENT = b"<BiometricBatch>" + b"".join(
+    b"<BiometricData><device_id>xml-%d</device_id><heart_rate>%d</heart_rate></BiometricData>" % (i, 60 + i)
+    for i in range(50)
+) + b"</BiometricBatch>"
+
+
+async def _chunks(data, step):
+    for start in range(0, len(data), step):
+        yield data[start:start + step]
+
+
+def _records(data, step):
+    async def collect():
+        return [record async for record in biometricroutes._iter_xml_records(_chunks(data, step))]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("step", [1, 37, len(DOCUMENT)])
+def test_records_are_parsed_across_chunk_boundaries(step):
+    records = _records(DOCUMENT, step)
+
+    assert len(records) == 50
+    assert records[7] == {"device_id": "xml-7", "heart_rate": "67"}
+
+
+def test_single_record_document():
+    body = b"<BiometricData><device_id>xml-1</device_id></BiometricData>"
+    assert _records(body, 8) == [{"device_id": "xml-1"}]
+
+
+def test_records_are_yielded_and_released_while_streaming():
+    async def scenario():
+        seen = []
+        stream = biometricroutes._iter_xml_records(_chunks(DOCUMENT, 64))
+        async for record in stream:
+            seen.append(record)
+            if len(seen) == 10:
+                break
+        await stream.aclose()
+        return seen
+
+    assert len(asyncio.run(scenario())) == 10
+
+    # El documento raíz no acumula los registros ya convertidos
+    parser = biometricroutes.ET.XMLPullParser(events=("start", "end"))
+    open_elements = []
+    parser.feed(DOCUMENT[:-len(b"</BiometricBatch>")])
+    assert len(list(biometricroutes._drain_xml_records(parser, open_elements))) == 50
+    assert len(open_elements[0]) == 0
+
+
+def test_malformed_xml_is_400():
+    with pytest.raises(HTTPException) as excinfo:
+        _records(b"<BiometricBatch><BiometricData></BiometricBatch>", 16)
+    assert excinfo.value.status_code == 400
@@ -59,7 +59,7 @@ export class AuthService {
 
     const employee = await this.employeesRepo.findOne({
       where: { email },
-      relations: ['role'],
+      relations: ['role', 'enterprise'],
     });
 
     if (employee && (await bcrypt.compare(password, employee.passwordHash))) {
@@ -76,8 +76,10 @@ export class AuthService {
     const jtiRefresh = uuidv4();
 
     const fullName = `${employee.firstName} ${employee.lastName}`;
-    const payloadAccess = { sub: employee.id, email: employee.email, role: employee.role.name, nombre: fullName, jti: jtiAccess };
-    const payloadRefresh = { sub: employee.id, email: employee.email, role: employee.role.name, nombre: fullName, jti: jtiRefresh };
+    // org_id: empresa del empleado; biometric-microservice limita con él las consultas de series
+    const orgId = employee.enterprise?.id;
+    const payloadAccess = { sub: employee.id, email: employee.email, role: employee.role.name, nombre: fullName, org_id: orgId, jti: jtiAccess };
+    const payloadRefresh = { sub: employee.id, email: employee.email, role: employee.role.name, nombre: fullName, org_id: orgId, jti: jtiRefresh };
 
     const access_token = this.jwtService.sign(payloadAccess, {
       secret: this.configService.get<string>('JWT_SECRET'),
@@ -145,12 +147,12 @@ export class AuthService {
       const jtiRefresh = uuidv4();
 
       const access_token = this.jwtService.sign(
-        { sub: payload.sub, email: payload.email, role: payload.role, nombre: payload.nombre, jti: jtiAccess },
+        { sub: payload.sub, email: payload.email, role: payload.role, nombre: payload.nombre, org_id: payload.org_id, jti: jtiAccess },
         { secret: this.configService.get<string>('JWT_SECRET'), expiresIn: this.accessTTL } as JwtSignOptions,
       );
 
       const refresh_token = this.jwtService.sign(
-        { sub: payload.sub, email: payload.email, role: payload.role, nombre: payload.nombre, jti: jtiRefresh },
+        { sub: payload.sub, email: payload.email, role: payload.role, nombre: payload.nombre, org_id: payload.org_id, jti: jtiRefresh },
         { secret: this.configService.get<string>('JWT_REFRESH_SECRET'), expiresIn: this.refreshTTL } as JwtSignOptions,
       );
 
@@ -256,6 +256,21 @@ CREATE TABLE IF NOT EXISTS daily_employee_metrics (
 );
 CREATE INDEX IF NOT EXISTS idx_dem_snapshot_metric ON daily_employee_metrics(id_snapshot, metric_name);
 
+-- Running accumulators behind daily_employee_metrics, maintained incrementally
+-- by the biometric-microservice rollup worker (avg = value_sum / sample_count)
+CREATE TABLE IF NOT EXISTS employee_metric_rollups (
+  id_employee  INTEGER NOT NULL REFERENCES employees(id_employee)       ON DELETE CASCADE,
+  id_snapshot  INTEGER NOT NULL REFERENCES group_snapshots(id_snapshot) ON DELETE CASCADE,
+  metric_name  metric_enum NOT NULL,
+  sample_count BIGINT NOT NULL,
+  value_sum    DOUBLE PRECISION NOT NULL,
+  value_sumsq  DOUBLE PRECISION NOT NULL,
+  value_min    DOUBLE PRECISION NOT NULL,
+  value_max    DOUBLE PRECISION NOT NULL,
+  updated_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (id_employee, id_snapshot, metric_name)
+);
+
 -- =========================================================
 -- SURVEYS (NEW STRUCTURE)
 -- =========================================================
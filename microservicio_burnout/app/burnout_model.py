@@ -3,28 +3,45 @@ Modelo de predicción de burnout basado en Gradient Boosting
 Implementado basándose en el notebook P P2 601270.ipynb
 """
 
-import pandas as pd
-import numpy as np
-from sklearn.ensemble import GradientBoostingClassifier
-from sklearn.model_selection import train_test_split, cross_val_score, KFold
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
-import joblib
+import hashlib
 import os
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, TYPE_CHECKING
+
+from app.compiled_model import CompiledBurnoutModel
+
+# pandas, sklearn y joblib solo se necesitan para entrenar o para leer el
+# pickle original; se importan bajo demanda para que la inferencia arranque
+# únicamente con NumPy y el modelo compilado.
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _compiled_path(model_path: str) -> str:
+    """Ruta del artefacto compilado (.npz) asociado a un modelo .pkl"""
+    return os.path.splitext(model_path)[0] + ".npz"
+
+
+def _file_digest(path: str) -> str:
+    """SHA-256 del archivo, usado para detectar artefactos compilados obsoletos"""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
 
 class BurnoutPredictor:
     def __init__(self, data_path: str = "data/"):
         self.data_path = data_path
         self.model = None
-        self.scaler = StandardScaler()
+        self.scaler = None
+        self.compiled = None
         self.feature_columns = None
         self.metrics = {}
         
-    def load_and_preprocess_data(self) -> Tuple[pd.DataFrame, pd.Series]:
+    def load_and_preprocess_data(self) -> Tuple["pd.DataFrame", "pd.Series"]:
         """
         Carga y preprocesa los datos de burnout
         """
+        import pandas as pd
+
         # Cargar datos de burnout
         burnout_df = pd.read_csv(os.path.join(self.data_path, "burnout.csv"))
         stress_df = pd.read_csv(os.path.join(self.data_path, "stress.csv"))
@@ -60,10 +77,16 @@ class BurnoutPredictor:
         """
         Entrena el modelo de Gradient Boosting basado en el notebook
         """
+        from sklearn.ensemble import GradientBoostingClassifier
+        from sklearn.model_selection import train_test_split, cross_val_score, KFold
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+
         # Cargar y preprocesar datos
         X, y = self.load_and_preprocess_data()
         
         # Normalizar características
+        self.scaler = StandardScaler()
         X_scaled = self.scaler.fit_transform(X)
         
         # Crear modelo de Gradient Boosting (mejor modelo según el notebook)
@@ -109,6 +132,10 @@ class BurnoutPredictor:
             'test_f1': f1,
             'cv_scores': cv_scores.tolist()
         }
+
+        self.compiled = CompiledBurnoutModel.from_estimator(
+            self.model, self.scaler, self.feature_columns, self.metrics
+        )
         
         return self.metrics
     
@@ -119,23 +146,8 @@ class BurnoutPredictor:
         if self.model is None:
             raise ValueError("Modelo no entrenado. Llama a train_model() primero.")
         
-        # Convertir datos del usuario a DataFrame
-        user_df = pd.DataFrame([user_data])
-        
-        # Asegurar que todas las columnas necesarias estén presentes
-        for col in self.feature_columns:
-            if col not in user_df.columns:
-                user_df[col] = 0.0  # Valor por defecto
-        
-        # Reordenar columnas según el orden de entrenamiento
-        user_df = user_df[self.feature_columns]
-        
-        # Normalizar datos
-        user_scaled = self.scaler.transform(user_df)
-        
-        # Hacer predicción
-        prediction = self.model.predict(user_scaled)[0]
-        probability = self.model.predict_proba(user_scaled)[0][1]
+        # Evaluar el modelo compilado (solo NumPy); las columnas faltantes valen 0.0
+        prediction, probability = self.compiled.predict_one(user_data)
         
         return {
             'burnout_prediction': int(prediction),
@@ -145,9 +157,11 @@ class BurnoutPredictor:
     
     def save_model(self, model_path: str = "models/burnout_model.pkl"):
         """
-        Guarda el modelo entrenado
+        Guarda el modelo entrenado junto con su versión compilada (.npz)
         """
-        if self.model is None:
+        import joblib
+
+        if self.model is None or self.scaler is None:
             raise ValueError("Modelo no entrenado.")
         
         os.makedirs(os.path.dirname(model_path), exist_ok=True)
@@ -160,20 +174,49 @@ class BurnoutPredictor:
         }
         
         joblib.dump(model_data, model_path)
+        self.compiled.source_digest = _file_digest(model_path)
+        self.compiled.save(_compiled_path(model_path))
         print(f"Modelo guardado en: {model_path}")
     
     def load_model(self, model_path: str = "models/burnout_model.pkl"):
         """
-        Carga un modelo previamente entrenado
+        Carga un modelo previamente entrenado.
+
+        Usa el artefacto compilado si corresponde al mismo pickle; en caso
+        contrario lee el pickle (requiere sklearn) y regenera el compilado.
         """
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Modelo no encontrado en: {model_path}")
         
+        compiled_path = _compiled_path(model_path)
+        digest = _file_digest(model_path)
+
+        if os.path.exists(compiled_path):
+            compiled = CompiledBurnoutModel.load(compiled_path)
+            if compiled.source_digest == digest:
+                self.compiled = compiled
+                self.model = compiled
+                self.scaler = None
+                self.feature_columns = compiled.feature_columns
+                self.metrics = compiled.metrics
+                print(f"Modelo compilado cargado desde: {compiled_path}")
+                return
+
+        import joblib
+
         model_data = joblib.load(model_path)
         self.model = model_data['model']
         self.scaler = model_data['scaler']
         self.feature_columns = model_data['feature_columns']
         self.metrics = model_data.get('metrics', {})
+        self.compiled = CompiledBurnoutModel.from_estimator(
+            self.model, self.scaler, self.feature_columns, self.metrics, digest
+        )
+
+        try:
+            self.compiled.save(compiled_path)
+        except OSError as e:
+            print(f"No se pudo guardar el modelo compilado en {compiled_path}: {e}")
         
         print(f"Modelo cargado desde: {model_path}")
     
@@ -35,6 +35,7 @@ class MetricsClient:
         self.base_url = base_url or os.getenv("CMS_BACKEND_URL", "http://cms-backend:8000")
         self.timeout = 30.0
         self.internal_token = os.getenv("INTERNAL_SERVICE_JWT")
+        self._client: Optional[httpx.AsyncClient] = None
 
         if not self.internal_token:
             print(
@@ -42,6 +43,28 @@ class MetricsClient:
                 "Las peticiones internas pueden fallar con 401 Unauthorized."
             )
 
+    async def open(self) -> httpx.AsyncClient:
+        """
+        Abre (si no existe) el cliente HTTP compartido con su pool de conexiones.
+
+        Reutilizar el mismo cliente evita pagar el handshake TCP/TLS con el
+        cms-backend en cada petición.
+
+        Returns:
+            Cliente httpx asíncrono compartido.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+        return self._client
+
+    async def close(self) -> None:
+        """
+        Cierra el cliente HTTP compartido y libera las conexiones del pool.
+        """
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
     def _build_headers(self, auth_token: Optional[str] = None) -> Dict[str, str]:
         """
         Construye los headers HTTP incluyendo autenticación JWT o token interno.
@@ -73,70 +96,69 @@ class MetricsClient:
             Diccionario con las métricas del usuario.
         """
         headers = self._build_headers(auth_token)
+        client = await self.open()
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            if not headers.get("Authorization"):
-                print(f"[ERROR] No se está incluyendo Authorization en la petición de métricas para user_id={user_id}")
-            else:
-                print(f"[DEBUG] Header Authorization usado: {headers['Authorization'][:25]}...")  # Mostrar solo parte del token
-            try:
-                response = await client.get(
-                    f"{self.base_url}/metrics/realtime",
-                    headers=headers,
-                    params={"user_id": user_id}
-                )
-                response.raise_for_status()
-                realtime_data = response.json()
-                return self._transform_metrics(realtime_data, user_id)
-
-            except httpx.HTTPStatusError as e:
-                print(f"[ERROR] ({e.response.status_code}) al obtener métricas de usuario {user_id}: {e}")
-                print(f"➡️ Respuesta del CMS: {e.response.text}")
-                return self._get_default_metrics(user_id)
-            except Exception as e:
-                print(f"[ERROR] Error general al obtener métricas del usuario {user_id}: {e}")
-                print(f"➡️ Respuesta del CMS: {e.response.text}")
-                return self._get_default_metrics(user_id)
+        if not headers.get("Authorization"):
+            print(f"[ERROR] No se está incluyendo Authorization en la petición de métricas para user_id={user_id}")
+        else:
+            print(f"[DEBUG] Header Authorization usado: {headers['Authorization'][:25]}...")  # Mostrar solo parte del token
+        try:
+            response = await client.get(
+                "/metrics/realtime",
+                headers=headers,
+                params={"user_id": user_id}
+            )
+            response.raise_for_status()
+            realtime_data = response.json()
+            return self._transform_metrics(realtime_data, user_id)
+
+        except httpx.HTTPStatusError as e:
+            print(f"[ERROR] ({e.response.status_code}) al obtener métricas de usuario {user_id}: {e}")
+            print(f"➡️ Respuesta del CMS: {e.response.text}")
+            return self._get_default_metrics(user_id)
+        except Exception as e:
+            print(f"[ERROR] Error general al obtener métricas del usuario {user_id}: {e}")
+            return self._get_default_metrics(user_id)
 
     async def get_weekly_metrics(self, user_id: int, auth_token: Optional[str] = None) -> Dict[str, Any]:
         """
         Obtiene métricas semanales agregadas desde /metrics/weekly.
         """
         headers = self._build_headers(auth_token)
+        client = await self.open()
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/metrics/weekly",
-                    headers=headers,
-                    params={"user_id": user_id}
-                )
-                response.raise_for_status()
-                return response.json()
-
-            except httpx.HTTPError as e:
-                print(f"[ERROR] No se pudieron obtener métricas semanales: {e}")
-                return {}
+        try:
+            response = await client.get(
+                "/metrics/weekly",
+                headers=headers,
+                params={"user_id": user_id}
+            )
+            response.raise_for_status()
+            return response.json()
+
+        except httpx.HTTPError as e:
+            print(f"[ERROR] No se pudieron obtener métricas semanales: {e}")
+            return {}
 
     async def get_radar_metrics(self, user_id: int, auth_token: Optional[str] = None) -> Dict[str, Any]:
         """
         Obtiene métricas para visualización radar desde /metrics/radar.
         """
         headers = self._build_headers(auth_token)
+        client = await self.open()
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/metrics/radar",
-                    headers=headers,
-                    params={"user_id": user_id}
-                )
-                response.raise_for_status()
-                return response.json()
-
-            except httpx.HTTPError as e:
-                print(f"[ERROR] No se pudieron obtener métricas radar: {e}")
-                return {}
+        try:
+            response = await client.get(
+                "/metrics/radar",
+                headers=headers,
+                params={"user_id": user_id}
+            )
+            response.raise_for_status()
+            return response.json()
+
+        except httpx.HTTPError as e:
+            print(f"[ERROR] No se pudieron obtener métricas radar: {e}")
+            return {}
 
     def _transform_metrics(self, api_data: Any, user_id: int) -> Dict[str, Any]:
         """
@@ -201,9 +223,9 @@ class MetricsClient:
         Verifica si el servicio de métricas está disponible.
         """
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/health")
-                return response.status_code == 200
+            client = await self.open()
+            response = await client.get("/health", timeout=5.0)
+            return response.status_code == 200
         except Exception:
             return False
 
@@ -0,0 +1,220 @@
+"""
+Modelo de burnout compilado para inferencia solo con NumPy
+
+Convierte el GradientBoostingClassifier entrenado (más su StandardScaler) en
+arrays planos de árboles que se evalúan de forma vectorizada. El artefacto
+resultante (.npz) se carga sin importar sklearn, pandas ni joblib, lo que
+reduce el tiempo de arranque del microservicio.
+"""
+
+import json
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+# Pérdidas soportadas y su transformación de score crudo a probabilidad
+_SUPPORTED_LOSSES = {
+    "log_loss": 1.0,
+    "deviance": 1.0,
+    "exponential": 2.0,
+}
+
+
+class CompiledBurnoutModel:
+    """
+    Representación compilada del modelo de Gradient Boosting binario.
+
+    Cada árbol se guarda como una fila de arrays rellenados hasta el número
+    máximo de nodos, de modo que todos los árboles se recorren a la vez.
+    """
+
+    def __init__(
+        self,
+        feature_columns: List[str],
+        mean: np.ndarray,
+        scale: np.ndarray,
+        init_raw: float,
+        learning_rate: float,
+        raw_factor: float,
+        classes: np.ndarray,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children_left: np.ndarray,
+        children_right: np.ndarray,
+        value: np.ndarray,
+        max_depth: int,
+        metrics: Optional[Dict[str, Any]] = None,
+        source_digest: Optional[str] = None
+    ):
+        self.feature_columns = list(feature_columns)
+        self.mean = mean
+        self.scale = scale
+        self.init_raw = float(init_raw)
+        self.learning_rate = float(learning_rate)
+        self.raw_factor = float(raw_factor)
+        self.classes = classes
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.max_depth = int(max_depth)
+        self.metrics = metrics or {}
+        self.source_digest = source_digest
+        self._tree_index = np.arange(feature.shape[0])
+
+    @classmethod
+    def from_estimator(
+        cls,
+        model: Any,
+        scaler: Any,
+        feature_columns: List[str],
+        metrics: Optional[Dict[str, Any]] = None,
+        source_digest: Optional[str] = None
+    ) -> "CompiledBurnoutModel":
+        """
+        Compila un GradientBoostingClassifier binario y su StandardScaler
+        """
+        loss = getattr(model, "loss", "log_loss")
+        if loss not in _SUPPORTED_LOSSES or len(model.classes_) != 2:
+            raise ValueError(f"Modelo no compilable (loss={loss}, clases={len(model.classes_)})")
+
+        n_features = len(feature_columns)
+        estimators = [stage[0] for stage in model.estimators_]
+        trees = [est.tree_ for est in estimators]
+        n_trees = len(trees)
+        max_nodes = max(tree.node_count for tree in trees)
+
+        feature = np.zeros((n_trees, max_nodes), dtype=np.intp)
+        threshold = np.zeros((n_trees, max_nodes), dtype=np.float64)
+        children_left = np.zeros((n_trees, max_nodes), dtype=np.intp)
+        children_right = np.zeros((n_trees, max_nodes), dtype=np.intp)
+        value = np.zeros((n_trees, max_nodes), dtype=np.float64)
+
+        for t, tree in enumerate(trees):
+            n = tree.node_count
+            nodes = np.arange(n)
+            is_leaf = tree.children_left == -1
+            # Las hojas apuntan a sí mismas para poder recorrer a profundidad fija
+            feature[t, :n] = np.where(is_leaf, 0, tree.feature)
+            threshold[t, :n] = np.where(is_leaf, np.inf, tree.threshold)
+            children_left[t, :n] = np.where(is_leaf, nodes, tree.children_left)
+            children_right[t, :n] = np.where(is_leaf, nodes, tree.children_right)
+            value[t, :n] = tree.value[:, 0, 0]
+
+        # Score inicial (prior) obtenido con la API pública: decision_function
+        # menos la contribución de los árboles sobre una muestra cualquiera
+        probe = np.zeros((1, n_features))
+        tree_sum = sum(float(est.predict(probe)[0]) for est in estimators)
+        init_raw = float(np.ravel(model.decision_function(probe))[0]) - model.learning_rate * tree_sum
+
+        if scaler is not None and getattr(scaler, "with_mean", True):
+            mean = np.asarray(scaler.mean_, dtype=np.float64)
+        else:
+            mean = np.zeros(n_features)
+        if scaler is not None and getattr(scaler, "with_std", True):
+            scale = np.asarray(scaler.scale_, dtype=np.float64)
+        else:
+            scale = np.ones(n_features)
+
+        return cls(
+            feature_columns=feature_columns,
+            mean=mean,
+            scale=scale,
+            init_raw=init_raw,
+            learning_rate=model.learning_rate,
+            raw_factor=_SUPPORTED_LOSSES[loss],
+            classes=np.asarray(model.classes_),
+            feature=feature,
+            threshold=threshold,
+            children_left=children_left,
+            children_right=children_right,
+            value=value,
+            max_depth=max(tree.max_depth for tree in trees),
+            metrics=metrics,
+            source_digest=source_digest
+        )
+
+    def save(self, path: str):
+        """
+        Guarda el modelo compilado en formato .npz (sin pickle)
+        """
+        meta = {
+            "feature_columns": self.feature_columns,
+            "init_raw": self.init_raw,
+            "learning_rate": self.learning_rate,
+            "raw_factor": self.raw_factor,
+            "max_depth": self.max_depth,
+            "metrics": self.metrics,
+            "source_digest": self.source_digest,
+        }
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                meta=np.array(json.dumps(meta, default=float)),
+                mean=self.mean,
+                scale=self.scale,
+                classes=self.classes,
+                feature=self.feature,
+                threshold=self.threshold,
+                children_left=self.children_left,
+                children_right=self.children_right,
+                value=self.value
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledBurnoutModel":
+        """
+        Carga un modelo compilado desde un archivo .npz
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(
+                feature_columns=meta["feature_columns"],
+                mean=data["mean"],
+                scale=data["scale"],
+                init_raw=meta["init_raw"],
+                learning_rate=meta["learning_rate"],
+                raw_factor=meta["raw_factor"],
+                classes=data["classes"],
+                feature=data["feature"],
+                threshold=data["threshold"],
+                children_left=data["children_left"],
+                children_right=data["children_right"],
+                value=data["value"],
+                max_depth=meta["max_depth"],
+                metrics=meta.get("metrics"),
+                source_digest=meta.get("source_digest")
+            )
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Probabilidad de la clase positiva para una matriz de características sin escalar
+        """
+        X_scaled = (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+        # sklearn recorre los árboles con float32; se replica para obtener los mismos cortes
+        X_scaled = X_scaled.astype(np.float32).astype(np.float64)
+
+        trees = self._tree_index
+        node = np.zeros((X_scaled.shape[0], trees.shape[0]), dtype=np.intp)
+        for _ in range(self.max_depth):
+            x_values = np.take_along_axis(X_scaled, self.feature[trees, node], axis=1)
+            node = np.where(
+                x_values <= self.threshold[trees, node],
+                self.children_left[trees, node],
+                self.children_right[trees, node]
+            )
+
+        raw = self.init_raw + self.learning_rate * self.value[trees, node].sum(axis=1)
+        return 1.0 / (1.0 + np.exp(-self.raw_factor * raw))
+
+    def predict_one(self, user_data: Dict[str, float]) -> Tuple[int, float]:
+        """
+        Predice clase y probabilidad para un único usuario
+        """
+        row = np.array(
+            [[float(user_data.get(col, 0.0)) for col in self.feature_columns]],
+            dtype=np.float64
+        )
+        probability = float(self.predict_proba(row)[0])
+        prediction = self.classes[1] if probability > 0.5 else self.classes[0]
+        return int(prediction), probability
@@ -11,10 +11,12 @@ Este servicio integra:
 
 from fastapi import FastAPI, HTTPException, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
 import os
 import sys
+import time
 
 # Agregar el directorio padre al path para importar el modelo
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -49,6 +51,108 @@ dashboard_service = DashboardService()
 intervention_service = InterventionService()
 metrics_client = MetricsClient()
 
+# Ruta del modelo entrenado (configurable para despliegues con volúmenes propios)
+MODEL_PATH = os.getenv("BURNOUT_MODEL_PATH", "models/burnout_model.pkl")
+
+
+def preload_model(model_path: str = MODEL_PATH) -> bool:
+    """
+    Carga el modelo en el proceso actual si todavía no está cargado.
+
+    En modo multi-worker (gunicorn con preload_app) se invoca en el proceso
+    maestro antes del fork, de modo que todos los workers comparten las
+    páginas del modelo en copy-on-write en lugar de cargar una copia cada uno.
+
+    Returns:
+        True si el modelo queda disponible en memoria
+    """
+    if burnout_predictor.model is not None:
+        return True
+
+    if not os.path.exists(model_path):
+        print("Modelo no encontrado. Entrena el modelo llamando a /api/burnout/train")
+        return False
+
+    try:
+        burnout_predictor.load_model(model_path)
+        print("Modelo cargado exitosamente al iniciar la aplicación")
+        return True
+    except Exception as e:
+        print(f"Error cargando modelo: {e}")
+        print("El modelo se entrenará cuando se llame al endpoint /api/burnout/train")
+        return False
+
+
+# Estado de calentamiento del worker (readiness)
+WARMUP_ITERATIONS = int(os.getenv("BURNOUT_WARMUP_ITERATIONS", "3"))
+warmup_state: Dict[str, Any] = {
+    "warmed_up": False,
+    "duration_ms": None,
+    "upstream_reachable": None,
+}
+
+
+async def warm_up() -> bool:
+    """
+    Calienta el worker antes de recibir tráfico.
+
+    Ejecuta predicciones sintéticas y la generación completa de alertas,
+    dashboard e intervenciones para que el primer request real no pague los
+    costes perezosos de sklearn/pandas, y abre el pool de conexiones hacia el
+    cms-backend.
+
+    Returns:
+        True si el worker quedó listo para recibir tráfico
+    """
+    warmup_state["warmed_up"] = False
+    if burnout_predictor.model is None:
+        return False
+
+    start = time.perf_counter()
+    synthetic_metrics = metrics_client._get_default_metrics(0)
+
+    try:
+        for _ in range(max(WARMUP_ITERATIONS, 1)):
+            prediction_result = burnout_predictor.predict_burnout(synthetic_metrics)
+            burnout_probability = prediction_result['burnout_probability']
+            alert = alerts_service.generate_alert(
+                user_id=0,
+                burnout_probability=burnout_probability,
+                user_metrics=synthetic_metrics
+            )
+            alerts_list = [alert] if alert else []
+            summary = dashboard_service.generate_summary(
+                user_id=0,
+                user_data={},
+                burnout_probability=burnout_probability,
+                user_metrics=synthetic_metrics,
+                alerts=alerts_list
+            )
+            intervention_service.generate_interventions(
+                user_id=0,
+                burnout_probability=burnout_probability,
+                user_metrics=synthetic_metrics,
+                main_causes=summary.get('main_causes', []),
+                alerts=alerts_list
+            )
+    except Exception as e:
+        print(f"Error durante el calentamiento del modelo: {e}")
+        return False
+
+    # El cms-backend caído no bloquea la readiness: MetricsClient ya tiene fallback
+    await metrics_client.open()
+    warmup_state["upstream_reachable"] = await metrics_client.health_check()
+
+    warmup_state["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    warmup_state["warmed_up"] = True
+    print(f"Calentamiento completado en {warmup_state['duration_ms']} ms")
+    return True
+
+
+def is_ready() -> bool:
+    """El worker está listo cuando el modelo está cargado y calentado"""
+    return burnout_predictor.model is not None and warmup_state["warmed_up"]
+
 # Modelos Pydantic para validación de datos
 class UserData(BaseModel):
     time_to_recover: float
@@ -122,6 +226,8 @@ async def root():
         },
         "endpoints": {
             "health": "/api/burnout/health",
+            "live": "/api/burnout/live",
+            "ready": "/api/burnout/ready",
             "train": "/api/burnout/train",
             "metrics": "/api/burnout/metrics",
             "predict": "/api/burnout/predict/{user_id}",
@@ -139,22 +245,49 @@ async def health_check():
     return {
         "status": "healthy",
         "model_loaded": burnout_predictor.model is not None,
+        "ready": is_ready(),
+        "worker_pid": os.getpid(),
         "message": "Microservicio funcionando correctamente"
     }
 
+# Endpoint de liveness (el proceso responde)
+@app.get("/api/burnout/live")
+async def liveness_check():
+    """Indica si el proceso está vivo, independientemente del modelo"""
+    return {"status": "alive", "worker_pid": os.getpid()}
+
+# Endpoint de readiness para el balanceador
+@app.get("/api/burnout/ready")
+async def readiness_check():
+    """Indica si este worker puede recibir tráfico (modelo cargado y calentado)"""
+    ready = is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "model_loaded": burnout_predictor.model is not None,
+            "warmed_up": warmup_state["warmed_up"],
+            "warmup_ms": warmup_state["duration_ms"],
+            "upstream_reachable": warmup_state["upstream_reachable"],
+            "worker_pid": os.getpid()
+        }
+    )
+
 # Endpoint para cargar modelo manualmente
 @app.post("/api/burnout/load-model")
 async def load_model_manually():
     """Cargar o recargar el modelo manualmente"""
-    model_path = "models/burnout_model.pkl"
+    model_path = MODEL_PATH
     if not os.path.exists(model_path):
-        raise HTTPException(status_code=404, detail="Modelo no encontrado en models/burnout_model.pkl")
+        raise HTTPException(status_code=404, detail=f"Modelo no encontrado en {model_path}")
     
     try:
         burnout_predictor.load_model(model_path)
+        await warm_up()
         return {
             "message": "Modelo cargado exitosamente",
             "model_loaded": True,
+            "ready": is_ready(),
             "model_path": model_path
         }
     except Exception as e:
@@ -166,7 +299,8 @@ async def train_model():
     """Entrenar el modelo de predicción de burnout"""
     try:
         metrics = burnout_predictor.train_model()
-        burnout_predictor.save_model()
+        burnout_predictor.save_model(MODEL_PATH)
+        await warm_up()
         
         return {
             "message": "Modelo entrenado exitosamente",
@@ -624,20 +758,23 @@ async def analyze_burnout_custom(
 # STARTUP Y CONFIGURACIÓN
 # ============================================================================
 
-# Cargar modelo al iniciar la aplicación
+# Cargar y calentar el modelo al iniciar la aplicación
 @app.on_event("startup")
 async def startup_event():
-    """Cargar modelo al iniciar la aplicación"""
-    model_path = "models/burnout_model.pkl"
-    if os.path.exists(model_path):
-        try:
-            burnout_predictor.load_model(model_path)
-            print("Modelo cargado exitosamente al iniciar la aplicación")
-        except Exception as e:
-            print(f"Error cargando modelo: {e}")
-            print("El modelo se entrenará cuando se llame al endpoint /api/burnout/train")
-    else:
-        print("Modelo no encontrado. Entrena el modelo llamando a /api/burnout/train")
+    """
+    Cargar modelo y calentar el worker al iniciar la aplicación.
+
+    Si el proceso maestro ya lo precargó antes del fork (modo multi-worker),
+    el worker reutiliza esa copia y no vuelve a leer el pickle. El
+    calentamiento se hace en cada worker: abre su propio pool de conexiones.
+    """
+    if preload_model():
+        await warm_up()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Cerrar el pool de conexiones hacia el cms-backend"""
+    await metrics_client.close()
 
 if __name__ == "__main__":
     import uvicorn
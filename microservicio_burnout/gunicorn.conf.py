@@ -0,0 +1,41 @@
+"""
+Configuración de gunicorn para ejecutar el microservicio de burnout en modo multi-worker
+
+Uso:
+    gunicorn -c gunicorn.conf.py app.main:app
+
+El modelo se carga una sola vez en el proceso maestro (preload_app) antes de
+crear los workers, por lo que sus páginas de memoria se comparten en
+copy-on-write. Cada worker solo reporta ready en /api/burnout/ready cuando el
+modelo está disponible y calentado.
+
+Variables de entorno:
+    BURNOUT_WORKERS: número de workers (por defecto, uno por núcleo)
+    BURNOUT_BIND: dirección de escucha (por defecto 0.0.0.0:8001)
+    BURNOUT_WORKER_TIMEOUT: timeout de worker en segundos (por defecto 60)
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("BURNOUT_BIND", "0.0.0.0:8001")
+workers = int(os.getenv("BURNOUT_WORKERS", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("BURNOUT_WORKER_TIMEOUT", "60"))
+
+# Importar la aplicación en el maestro para compartir el modelo entre workers
+preload_app = True
+
+
+def when_ready(server):
+    """Precarga el modelo en el maestro antes de hacer fork de los workers"""
+    from app.main import preload_model
+
+    preload_model()
+
+    # Mover los objetos ya creados a la generación permanente del GC para que
+    # las recolecciones en los workers no escriban en sus cabeceras y rompan
+    # el copy-on-write de las páginas compartidas.
+    gc.freeze()
+    server.log.info("Modelo precargado en el maestro; iniciando %s workers", workers)
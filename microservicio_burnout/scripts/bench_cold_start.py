@@ -0,0 +1,93 @@
+"""
+Benchmark de arranque en frío del microservicio de burnout
+
+Mide, en procesos Python nuevos, el tiempo de importar app.main, cargar el
+modelo y hacer la primera predicción. Además verifica que el camino de
+inferencia no importe dependencias de entrenamiento (pandas, sklearn, joblib).
+
+Uso (desde microservicio_burnout/):
+    python scripts/bench_cold_start.py --runs 5 --budget-ms 1000
+
+Termina con código 1 si la mediana supera el presupuesto o si se importa
+alguna dependencia de entrenamiento, para poder usarse como gate en CI.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FORBIDDEN_MODULES = ("pandas", "sklearn", "joblib")
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app.main as main
+t1 = time.perf_counter()
+main.preload_model()
+t2 = time.perf_counter()
+if main.burnout_predictor.model is not None:
+    main.burnout_predictor.predict_burnout(main.metrics_client._get_default_metrics(0))
+t3 = time.perf_counter()
+forbidden = sorted({m.split(".")[0] for m in sys.modules if m.split(".")[0] in %r})
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "load_ms": (t2 - t1) * 1000,
+    "first_predict_ms": (t3 - t2) * 1000,
+    "total_ms": (t3 - t0) * 1000,
+    "model_loaded": main.burnout_predictor.model is not None,
+    "forbidden": forbidden,
+}))
+""" % (FORBIDDEN_MODULES,)
+
+
+def run_once() -> dict:
+    """Ejecuta la sonda en un intérprete nuevo y devuelve sus tiempos"""
+    env = dict(os.environ)
+    env.setdefault("INTERNAL_SERVICE_JWT", "bench")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=SERVICE_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("BURNOUT_COLD_START_BUDGET_MS", "1000")))
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+
+    summary = {
+        key: round(statistics.median(r[key] for r in results), 1)
+        for key in ("import_ms", "load_ms", "first_predict_ms", "total_ms")
+    }
+    forbidden = sorted({m for r in results for m in r["forbidden"]})
+    summary["runs"] = args.runs
+    summary["model_loaded"] = all(r["model_loaded"] for r in results)
+    summary["forbidden_imports"] = forbidden
+    summary["budget_ms"] = args.budget_ms
+    print(json.dumps(summary, indent=2))
+
+    if forbidden:
+        print(f"[FAIL] El camino de inferencia importa dependencias de entrenamiento: {forbidden}")
+        return 1
+    if summary["total_ms"] > args.budget_ms:
+        print(f"[FAIL] Arranque en frío {summary['total_ms']} ms > presupuesto {args.budget_ms} ms")
+        return 1
+    print("[OK] Arranque en frío dentro del presupuesto")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
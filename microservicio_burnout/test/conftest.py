@@ -0,0 +1,7 @@
+import os
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+MODEL_PKL = os.path.join(SERVICE_DIR, "models", "burnout_model.pkl")
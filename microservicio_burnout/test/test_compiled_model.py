@@ -0,0 +1,71 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from app.burnout_model import BurnoutPredictor
+from app.compiled_model import CompiledBurnoutModel
+from conftest import MODEL_PKL
+
+joblib = pytest.importorskip("joblib")
+pytest.importorskip("sklearn")
+
+
+@pytest.fixture(scope="module")
+def trained():
+    return joblib.load(MODEL_PKL)
+
+
+def _sample(trained, n=500, seed=0):
+    scaler = trained["scaler"]
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, len(trained["feature_columns"]))) * scaler.scale_ + scaler.mean_
+
+
+def test_compiled_model_matches_sklearn(trained):
+    compiled = CompiledBurnoutModel.from_estimator(trained["model"], trained["scaler"], trained["feature_columns"])
+    X = _sample(trained)
+
+    expected = trained["model"].predict_proba(trained["scaler"].transform(X))[:, 1]
+
+    np.testing.assert_allclose(compiled.predict_proba(X), expected, rtol=0, atol=1e-12)
+
+
+def test_save_and_load_roundtrip(trained, tmp_path):
+    compiled = CompiledBurnoutModel.from_estimator(
+        trained["model"], trained["scaler"], trained["feature_columns"], source_digest="abc"
+    )
+    path = str(tmp_path / "model.npz")
+    compiled.save(path)
+    loaded = CompiledBurnoutModel.load(path)
+    X = _sample(trained, n=50)
+
+    assert loaded.source_digest == "abc"
+    assert loaded.feature_columns == compiled.feature_columns
+    np.testing.assert_array_equal(loaded.predict_proba(X), compiled.predict_proba(X))
+
+
+def test_predict_one_defaults_missing_columns_to_zero(trained):
+    compiled = CompiledBurnoutModel.from_estimator(trained["model"], trained["scaler"], trained["feature_columns"])
+    row = {column: 0.0 for column in trained["feature_columns"]}
+
+    assert compiled.predict_one({}) == compiled.predict_one(row)
+
+
+def test_load_model_regenerates_stale_compiled_artifact(tmp_path):
+    pkl = str(tmp_path / "burnout_model.pkl")
+    shutil.copy(MODEL_PKL, pkl)
+    CompiledBurnoutModel.load(MODEL_PKL[:-4] + ".npz").save(str(tmp_path / "burnout_model.npz"))
+    stale = CompiledBurnoutModel.load(str(tmp_path / "burnout_model.npz"))
+    stale.source_digest = "obsoleto"
+    stale.save(str(tmp_path / "burnout_model.npz"))
+
+    predictor = BurnoutPredictor()
+    predictor.load_model(pkl)
+    assert predictor.scaler is not None
+
+    # Con el artefacto ya regenerado se carga sin leer el pickle
+    fast = BurnoutPredictor()
+    fast.load_model(pkl)
+    assert fast.scaler is None
+    assert fast.predict_burnout({}) == predictor.predict_burnout({})
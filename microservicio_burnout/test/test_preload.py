@@ -0,0 +1,24 @@
+from app import main
+from conftest import MODEL_PKL
+
+
+def test_preload_loads_the_model_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main.burnout_predictor, "model", None)
+    original = main.burnout_predictor.load_model
+
+    def counting_load(path):
+        calls.append(path)
+        original(path)
+
+    monkeypatch.setattr(main.burnout_predictor, "load_model", counting_load)
+
+    assert main.preload_model(MODEL_PKL)
+    # Un worker tras el fork reutiliza el modelo ya cargado por el maestro
+    assert main.preload_model(MODEL_PKL)
+    assert calls == [MODEL_PKL]
+
+
+def test_preload_without_model_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(main.burnout_predictor, "model", None)
+    assert main.preload_model(str(tmp_path / "no-existe.pkl")) is False
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from conftest import MODEL_PKL
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """
+    Worker sin modelo ni calentamiento y sin acceso al cms-backend.
+    """
+    async def no_network():
+        return False
+
+    async def open_pool():
+        return None
+
+    monkeypatch.setattr(main.burnout_predictor, "model", None)
+    monkeypatch.setattr(main.burnout_predictor, "compiled", None)
+    monkeypatch.setattr(main, "warmup_state", {"warmed_up": False, "duration_ms": None, "upstream_reachable": None})
+    monkeypatch.setattr(main.metrics_client, "open", open_pool)
+    monkeypatch.setattr(main.metrics_client, "health_check", no_network)
+    # Sin el context manager no se ejecuta el startup: el test controla la carga
+    return TestClient(main.app)
+
+
+def test_live_but_not_ready_without_model(worker):
+    assert worker.get("/api/burnout/live").status_code == 200
+    r = worker.get("/api/burnout/ready")
+    assert r.status_code == 503
+    assert r.json()["model_loaded"] is False
+
+
+def test_ready_after_load_and_warm_up_even_if_upstream_is_down(worker):
+    assert main.preload_model(MODEL_PKL)
+    assert worker.get("/api/burnout/ready").status_code == 503
+
+    assert asyncio.run(main.warm_up())
+
+    r = worker.get("/api/burnout/ready")
+    assert r.status_code == 200
+    assert r.json()["upstream_reachable"] is False
+    assert r.json()["warmup_ms"] is not None
+
+
+def test_failed_warm_up_keeps_worker_out_of_rotation(worker, monkeypatch):
+    main.preload_model(MODEL_PKL)
+
+    def broken(user_data):
+        raise RuntimeError("modelo corrupto")
+
+    monkeypatch.setattr(main.burnout_predictor, "predict_burnout", broken)
+
+    assert asyncio.run(main.warm_up()) is False
+    assert worker.get("/api/burnout/ready").status_code == 503
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+def make_sensor(sensor_id: str, org_id: int = 1) -> "main.SensorConfig":
+    return main.SensorConfig(
+        sensor_id=sensor_id,
+        display_name=f"Sensor {sensor_id}",
+        org_id=org_id,
+        enterprise_name="Acme",
+        location_id=1,
+        location_name="Oficina",
+    )
+
+
+@pytest.fixture
+def sensors():
+    """
+    Empty sensor registry for the test, restored afterwards.
+    """
+    saved = dict(main.sensors)
+    main.sensors.clear()
+    yield main.sensors
+    main.sensors.clear()
+    main.sensors.update(saved)
+
+
+@pytest.fixture
+def authed(monkeypatch):
+    """
+    Skip logging in to cms-backend.
+    """
+    async def no_login():
+        return None
+
+    monkeypatch.setattr(main, "login_if_needed", no_login)
@@ -0,0 +1,82 @@
+import asyncio
+import base64
+import json
+from time import time
+
+import pytest
+
+import main
+
+
+def _token(exp):
+    claims = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"header.{claims}.signature"
+
+
+@pytest.fixture
+def auth(monkeypatch):
+    """
+    Fresh auth state and counters; _refresh/_login replaced by fakes whose
+    outcome the test sets in `results`.
+    """
+    monkeypatch.setattr(main, "auth_state", main.AuthState())
+    monkeypatch.setattr(main, "auth_stats", dict.fromkeys(main.auth_stats, 0))
+    monkeypatch.setattr(main, "auth_lock", asyncio.Lock())
+    calls = {"refresh": 0, "login": 0}
+    results = {"refresh": True}
+
+    async def fake_refresh():
+        calls["refresh"] += 1
+        await asyncio.sleep(0.01)
+        if results["refresh"]:
+            main._set_tokens(_token(time() + 3600), "refresh-2")
+        return results["refresh"]
+
+    async def fake_login():
+        calls["login"] += 1
+        main._set_tokens(_token(time() + 3600), "refresh-1")
+
+    monkeypatch.setattr(main, "_refresh", fake_refresh)
+    monkeypatch.setattr(main, "_login", fake_login)
+    return calls, results
+
+
+def test_token_expiry():
+    assert main.token_expiry(_token(1714557600)) == 1714557600
+    assert main.token_expiry("not-a-jwt") is None
+
+
+def test_expiring_token_is_refreshed_once_for_concurrent_callers(auth):
+    calls, _ = auth
+    main._set_tokens(_token(time() + 10), "refresh-1")
+
+    async def scenario():
+        await asyncio.gather(*[main.login_if_needed() for _ in range(5)])
+
+    asyncio.run(scenario())
+
+    assert calls == {"refresh": 1, "login": 0}
+    assert main.auth_stats["proactive_refreshes"] == 1
+    assert main.auth_stats["proactive_refresh_failures"] == 0
+    assert main.auth_stats["coalesced"] == 4
+
+
+def test_failed_proactive_refresh_falls_back_to_login(auth):
+    calls, results = auth
+    results["refresh"] = False
+    main._set_tokens(_token(time() + 10), "refresh-1")
+
+    asyncio.run(main.login_if_needed())
+
+    assert calls == {"refresh": 1, "login": 1}
+    assert main.auth_stats["proactive_refreshes"] == 0
+    assert main.auth_stats["proactive_refresh_failures"] == 1
+
+
+def test_missing_tokens_log_in_without_refresh(auth):
+    calls, _ = auth
+
+    asyncio.run(main.login_if_needed())
+
+    assert calls == {"refresh": 0, "login": 1}
+    assert main.auth_stats["proactive_refreshes"] == 0
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from conftest import make_sensor
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2024-05-01T10:00:00", datetime(2024, 5, 1, 10, tzinfo=timezone.utc)),
+    ("2024-05-01T12:00:00+02:00", datetime(2024, 5, 1, 10, tzinfo=timezone.utc)),
+    ("2024-05-01", datetime(2024, 5, 1, tzinfo=timezone.utc)),
+])
+def test_parse_sim_time_returns_aware_utc(text, expected):
+    value = main.parse_sim_time(text)
+    assert value == expected
+    assert value.utcoffset() == timedelta(0)
+
+
+def test_epoch_ms_and_iso_utc():
+    value = datetime(2024, 5, 1, 10, 0, 0, 250000, tzinfo=timezone.utc)
+    assert main.epoch_ms(value) == 1714557600250
+    assert main.epoch_ms(value.astimezone(timezone(timedelta(hours=2)))) == 1714557600250
+    assert main.iso_utc(value) == "2024-05-01T10:00:00.250000Z"
+
+
+def test_backfill_stamps_readings_with_simulated_time(monkeypatch, sensors, authed):
+    uploads = []
+
+    async def fake_post_bulk(payloads, retry_until_accepted=False):
+        assert retry_until_accepted
+        uploads.extend(payloads)
+        return len(payloads)
+
+    monkeypatch.setattr(main, "post_biometric_bulk", fake_post_bulk)
+    sensors["1"] = make_sensor("1")
+    sensors["2"] = make_sensor("2")
+    scheduler = main.SendScheduler(interval=5, max_in_flight=2)
+    scheduler.uploader = main.BulkUploader(batch_size=4, flush_ticks=1, max_in_flight=2)
+    start = main.parse_sim_time("2024-05-01T08:00:00")
+
+    asyncio.run(scheduler.run_backfill(start, start + timedelta(minutes=5), 60))
+
+    assert len(uploads) == 10
+    assert sorted({p["timestamp"] for p in uploads}) == [
+        main.epoch_ms(start) + minute * 60000 for minute in range(5)
+    ]
+    assert scheduler.backfill["done"]
+    assert scheduler.backfill["end"] == "2024-05-01T08:05:00Z"
+    assert (scheduler.backfill["accepted"], scheduler.backfill["dropped"]) == (10, 0)
+
+
+def test_backfill_counts_dropped_readings(monkeypatch, sensors, authed):
+    calls = []
+
+    async def fake_post(payload, retry_until_accepted=False):
+        calls.append(retry_until_accepted)
+        return len(calls) % 2 == 1
+
+    monkeypatch.setattr(main, "post_biometric", fake_post)
+    sensors["1"] = make_sensor("1")
+    scheduler = main.SendScheduler(interval=5, max_in_flight=1)
+    start = main.parse_sim_time("2024-05-01T08:00:00")
+
+    asyncio.run(scheduler.run_backfill(start, start + timedelta(minutes=4), 60))
+
+    assert calls == [True] * 4
+    assert (scheduler.backfill["accepted"], scheduler.backfill["dropped"]) == (2, 2)
+    assert scheduler.stats["failed"] == 2
+
+
+def test_backfill_retries_throttled_posts_past_max_retries(monkeypatch, authed):
+    statuses = [429] * (main.MAX_RETRIES + 2) + [200]
+
+    async def fake_post(url, json, headers):
+        return main.httpx.Response(statuses.pop(0), headers={"Retry-After": "0"})
+
+    monkeypatch.setattr(main.http_client, "post", fake_post)
+
+    throttled = asyncio.run(main.post_with_retries("http://svc/api/biometric", {}))
+    assert throttled.status_code == 429
+
+    accepted = asyncio.run(main.post_with_retries("http://svc/api/biometric", {}, retry_until_accepted=True))
+    assert accepted.status_code == 200
+    assert statuses == []
+
+
+def test_backfill_endpoint_rejects_future_end():
+    end = datetime.now(timezone.utc) + timedelta(hours=1)
+    # Without the context manager the startup hooks (database, live loop) do not run
+    r = TestClient(main.app).post("/api/backfill", json={"start": "2024-05-01T00:00:00Z", "end": end.isoformat()})
+
+    assert r.status_code == 400
+    assert r.json()["detail"] == "end cannot be in the future"
+
+
+def test_backfill_endpoint_rejects_start_beyond_retention():
+    start = datetime.now(timezone.utc) - timedelta(days=main.BACKFILL_MAX_AGE_DAYS + 1)
+    r = TestClient(main.app).post("/api/backfill", json={"start": start.isoformat()})
+
+    assert r.status_code == 400
+    assert r.json()["detail"].startswith("start is older than the bucket retention")
@@ -0,0 +1,83 @@
+import asyncio
+
+import main
+
+
+def _fake_bulk(monkeypatch, uploads, reject=0):
+    async def fake_post_bulk(payloads, retry_until_accepted=False):
+        uploads.append([p["n"] for p in payloads])
+        return len(payloads) - reject
+
+    monkeypatch.setattr(main, "post_biometric_bulk", fake_post_bulk)
+
+
+def _readings(start, count):
+    return [{"n": n} for n in range(start, start + count)]
+
+
+def test_full_batches_go_out_as_soon_as_they_fill(monkeypatch):
+    uploads = []
+    _fake_bulk(monkeypatch, uploads)
+    uploader = main.BulkUploader(batch_size=4, flush_ticks=10, max_in_flight=2)
+
+    async def scenario():
+        await uploader.add(_readings(0, 10))
+        await uploader.drain()
+
+    asyncio.run(scenario())
+
+    assert uploads == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert uploader.snapshot()["buffered"] == 2
+
+
+def test_partial_batch_flushes_every_flush_ticks(monkeypatch):
+    uploads = []
+    _fake_bulk(monkeypatch, uploads)
+    uploader = main.BulkUploader(batch_size=100, flush_ticks=2, max_in_flight=2)
+
+    async def scenario():
+        await uploader.add(_readings(0, 3))
+        await uploader.end_tick()
+        assert uploads == []
+        await uploader.add(_readings(3, 2))
+        await uploader.end_tick()
+        await uploader.drain()
+
+    asyncio.run(scenario())
+
+    assert uploads == [[0, 1, 2, 3, 4]]
+
+
+def test_accepted_and_failed_readings_are_reported(monkeypatch):
+    uploads = []
+    _fake_bulk(monkeypatch, uploads, reject=1)
+    completed = []
+    uploader = main.BulkUploader(batch_size=3, flush_ticks=1, max_in_flight=1,
+                                 on_completed=lambda ok, failed: completed.append((ok, failed)))
+
+    async def scenario():
+        await uploader.add(_readings(0, 6))
+        await uploader.drain()
+
+    asyncio.run(scenario())
+
+    assert completed == [(2, 1), (2, 1)]
+    assert (uploader.stats["readings_accepted"], uploader.stats["readings_failed"]) == (4, 2)
+    assert uploader.stats["batches"] == 2
+
+
+def test_upload_error_fails_the_whole_batch(monkeypatch):
+    async def broken_post_bulk(payloads):
+        raise ConnectionError("biometric down")
+
+    monkeypatch.setattr(main, "post_biometric_bulk", broken_post_bulk)
+    uploader = main.BulkUploader(batch_size=2, flush_ticks=1, max_in_flight=1)
+
+    async def scenario():
+        await uploader.add(_readings(0, 4))
+        await uploader.drain()
+
+    asyncio.run(scenario())
+
+    assert uploader.stats["failed_batches"] == 2
+    assert uploader.stats["readings_failed"] == 4
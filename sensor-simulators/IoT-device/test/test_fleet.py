@@ -0,0 +1,64 @@
+from datetime import datetime, time, timezone
+
+import numpy as np
+
+import main
+from conftest import make_sensor
+
+NOON = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+NIGHT = datetime(2024, 5, 1, 2, tzinfo=timezone.utc)
+
+
+def _fleet(sensors, seed=1):
+    fleet = main.FleetState(seed)
+    fleet.sync(sensors)
+    return fleet
+
+
+def test_work_hours_mask_handles_shifts_over_midnight():
+    start = np.array([9 * 3600, 22 * 3600], dtype=float)
+    end = np.array([18 * 3600, 6 * 3600], dtype=float)
+
+    assert main.work_hours_mask(NOON, start, end).tolist() == [True, False]
+    assert main.work_hours_mask(NIGHT, start, end).tolist() == [False, True]
+
+
+def test_step_returns_one_value_per_active_sensor_within_baselines():
+    sensors = {str(i): make_sensor(str(i)) for i in range(50)}
+    sensors["3"] = sensors["3"].model_copy(update={"active": False})
+    fleet = _fleet(sensors)
+
+    for _ in range(200):
+        readings = fleet.step(NOON)
+
+    assert len(fleet) == 49 and "3" not in fleet.ids
+    assert all(len(values) == 49 for values in readings.values())
+    air = main.EnvAirBaseline()
+    assert all(air.co2_occupied_min <= v <= air.co2_occupied_max for v in readings["co2_ppm"])
+    assert all(air.temp_day_min <= v <= air.temp_day_max for v in readings["temp_c"])
+
+
+def test_same_seed_reproduces_readings():
+    sensors = {str(i): make_sensor(str(i)) for i in range(10)}
+    first, second = _fleet(sensors, seed=7), _fleet(sensors, seed=7)
+
+    assert [first.step(NOON) for _ in range(5)] == [second.step(NOON) for _ in range(5)]
+
+
+def test_resync_keeps_smoothed_state_of_remaining_sensors():
+    sensors = {str(i): make_sensor(str(i)) for i in range(3)}
+    fleet = _fleet(sensors)
+    for _ in range(20):
+        fleet.step(NOON)
+    co2 = dict(zip(fleet.ids, fleet.last_co2.tolist()))
+
+    del sensors["0"]
+    sensors["9"] = make_sensor("9").model_copy(update={"work_start": time(0), "work_end": time(23, 59)})
+    fleet.sync(sensors)
+    assert fleet.ids == ["0", "1", "2"]  # not rebuilt until mark_dirty()
+    fleet.mark_dirty()
+    fleet.sync(sensors)
+
+    assert fleet.ids == ["1", "2", "9"]
+    assert fleet.last_co2.tolist() == [co2["1"], co2["2"], main.FleetState.INITIAL_CO2_PPM]
+    assert sorted(fleet.send_order) == [0, 1, 2]
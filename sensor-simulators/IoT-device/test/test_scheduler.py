@@ -0,0 +1,75 @@
+import asyncio
+
+import main
+from conftest import make_sensor
+
+
+def test_dispatch_bounds_requests_in_flight(monkeypatch):
+    active = []
+    peak = []
+
+    async def fake_post(payload, retry_until_accepted=False):
+        active.append(payload)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.remove(payload)
+        return payload["ok"]
+
+    monkeypatch.setattr(main, "post_biometric", fake_post)
+    scheduler = main.SendScheduler(interval=1, max_in_flight=3)
+
+    async def scenario():
+        for i in range(10):
+            await scheduler._dispatch(f"s{i}", {"ok": i % 5 != 0})
+        await asyncio.gather(*list(scheduler._tasks))
+
+    asyncio.run(scenario())
+
+    assert max(peak) == 3
+    assert (scheduler.stats["sent"], scheduler.stats["failed"]) == (8, 2)
+    assert scheduler.snapshot()["in_flight"] == 0
+
+
+def test_send_error_counts_as_failed(monkeypatch):
+    async def broken_post(payload):
+        raise ConnectionError("biometric down")
+
+    monkeypatch.setattr(main, "post_biometric", broken_post)
+    scheduler = main.SendScheduler(interval=1, max_in_flight=2)
+
+    async def scenario():
+        await scheduler._dispatch("s1", {})
+        await asyncio.gather(*list(scheduler._tasks))
+
+    asyncio.run(scenario())
+
+    assert scheduler.stats["failed"] == 1
+    assert scheduler._semaphore._value == 2
+
+
+def test_tick_sends_every_sensor_within_the_interval(monkeypatch, sensors):
+    sent = []
+
+    async def fake_post(payload, retry_until_accepted=False):
+        sent.append(payload["device_id"])
+        return True
+
+    monkeypatch.setattr(main, "post_biometric", fake_post)
+    for i in range(20):
+        sensors[str(i)] = make_sensor(str(i))
+    scheduler = main.SendScheduler(interval=0.05, max_in_flight=5)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await scheduler._run_tick(start)
+        await asyncio.gather(*list(scheduler._tasks))
+        return loop.time() - start
+
+    elapsed = asyncio.run(scenario())
+
+    assert sorted(sent) == sorted(sensors)
+    # Sends follow each sensor's phase within the tick
+    assert sent == [main.fleet.ids[row] for row in main.fleet.send_order]
+    assert elapsed < 0.05 * 3
+    assert scheduler.stats["active_sensors"] == 20